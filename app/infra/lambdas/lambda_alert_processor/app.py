@@ -1,25 +1,64 @@
 import logging
 import os
-from datetime import datetime
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Dict, List, Sequence, Tuple
 
-import boto3
-from boto3.dynamodb.types import TypeDeserializer
+from aws_clients import get_client, get_table
 from botocore.exceptions import ClientError
+from dynamo_stream import StreamRecord, StreamRouter
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-deserializer = TypeDeserializer()
+table = get_table(os.environ["DYNAMO_TABLE_NAME"])
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["DYNAMO_TABLE_NAME"])
-
-sns_client = boto3.client("sns")
+sns_client = get_client("sns")
 
 ALERTS_TOPIC_ARN = os.environ.get("ALERTS_TOPIC_ARN")
 
+# BatchGetItem accepts up to 100 keys per request
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 5
+
+# Warm-container cache of the lookup items (thresholds, responsibles, metadata).
+# Kept across invocations; stream records on those keys invalidate it and the
+# TTL bounds staleness for changes delivered to other shards/containers.
+ITEM_CACHE_TTL_SECONDS = float(os.environ.get("ITEM_CACHE_TTL_SECONDS", "300"))
+ITEM_CACHE_MAX_SIZE = int(os.environ.get("ITEM_CACHE_MAX_SIZE", "4096"))
+CACHED_SORT_KEYS = ("THRESHOLDS", "RESPONSIBLES", "Metadata")
+
+# Readings written by a historical bulk import (Source attribute) are not
+# evaluated: they would alert on past data and rewind ALERT_STATE
+IMPORT_SOURCE = "import"
+
+_MISSING = object()
+
+# (pk, sk) -> (expires_at, item or None); None caches "no such item"
+_item_cache: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+# SNS limits: 10 entries per publish_batch, 256 KB per message and per request,
+# 100 characters per subject
+SNS_PUBLISH_BATCH_SIZE = 10
+SNS_MAX_MESSAGE_BYTES = 256 * 1024 - 1024
+SNS_MAX_SUBJECT_LENGTH = 100
+
+# Per-plot alert state (PLOT#{plot_id} / ALERT_STATE), one entry per metric:
+# OK -> ALERTING when a reading leaves the range, ALERTING -> RECOVERED once it
+# is back inside the range by more than the hysteresis band.
+ALERT_STATE_SK = "ALERT_STATE"
+STATUS_OK = "OK"
+STATUS_ALERTING = "ALERTING"
+STATUS_RECOVERED = "RECOVERED"
+# Hysteresis band as a fraction of the allowed range (or of the bound if only one is set)
+ALERT_HYSTERESIS_PERCENT = float(os.environ.get("ALERT_HYSTERESIS_PERCENT", "0.05"))
+# Minimum time between two "new alert" notifications for the same metric
+ALERT_COOLDOWN_SECONDS = int(os.environ.get("ALERT_COOLDOWN_SECONDS", "900"))
+# "Still alerting" reminder interval while a metric stays out of range
+ALERT_REMINDER_SECONDS = int(os.environ.get("ALERT_REMINDER_SECONDS", "14400"))
+
 METRIC_TO_RANGE_FIELDS: Dict[str, Sequence[str]] = {
     "temperature": ("MinTemperature", "MaxTemperature"),
     "humidity": ("MinHumidity", "MaxHumidity"),
@@ -36,34 +75,172 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     records = event.get("Records", [])
     logger.info("Received %d DynamoDB stream records", len(records))
 
-    processed = 0
-    for record in records:
-        if record.get("eventName") != "INSERT":
-            continue
+    # Only the Keys of each record are decoded up front; NewImage is
+    # deserialized just for the PLOT#/STATE# inserts that get evaluated.
+    items: List[Dict[str, Any]] = []
 
-        new_image = record.get("dynamodb", {}).get("NewImage")
-        if not new_image:
-            logger.debug("Record without NewImage, skipping")
-            continue
+    def collect_plot_state(record: StreamRecord) -> None:
+        if record.new_value("Source") == IMPORT_SOURCE:
+            return
+        if record.new_image:
+            items.append(record.new_image)
 
+    router = StreamRouter()
+    # Drop cached lookups changed in this batch before evaluating its readings
+    router.add(_invalidate_cached_item, sk=CACHED_SORT_KEYS)
+    router.add(collect_plot_state, "PLOT#", sk_prefix="STATE#", events=("INSERT",), name="plot_state")
+    router.dispatch(records)
+
+    try:
+        _prefetch_batch_items(items)
+    except ClientError as error:
+        # Evaluation still works, falling back to one get_item per lookup
+        logger.error("Batch prefetch failed: %s", error)
+
+    processed = 0
+    notifications: List[Dict[str, Any]] = []
+    for item in items:
         try:
-            item = _deserialize_item(new_image)
-            if _process_plot_state(item):
+            if _process_plot_state(item, notifications):
                 processed += 1
         except Exception as exc:  # pylint: disable=broad-except
             logger.exception("Failed to process record: %s", exc)
 
-    return {"statusCode": 200, "processed_records": processed}
+    # Raises if a digest could not be published, so the stream retries the batch
+    published = _publish_digests(notifications)
 
+    return {"statusCode": 200, "processed_records": processed, "published_messages": published}
 
-def _deserialize_item(image: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert DynamoDB Streams image into standard Python dict."""
-    return {key: deserializer.deserialize(value) for key, value in image.items()}
 
+def _prefetch_batch_items(items: List[Dict[str, Any]]) -> None:
+    """
+    Resolve every item the batch will need with BatchGetItem before evaluation,
+    so the number of round-trips depends on distinct plots/facilities and not on
+    the number of records. Two rounds: plot keys first, then the facility keys
+    discovered through the plot thresholds / lookup items.
+    """
+    plot_keys: List[Tuple[str, str]] = []
+    facility_ids = set()
+
+    for item in items:
+        pk, sk = item.get("pk"), item.get("sk")
+        if not isinstance(pk, str) or not isinstance(sk, str):
+            continue
+        if not pk.startswith("PLOT#") or not sk.startswith("STATE#"):
+            continue
+        plot_keys.append((pk, "THRESHOLDS"))
+        plot_keys.append((pk, ALERT_STATE_SK))
+        facility_id = _item_facility_id(item)
+        if facility_id:
+            facility_ids.add(facility_id)
+        else:
+            plot_keys.append((pk, "Metadata"))
+
+    _batch_get(plot_keys)
+
+    for pk, _ in plot_keys:
+        for sk in ("THRESHOLDS", "Metadata"):
+            related = _cache_get((pk, sk))
+            related = related if isinstance(related, dict) else {}
+            facility_id = related.get("facility_id") or related.get("FacilityId")
+            if facility_id:
+                facility_ids.add(facility_id)
 
-def _process_plot_state(item: Dict[str, Any]) -> bool:
+    facility_keys: List[Tuple[str, str]] = []
+    for facility_id in facility_ids:
+        facility_keys.append((f"FACILITY#{facility_id}", "RESPONSIBLES"))
+        facility_keys.append((f"FACILITY#{facility_id}", "Metadata"))
+    _batch_get(facility_keys)
+
+    logger.info(
+        "Resolved %d plot and %d facility keys for %d records",
+        len(set(plot_keys)), len(facility_keys), len(items),
+    )
+
+
+def _batch_get(keys: List[Tuple[str, str]]) -> None:
+    """BatchGetItem of the keys not already cached (missing items are cached as None)."""
+    pending = [key for key in dict.fromkeys(keys) if _cache_get(key) is _MISSING]
+
+    for start in range(0, len(pending), BATCH_GET_MAX_KEYS):
+        chunk = pending[start:start + BATCH_GET_MAX_KEYS]
+        found_items: Dict[Tuple[str, str], Any] = dict.fromkeys(chunk)
+
+        request = {table.name: {"Keys": [{"pk": pk, "sk": sk} for pk, sk in chunk]}}
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            response = table.meta.client.batch_get_item(RequestItems=request)
+            for found in response.get("Responses", {}).get(table.name, []):
+                found_items[(found["pk"], found["sk"])] = found
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            if attempt < BATCH_GET_MAX_RETRIES:
+                time.sleep(0.05 * 2 ** attempt)
+
+        if request:
+            # Let _get_item read these keys one by one
+            for key in request[table.name]["Keys"]:
+                found_items.pop((key["pk"], key["sk"]), None)
+            logger.warning("%d keys left unprocessed by BatchGetItem", len(request[table.name]["Keys"]))
+
+        for key, item in found_items.items():
+            _cache_set(key, item)
+
+
+def _get_item(pk: str, sk: str) -> Dict[str, Any]:
+    """Cached (or prefetched) item, or a get_item if it is not in the cache."""
+    key = (pk, sk)
+    item = _cache_get(key)
+    if item is _MISSING:
+        response = table.get_item(Key={"pk": pk, "sk": sk})
+        item = response.get("Item")
+        _cache_set(key, item)
+    return item or {}
+
+
+def _cache_get(key: Tuple[str, str]) -> Any:
+    """Cached item (None if it is known not to exist) or _MISSING."""
+    entry = _item_cache.get(key)
+    if entry is None:
+        return _MISSING
+    expires_at, item = entry
+    if expires_at < time.monotonic():
+        del _item_cache[key]
+        return _MISSING
+    _item_cache.move_to_end(key)
+    return item
+
+
+def _cache_set(key: Tuple[str, str], item: Any) -> None:
+    # ALERT_STATE is only written by this function; its version check catches stale entries
+    if key[1] not in CACHED_SORT_KEYS and key[1] != ALERT_STATE_SK:
+        return
+    _item_cache[key] = (time.monotonic() + ITEM_CACHE_TTL_SECONDS, item)
+    _item_cache.move_to_end(key)
+    while len(_item_cache) > ITEM_CACHE_MAX_SIZE:
+        _item_cache.popitem(last=False)
+
+
+def _invalidate_cached_item(record: StreamRecord) -> None:
+    """Evict a cached item that this batch inserts, modifies or removes."""
+    if _item_cache.pop((record.pk, record.sk), None) is not None:
+        logger.info("Invalidated cached item %s/%s from stream record", record.pk, record.sk)
+
+
+def _item_facility_id(item: Dict[str, Any]) -> Any:
+    facility_id = item.get("FacilityId") or item.get("facility_id")
+    if not facility_id and isinstance(item.get("GSI_PK"), str) and item["GSI_PK"].startswith("FACILITY#"):
+        facility_id = item["GSI_PK"].split("#", maxsplit=1)[-1]
+    if facility_id == "UNKNOWN":
+        return None
+    return facility_id
+
+
+def _process_plot_state(item: Dict[str, Any], notifications: List[Dict[str, Any]]) -> bool:
     """
     Process a single plot state record.
+    Appends what has to be notified to `notifications` (published per facility
+    by _publish_digests at the end of the invocation).
     Returns True if the record triggered an alert evaluation (normal or alert).
     """
     pk = item.get("pk")
@@ -76,14 +253,11 @@ def _process_plot_state(item: Dict[str, Any]) -> bool:
     plot_id = pk.split("#", maxsplit=1)[-1]
     timestamp = item.get("Timestamp") or sk.split("#", maxsplit=1)[-1]
     species_id = item.get("SpeciesId") or item.get("species_id")
-    facility_id = item.get("FacilityId") or item.get("facility_id")
+    # Falls back to GSI_PK when the item has no facility attribute
+    facility_id = _item_facility_id(item)
     business_id = item.get("BusinessId") or item.get("business_id")
     plot_name = item.get("PlotName") or item.get("plot_name")
 
-    # Extract facility_id from GSI_PK if not present
-    if not facility_id and isinstance(item.get("GSI_PK"), str) and item["GSI_PK"].startswith("FACILITY#"):
-        facility_id = item["GSI_PK"].split("#", maxsplit=1)[-1]
-
     # Fetch plot-specific thresholds
     plot_thresholds = _fetch_plot_thresholds(plot_id)
     
@@ -121,31 +295,190 @@ def _process_plot_state(item: Dict[str, Any]) -> bool:
     business_id = business_id or plot_thresholds.get("BusinessId") or plot_thresholds.get("business_id")
 
     deviations = _find_deviations(item, plot_thresholds)
-    if not deviations:
-        logger.info("Plot %s measurements at %s are within acceptable range", plot_id, timestamp)
+
+    try:
+        alerts, recovered = _update_alert_state(plot_id, item, plot_thresholds, deviations)
+    except ClientError as error:
+        logger.error("Failed to update alert state for plot %s: %s", plot_id, error)
         return True
 
-    recipients = _fetch_responsible_emails(business_id, facility_id)
-    if not recipients:
-        logger.warning("No responsible emails found for facility %s (business=%s); skipping SNS notification", facility_id, business_id)
+    if not alerts and not recovered:
+        if deviations:
+            logger.info("Plot %s still out of range at %s; notification suppressed (cooldown/reminder)", plot_id, timestamp)
+        else:
+            logger.info("Plot %s measurements at %s are within acceptable range", plot_id, timestamp)
         return True
 
-    # Fetch facility name for better email readability
-    facility_name = _fetch_facility_name(facility_id)
-
-    _publish_alert(
-        plot_id=plot_id,
-        plot_name=plot_name,
-        species_id=species_id,
-        facility_id=facility_id,
-        facility_name=facility_name,
-        timestamp=timestamp,
-        deviations=deviations,
-        recipients=recipients,
+    notifications.append(
+        {
+            "plot_id": plot_id,
+            "plot_name": plot_name,
+            "species_id": species_id,
+            "facility_id": facility_id,
+            "business_id": business_id,
+            "timestamp": timestamp,
+            "deviations": alerts,
+            "recovered": recovered,
+        }
     )
     return True
 
 
+def _update_alert_state(
+    plot_id: str,
+    measurement: Dict[str, Any],
+    ideal_ranges: Dict[str, Any],
+    deviations: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Advance the per-metric alert state of a plot with a new reading.
+
+    Returns (deviations to notify, recovered metrics). The state item is only
+    written when something changes, with a conditional put on its version; on
+    a conflict the state is re-read and the reading evaluated again.
+    """
+    key = (f"PLOT#{plot_id}", ALERT_STATE_SK)
+
+    for attempt in range(2):
+        if attempt == 0:
+            state = _get_item(*key)
+        else:
+            state = table.get_item(Key={"pk": key[0], "sk": key[1]}, ConsistentRead=True).get("Item") or {}
+
+        metrics, alerts, recovered = _next_alert_state(
+            state.get("metrics") or {}, measurement, ideal_ranges, deviations, _reading_time(measurement)
+        )
+        if metrics is None:
+            return [], []
+
+        version = int(state.get("version", 0))
+        new_state = {
+            "pk": key[0],
+            "sk": key[1],
+            "plot_id": plot_id,
+            "metrics": metrics,
+            "version": version + 1,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+        }
+        try:
+            if version:
+                table.put_item(
+                    Item=new_state,
+                    ConditionExpression="version = :version",
+                    ExpressionAttributeValues={":version": version},
+                )
+            else:
+                table.put_item(Item=new_state, ConditionExpression="attribute_not_exists(pk)")
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+            logger.info("Alert state of plot %s changed concurrently, re-evaluating", plot_id)
+            continue
+
+        _cache_set(key, new_state)
+        return alerts, recovered
+
+    logger.warning("Could not update alert state of plot %s after a conflict; skipping notification", plot_id)
+    return [], []
+
+
+def _reading_time(measurement: Dict[str, Any]) -> int:
+    """
+    Epoch seconds of the reading (its Timestamp), so retried or late batches
+    keep their own times for since/cooldown/reminders. Falls back to the
+    current time when the timestamp cannot be parsed, and never goes past it.
+    """
+    now = int(time.time())
+    timestamp = measurement.get("Timestamp")
+    if not isinstance(timestamp, str):
+        return now
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return now
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return min(now, int(parsed.timestamp()))
+
+
+def _next_alert_state(
+    metrics: Dict[str, Any],
+    measurement: Dict[str, Any],
+    ideal_ranges: Dict[str, Any],
+    deviations: List[Dict[str, Any]],
+    now: int,
+) -> Tuple[Any, List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Pure transition function. Returns (new metrics map or None if unchanged,
+    deviations to notify, recovered metrics).
+    """
+    by_metric = {deviation["metric"]: deviation for deviation in deviations}
+    updated = {metric: dict(entry) for metric, entry in metrics.items()}
+    alerts: List[Dict[str, Any]] = []
+    recovered: List[Dict[str, Any]] = []
+    changed = False
+
+    for metric in METRIC_TO_RANGE_FIELDS:
+        value = _to_float(measurement.get(metric))
+        if value is None:
+            continue
+
+        entry = updated.get(metric) or {"status": STATUS_OK}
+        status = entry.get("status", STATUS_OK)
+        last_notified = int(entry.get("last_notified_at", 0))
+        deviation = by_metric.get(metric)
+
+        # notified_at/previous_notified_at let _revert_notifications undo the
+        # change if the digest cannot be published
+        notified = {"notified_at": now, "previous_notified_at": last_notified}
+
+        if deviation and status != STATUS_ALERTING:
+            entry.update(status=STATUS_ALERTING, direction=deviation["direction"], since=now)
+            if now - last_notified >= ALERT_COOLDOWN_SECONDS:
+                entry["last_notified_at"] = now
+                alerts.append({**deviation, **notified})
+            changed = True
+        elif deviation:
+            since = int(entry.get("since", now))
+            if last_notified < since and now - last_notified >= ALERT_COOLDOWN_SECONDS:
+                # The alert was held back by the cooldown when this incident started
+                entry.update(last_notified_at=now, direction=deviation["direction"])
+                alerts.append({**deviation, **notified})
+                changed = True
+            elif now - last_notified >= ALERT_REMINDER_SECONDS:
+                entry.update(last_notified_at=now, direction=deviation["direction"])
+                alerts.append({**deviation, **notified, "reminder": True, "since": since})
+                changed = True
+        elif status == STATUS_ALERTING and _clear_of_hysteresis(value, *_metric_bounds(ideal_ranges, metric)):
+            entry.update(status=STATUS_RECOVERED, recovered_at=now)
+            since = int(entry.get("since", now))
+            # Only incidents that were notified get a recovery; one held back by
+            # the cooldown (a flapping sensor) recovers silently
+            if last_notified >= since:
+                recovered.append({"metric": metric, "actual": value, "since": since, "recovered_at": now})
+            changed = True
+        else:
+            continue
+
+        entry["last_value"] = Decimal(str(value))
+        updated[metric] = entry
+
+    return (updated if changed else None), alerts, recovered
+
+
+def _clear_of_hysteresis(value: float, lower: Any, upper: Any) -> bool:
+    """True if value is inside [lower, upper] by more than the hysteresis band."""
+    if lower is not None and upper is not None:
+        band = (upper - lower) * ALERT_HYSTERESIS_PERCENT
+    else:
+        band = abs(lower if lower is not None else upper or 0.0) * ALERT_HYSTERESIS_PERCENT
+    if lower is not None and value < lower + band:
+        return False
+    if upper is not None and value > upper - band:
+        return False
+    return True
+
+
 def _fetch_plot_metadata(plot_id: Any, facility_id: Any) -> Dict[str, Any]:
     """
     Retrieve plot metadata to get species information.
@@ -184,6 +517,11 @@ def _fetch_plot_metadata_by_id(plot_id: Any) -> Dict[str, Any]:
         return {}
     
     try:
+        # PLOT#{plot_id} / Metadata lookup item (usually prefetched)
+        lookup = _get_item(f"PLOT#{plot_id}", "Metadata")
+        if lookup:
+            return lookup
+
         # Query using GSI_TypeIndex with filter on plot_id
         response = table.query(
             IndexName='GSI_TypeIndex',
@@ -216,14 +554,7 @@ def _fetch_plot_thresholds(plot_id: Any) -> Dict[str, Any]:
     Returns the plot's own thresholds (with umbral_enabled flag).
     """
     try:
-        response = table.get_item(
-            Key={
-                "pk": f"PLOT#{plot_id}",
-                "sk": "THRESHOLDS"
-            }
-        )
-        
-        item = response.get("Item")
+        item = _get_item(f"PLOT#{plot_id}", "THRESHOLDS")
         if item:
             logger.info("Found plot thresholds for plot %s", plot_id)
             return item
@@ -277,13 +608,11 @@ def _find_deviations(
     """Compare measurement against configured ranges and return deviation details."""
     deviations: List[Dict[str, Any]] = []
 
-    for metric, range_fields in METRIC_TO_RANGE_FIELDS.items():
+    for metric in METRIC_TO_RANGE_FIELDS:
         if metric not in measurement:
             continue
 
-        lower_field, upper_field = range_fields
-        lower_bound = _to_float(_first_present(ideal_ranges, (lower_field, lower_field.lower())))
-        upper_bound = _to_float(_first_present(ideal_ranges, (upper_field, upper_field.lower())))
+        lower_bound, upper_bound = _metric_bounds(ideal_ranges, metric)
         actual_value = _to_float(measurement[metric])
 
         if actual_value is None:
@@ -315,19 +644,21 @@ def _find_deviations(
     return deviations
 
 
+def _metric_bounds(ideal_ranges: Dict[str, Any], metric: str) -> Tuple[Any, Any]:
+    """(lower, upper) bounds of a metric as floats, None where not configured."""
+    lower_field, upper_field = METRIC_TO_RANGE_FIELDS[metric]
+    lower_bound = _to_float(_first_present(ideal_ranges, (lower_field, lower_field.lower())))
+    upper_bound = _to_float(_first_present(ideal_ranges, (upper_field, upper_field.lower())))
+    return lower_bound, upper_bound
+
+
 def _fetch_facility_name(facility_id: Any) -> str:
     """Retrieve facility name from DynamoDB."""
     if not facility_id:
         return "Unknown Facility"
 
-    key = {
-        "pk": f"FACILITY#{facility_id}",
-        "sk": "Metadata",
-    }
-
     try:
-        response = table.get_item(Key=key)
-        facility = response.get("Item")
+        facility = _get_item(f"FACILITY#{facility_id}", "Metadata")
         if facility:
             return facility.get("name", f"Facility {facility_id[:8]}")
     except ClientError as error:
@@ -346,18 +677,12 @@ def _fetch_responsible_emails(business_id: Any, facility_id: Any) -> List[str]:
         logger.warning("Missing facility_id for responsible lookup")
         return []
 
-    key = {
-        "pk": f"FACILITY#{facility_id}",
-        "sk": "RESPONSIBLES",
-    }
-
     try:
-        response = table.get_item(Key=key)
+        record = _get_item(f"FACILITY#{facility_id}", "RESPONSIBLES")
     except ClientError as error:  # pragma: no cover - AWS errors logged
-        logger.error("Failed to fetch responsibles for %s: %s", key, error)
+        logger.error("Failed to fetch responsibles for facility %s: %s", facility_id, error)
         return []
 
-    record = response.get("Item")
     if not record:
         logger.info("No responsible record found for facility %s", facility_id)
         return []
@@ -381,25 +706,174 @@ def _fetch_responsible_emails(business_id: Any, facility_id: Any) -> List[str]:
     return []
 
 
-def _publish_alert(
-    plot_id: str,
-    plot_name: Any,
-    species_id: Any,
-    facility_id: Any,
-    facility_name: str,
-    timestamp: Any,
-    deviations: List[Dict[str, Any]],
-    recipients: List[str],
-) -> None:
-    """Publish alert message to SNS topic."""
+def _publish_digests(notifications: List[Dict[str, Any]]) -> int:
+    """
+    Group the notifications of the invocation by facility, render one digest
+    per facility and send them with SNS publish_batch (10 entries per call).
+    Returns the number of messages published.
+
+    ALERT_STATE already records these notifications as sent. If a digest
+    cannot be published, its notifications are reverted and an error is
+    raised, so the retried stream batch sends them again instead of the
+    cooldown suppressing them.
+    """
+    if not notifications:
+        return 0
     if not ALERTS_TOPIC_ARN:
         logger.error("ALERTS_TOPIC_ARN environment variable is required to publish alerts")
-        return
+        return 0
+
+    by_facility: "OrderedDict[Any, List[Dict[str, Any]]]" = OrderedDict()
+    for notification in notifications:
+        by_facility.setdefault(notification["facility_id"], []).append(notification)
+
+    entries: List[Dict[str, str]] = []
+    entry_plots: Dict[str, Tuple[Any, set]] = {}
+    for facility_id, facility_notifications in by_facility.items():
+        business_id = facility_notifications[0].get("business_id")
+        recipients = _fetch_responsible_emails(business_id, facility_id)
+        if not recipients:
+            logger.warning("No responsible emails found for facility %s (business=%s); skipping SNS notification", facility_id, business_id)
+            continue
+
+        # Fetch facility name for better email readability
+        facility_name = _fetch_facility_name(facility_id)
+        for subject, message, plots in _render_digests(facility_name, _merge_plot_notifications(facility_notifications)):
+            entry_id = str(len(entries))
+            entries.append({"Id": entry_id, "Subject": subject, "Message": message})
+            entry_plots[entry_id] = (facility_id, {plot["plot_id"] for plot in plots})
+
+    published, failed_ids = _publish_batch(entries)
+    if failed_ids:
+        failed_plots = {(entry_plots[entry_id][0], plot_id) for entry_id in failed_ids for plot_id in entry_plots[entry_id][1]}
+        _revert_notifications(
+            [notification for notification in notifications if (notification["facility_id"], notification["plot_id"]) in failed_plots]
+        )
+        raise RuntimeError(f"Failed to publish {len(failed_ids)} alert digest(s)")
+    return published
+
 
+def _revert_notifications(notifications: List[Dict[str, Any]]) -> None:
+    """
+    Undo what ALERT_STATE recorded for notifications that were not published:
+    last_notified_at goes back to its previous value and recoveries go back to
+    ALERTING. Newest first, so several readings of a plot unwind in order.
+    Each update only applies if the metric still has the value this invocation
+    wrote.
+    """
+    for notification in reversed(notifications):
+        pk = f"PLOT#{notification['plot_id']}"
+        for metric in notification["recovered"]:
+            _revert_metric_state(
+                pk,
+                metric["metric"],
+                "SET #metrics.#metric.#status = :alerting REMOVE #metrics.#metric.recovered_at",
+                "#metrics.#metric.recovered_at = :recovered_at",
+                {":alerting": STATUS_ALERTING, ":recovered_at": metric["recovered_at"]},
+            )
+        for alert in notification["deviations"]:
+            _revert_metric_state(
+                pk,
+                alert["metric"],
+                "SET #metrics.#metric.last_notified_at = :previous",
+                "#metrics.#metric.last_notified_at = :notified_at",
+                {":previous": alert["previous_notified_at"], ":notified_at": alert["notified_at"]},
+            )
+
+
+def _revert_metric_state(pk: str, metric: str, update: str, condition: str, values: Dict[str, Any]) -> None:
+    key = (pk, ALERT_STATE_SK)
+    _item_cache.pop(key, None)
+    try:
+        table.update_item(
+            Key={"pk": pk, "sk": ALERT_STATE_SK},
+            # version changes too, so concurrent conditional puts re-read the state
+            UpdateExpression=f"{update} ADD version :one",
+            ConditionExpression=condition,
+            ExpressionAttributeNames={
+                "#metrics": "metrics",
+                "#metric": metric,
+                **({"#status": "status"} if "#status" in update else {}),
+            },
+            ExpressionAttributeValues={**values, ":one": 1},
+        )
+    except ClientError as error:
+        if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            logger.error("Failed to revert alert state of %s/%s: %s", pk, metric, error)
+            return
+        logger.info("Alert state of %s/%s changed since it was notified, not reverted", pk, metric)
+
+
+def _merge_plot_notifications(notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per plot: the latest reading's alerts and recoveries for each metric."""
+    merged: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for notification in notifications:
+        entry = merged.get(notification["plot_id"])
+        if entry is None:
+            merged[notification["plot_id"]] = {**notification, "deviations": list(notification["deviations"]), "recovered": list(notification["recovered"])}
+            continue
+        entry["timestamp"] = notification["timestamp"]
+        for field in ("deviations", "recovered"):
+            metrics = {metric["metric"] for metric in notification[field]}
+            entry[field] = [metric for metric in entry[field] if metric["metric"] not in metrics] + list(notification[field])
+    return list(merged.values())
+
+
+def _render_digests(facility_name: str, plots: List[Dict[str, Any]]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    """
+    Render (subject, message, plots) for a facility. A digest larger than what
+    SNS accepts is split in halves (by plot) until every part fits.
+    """
+    subject, message = _render_digest(facility_name, plots)
+    if len(plots) == 1 or len(message.encode("utf-8")) <= SNS_MAX_MESSAGE_BYTES:
+        return [(subject, message, plots)]
+
+    middle = len(plots) // 2
+    return _render_digests(facility_name, plots[:middle]) + _render_digests(facility_name, plots[middle:])
+
+
+def _render_digest(facility_name: str, plots: List[Dict[str, Any]]) -> Tuple[str, str]:
+    alerting = [plot for plot in plots if plot["deviations"]]
+
+    if len(plots) == 1:
+        plot = plots[0]
+        plot_display = _plot_display(plot)
+        if not plot["deviations"]:
+            subject = f"[MERIDA Recovered] {plot_display} - Values Back in Range"
+        elif all(deviation.get("reminder") for deviation in plot["deviations"]):
+            subject = f"[MERIDA Reminder] {plot_display} - Values Still Out of Range"
+        else:
+            subject = f"[MERIDA Alert] {plot_display} - Values Out of Range"
+    elif alerting:
+        subject = f"[MERIDA Alert] {facility_name} - {len(alerting)} Plots Out of Range"
+    else:
+        subject = f"[MERIDA Recovered] {facility_name} - {len(plots)} Plots Back in Range"
+
+    if alerting:
+        title = "ALERT: Environmental Values Out of Tolerance Range"
+    else:
+        title = "RECOVERED: Environmental Values Back in Range"
+
+    lines = [title, "", f"Facility: {facility_name}", ""]
+    if len(plots) > 1:
+        lines.extend([f"Plots reported: {len(plots)} ({len(alerting)} out of range)", ""])
+
+    for plot in plots:
+        lines.extend(_render_plot_section(plot))
+
+    lines.append("---")
+    lines.append("This is an automated alert from the MERIDA monitoring system.")
+
+    return subject[:SNS_MAX_SUBJECT_LENGTH], "\n".join(lines)
+
+
+def _plot_display(plot: Dict[str, Any]) -> str:
     # Use plot name if available, otherwise use short ID
-    plot_display = plot_name if plot_name else f"Plot {plot_id[:8]}"
-    subject = f"[MERIDA Alert] {plot_display} - Values Out of Range"
+    return plot["plot_name"] if plot.get("plot_name") else f"Plot {plot['plot_id'][:8]}"
 
+
+def _render_plot_section(plot: Dict[str, Any]) -> List[str]:
+    """Lines describing the alerts, reminders and recoveries of one plot."""
     # Map metric keys to display names with units
     metric_info = {
         "temperature": {"name": "Temperature", "unit": "°C"},
@@ -409,18 +883,15 @@ def _publish_alert(
     }
 
     lines = [
-        "ALERT: Environmental Values Out of Tolerance Range",
-        "",
-        f"Facility: {facility_name}",
-        f"Plot: {plot_display}",
-        f"Species: {species_id or 'Unknown'}",
-        f"Timestamp: {timestamp or datetime.utcnow().isoformat()}",
-        "",
-        "Metrics Outside Tolerance:",
+        f"Plot: {_plot_display(plot)}",
+        f"Species: {plot.get('species_id') or 'Unknown'}",
+        f"Timestamp: {plot.get('timestamp') or datetime.utcnow().isoformat()}",
         "",
     ]
+    if plot["deviations"]:
+        lines.extend(["Metrics Outside Tolerance:", ""])
 
-    for deviation in deviations:
+    for deviation in plot["deviations"]:
         metric_key = deviation['metric']
         info = metric_info.get(metric_key, {"name": metric_key.capitalize(), "unit": ""})
         actual = deviation['actual']
@@ -450,22 +921,77 @@ def _publish_alert(
             f"  - {info['name']}: {actual:.1f}{info['unit']}{deviation_desc}"
         )
         lines.append(f"    Allowed range: {range_desc}")
+        if deviation.get("reminder"):
+            lines.append(f"    Out of range since: {_format_epoch(deviation.get('since'))}")
         lines.append("")
 
-    lines.append("---")
-    lines.append("This is an automated alert from the MERIDA monitoring system.")
+    if plot["recovered"]:
+        lines.extend(["Metrics Back in Range:", ""])
+        for metric in plot["recovered"]:
+            info = metric_info.get(metric["metric"], {"name": metric["metric"].capitalize(), "unit": ""})
+            lines.append(f"  - {info['name']}: {metric['actual']:.1f}{info['unit']}")
+            lines.append(f"    Out of range since: {_format_epoch(metric.get('since'))}")
+            lines.append("")
 
-    message = "\n".join(lines)
+    return lines
 
+
+def _publish_batch(entries: List[Dict[str, str]]) -> Tuple[int, set]:
+    """
+    Send entries with publish_batch, packing up to 10 per call while the
+    request stays under the SNS payload limit. Entries rejected by a batch call
+    are retried once with a plain publish. Returns (messages published, ids of
+    the entries that could not be published).
+    """
+    published = 0
+    failed_ids: set = set()
+    batch: List[Dict[str, str]] = []
+    batch_bytes = 0
+
+    for entry in entries + [None]:
+        size = len(entry["Subject"].encode("utf-8")) + len(entry["Message"].encode("utf-8")) if entry else 0
+        if batch and (entry is None or len(batch) == SNS_PUBLISH_BATCH_SIZE or batch_bytes + size > SNS_MAX_MESSAGE_BYTES):
+            sent, failed = _send_batch(batch)
+            published += sent
+            failed_ids |= failed
+            batch, batch_bytes = [], 0
+        if entry is not None:
+            batch.append(entry)
+            batch_bytes += size
+
+    logger.info("Published %d alert message(s) for %d digest(s)", published, len(entries))
+    return published, failed_ids
+
+
+def _send_batch(batch: List[Dict[str, str]]) -> Tuple[int, set]:
     try:
-        sns_client.publish(
-            TopicArn=ALERTS_TOPIC_ARN,
-            Subject=subject,
-            Message=message,
-        )
-        logger.info("Alert published for plot %s", plot_id)
+        response = sns_client.publish_batch(TopicArn=ALERTS_TOPIC_ARN, PublishBatchRequestEntries=batch)
     except ClientError as error:  # pragma: no cover
-        logger.error("Failed to publish alert: %s", error)
+        logger.error("publish_batch failed, falling back to publish: %s", error)
+        failed_ids = {entry["Id"] for entry in batch}
+        published = 0
+    else:
+        failed_ids = {failure["Id"] for failure in response.get("Failed", [])}
+        published = len(response.get("Successful", []))
+
+    unpublished = set()
+    for entry in batch:
+        if entry["Id"] not in failed_ids:
+            continue
+        try:
+            sns_client.publish(TopicArn=ALERTS_TOPIC_ARN, Subject=entry["Subject"], Message=entry["Message"])
+            published += 1
+        except ClientError as error:  # pragma: no cover
+            logger.error("Failed to publish alert: %s", error)
+            unpublished.add(entry["Id"])
+
+    return published, unpublished
+
+
+def _format_epoch(value: Any) -> str:
+    if not value:
+        return "unknown"
+    return datetime.utcfromtimestamp(int(value)).strftime("%Y-%m-%d %H:%M UTC")
 
 
 def _to_float(value: Any) -> float:
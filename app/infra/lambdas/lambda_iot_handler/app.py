@@ -1,24 +1,99 @@
+import base64
 import json
-import boto3
 import os
-from datetime import datetime
+import time
+from collections import OrderedDict
 from decimal import Decimal
-import re
 
-# Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+from aws_clients import get_region, get_table
+from readings import format_reading, latest_state_item
+from botocore.exceptions import ClientError
+
+# Initialize DynamoDB table (shared, tuned connection pool)
 table_name = os.environ.get('DYNAMODB_TABLE', 'SmartGrowData')
-table = dynamodb.Table(table_name)
+table = get_table(table_name)
 
 # Get AWS region from Lambda environment (automatically set by AWS)
-aws_region = os.environ.get('AWS_REGION', 'us-east-1')
+aws_region = get_region()
+
+# Warm-container LRU cache: plot_id -> (expires_at, metadata or None)
+PLOT_METADATA_CACHE_SIZE = int(os.environ.get('PLOT_METADATA_CACHE_SIZE', '1024'))
+PLOT_METADATA_CACHE_TTL = float(os.environ.get('PLOT_METADATA_CACHE_TTL', '300'))
+# "Not found" expires much sooner: a plot created right after a reading must
+# not keep getting FACILITY#UNKNOWN for the full TTL
+PLOT_METADATA_MISS_TTL = float(os.environ.get('PLOT_METADATA_MISS_TTL', '10'))
+_plot_metadata_cache = OrderedDict()
 
 def lambda_handler(event, context):
     """
     Lambda handler for IoT messages
     Processes messages from system/plot/+ topics
     Uses single-table design pattern with PK/SK
+
+    Besides a single reading, the event may carry a batch of readings:
+    - a JSON array of readings
+    - {"readings": [...], ...} where the other fields (plot_id, facility_id...)
+      are defaults for every reading
+    - a "Records" envelope (SQS body / Kinesis data holding any of the above)
     """
+    if not is_batch_event(event):
+        return handle_single_reading(event)
+
+    try:
+        readings, failed_records = extract_readings(event)
+    except Exception as e:
+        print(f"Error parsing batch event: {str(e)}")
+        if 'Records' in event:
+            # A 400 would mark every record as delivered: let the source retry
+            raise
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(e)})
+        }
+
+    print(f"Received batch with {len(readings)} readings")
+
+    items = []
+    errors = 0
+    for record_id, reading in readings:
+        try:
+            plot_id = extract_plot_id_from_event(reading) or "UNKNOWN"
+            items.append(format_for_dynamodb(reading, plot_id))
+        except Exception as e:
+            errors += 1
+            print(f"Error formatting reading: {str(e)}")
+            if record_id is not None:
+                failed_records.add(record_id)
+
+    try:
+        save_items(items)
+    except Exception as e:
+        print(f"Error writing batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        if 'Records' in event:
+            # Let the event source retry the whole batch
+            raise
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+    print(f"Successfully saved {len(items)} items to DynamoDB ({errors} readings rejected)")
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Batch saved successfully',
+            'saved': len(items),
+            'rejected': errors
+        }),
+        # SQS partial batch response (ReportBatchItemFailures)
+        'batchItemFailures': [{'itemIdentifier': record_id} for record_id in sorted(failed_records)]
+    }
+
+
+def handle_single_reading(event):
     print(f"Received event: {json.dumps(event, default=str)}")
     
     try:
@@ -37,6 +112,10 @@ def lambda_handler(event, context):
         response = table.put_item(Item=item)
         
         print(f"Successfully saved item to DynamoDB: pk={item['pk']}, sk={item['sk']}")
+
+        # Keep PLOT#<id> / LATEST pointing at the newest state reading
+        if item['sk'].startswith('STATE#'):
+            update_latest_state(item)
         
         return {
             'statusCode': 200,
@@ -57,6 +136,113 @@ def lambda_handler(event, context):
         }
 
 
+def is_batch_event(event):
+    return isinstance(event, list) or (
+        isinstance(event, dict) and ('Records' in event or 'readings' in event)
+    )
+
+
+def extract_readings(event):
+    """
+    Flatten a batch event into a list of (record_id, reading) pairs.
+
+    record_id is the SQS messageId / Kinesis sequence number of the record the
+    reading came from (None for direct invocations). Also returns the set of
+    record ids whose payload could not be decoded or expanded.
+    """
+    readings = []
+    failed_records = set()
+
+    if isinstance(event, dict) and 'Records' in event:
+        for record in event['Records']:
+            record_id = record.get('messageId') or record.get('kinesis', {}).get('sequenceNumber')
+            try:
+                record_readings = expand_payload(decode_record(record))
+            except (ValueError, TypeError) as e:
+                # Only this record is reported as failed, the rest of the batch is saved
+                print(f"Could not decode record {record_id}: {e}")
+                if record_id is not None:
+                    failed_records.add(record_id)
+                continue
+            readings.extend((record_id, reading) for reading in record_readings)
+    else:
+        readings.extend((None, reading) for reading in expand_payload(event))
+
+    return readings, failed_records
+
+
+def decode_record(record):
+    """Payload of an SQS or Kinesis record (or the record itself)."""
+    if 'body' in record:
+        return json.loads(record['body'], parse_float=Decimal)
+    if 'kinesis' in record:
+        return json.loads(base64.b64decode(record['kinesis']['data']), parse_float=Decimal)
+    return record
+
+
+def expand_payload(payload):
+    """Readings of a payload: a list, a {"readings": [...]} envelope, or a single reading."""
+    if isinstance(payload, list):
+        return [reading for element in payload for reading in expand_payload(element)]
+    if not isinstance(payload, dict):
+        raise TypeError(f"Unexpected payload type: {type(payload).__name__}")
+    if 'readings' in payload:
+        defaults = {k: v for k, v in payload.items() if k != 'readings'}
+        readings = payload['readings']
+        if not isinstance(readings, list) or not all(isinstance(reading, dict) for reading in readings):
+            raise TypeError("'readings' must be a list of objects")
+        return [{**defaults, **reading} for reading in readings]
+    return [payload]
+
+
+def save_items(items):
+    """
+    Write formatted items with batch_writer (25 per BatchWriteItem, unprocessed
+    items are resent by boto3) and refresh LATEST once per plot with the newest
+    state of the batch.
+    """
+    if not items:
+        return
+
+    with table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+    newest = {}
+    for item in items:
+        if item['sk'].startswith('STATE#'):
+            current = newest.get(item['pk'])
+            if current is None or current['Timestamp'] < item['Timestamp']:
+                newest[item['pk']] = item
+
+    for item in newest.values():
+        update_latest_state(item)
+
+
+def update_latest_state(item):
+    """
+    Upsert PLOT#<plot_id> / LATEST with a copy of the given STATE# item.
+
+    The write is conditional on the timestamp so a late or replayed reading
+    never overwrites a newer one. GSI attributes are dropped so LATEST does
+    not show up in the facility time-series index.
+    """
+    latest = latest_state_item(item)
+
+    try:
+        table.put_item(
+            Item=latest,
+            ConditionExpression='attribute_not_exists(pk) OR #ts < :ts',
+            ExpressionAttributeNames={'#ts': 'Timestamp'},
+            ExpressionAttributeValues={':ts': item['Timestamp']}
+        )
+        print(f"Updated latest state for {item['pk']} at {item['Timestamp']}")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        print(f"Latest state for {item['pk']} is newer than {item['Timestamp']}, not updated")
+
+
 def extract_plot_id_from_event(event):
     """
     Extract plot_id from event
@@ -66,98 +252,104 @@ def extract_plot_id_from_event(event):
 
 
 def get_plot_metadata(plot_id):
-    """Fetch plot metadata from DynamoDB to get facility_id, species, and name"""
+    """
+    Resolve plot_id -> {facility_id, species, name}.
+
+    Results are kept in a warm-container LRU cache, so most readings need no
+    DynamoDB call at all; a miss costs one GetItem on PLOT#<plot_id> / Metadata.
+    "Not found" is cached too, but only for PLOT_METADATA_MISS_TTL.
+    """
+    now = time.monotonic()
+    cached = _plot_metadata_cache.get(plot_id)
+    if cached is not None and cached[0] > now:
+        _plot_metadata_cache.move_to_end(plot_id)
+        return cached[1]
+
     try:
-        print(f"Fetching metadata for plot_id: {plot_id}")
-        
-        # Method 1: Scan with filter (most reliable - finds the FACILITY#/PLOT# record)
-        response = table.scan(
-            FilterExpression='plot_id = :plot_id AND #type = :type',
-            ExpressionAttributeNames={'#type': 'type'},
-            ExpressionAttributeValues={
-                ':plot_id': plot_id,
-                ':type': 'PLOT'
-            }
-        )
-        
+        metadata = load_plot_metadata(plot_id)
+    except Exception as e:
+        # Do not cache failures; the next reading retries the lookup
+        print(f"Error fetching plot metadata for {plot_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+    ttl = PLOT_METADATA_CACHE_TTL if metadata else PLOT_METADATA_MISS_TTL
+    _plot_metadata_cache[plot_id] = (now + ttl, metadata)
+    _plot_metadata_cache.move_to_end(plot_id)
+    while len(_plot_metadata_cache) > PLOT_METADATA_CACHE_SIZE:
+        _plot_metadata_cache.popitem(last=False)
+    return metadata
+
+
+def load_plot_metadata(plot_id):
+    """Fetch plot metadata from the PLOT#<plot_id> / Metadata lookup item."""
+    print(f"Fetching metadata for plot_id: {plot_id}")
+
+    response = table.get_item(Key={'pk': f'PLOT#{plot_id}', 'sk': 'Metadata'})
+    lookup = response.get('Item')
+    if lookup:
+        metadata = {
+            'facility_id': lookup.get('facility_id'),
+            'species': lookup.get('species_id'),
+            'name': lookup.get('name')
+        }
+        print(f"Found metadata via lookup item: {metadata}")
+        return metadata
+
+    # Plots created before the lookup item existed: find the FACILITY#/PLOT#
+    # record among the PLOT items (not the whole table) and backfill the lookup
+    print(f"No lookup item for plot {plot_id}, searching GSI_TypeIndex...")
+    query = {
+        'IndexName': 'GSI_TypeIndex',
+        'KeyConditionExpression': '#type = :type',
+        'FilterExpression': 'plot_id = :plot_id',
+        'ExpressionAttributeNames': {'#type': 'type'},
+        'ExpressionAttributeValues': {
+            ':type': 'PLOT',
+            ':plot_id': plot_id
+        }
+    }
+    while True:
+        response = table.query(**query)
         items = response.get('Items', [])
         if items:
             plot = items[0]
-            metadata = {
+            table.put_item(Item={
+                'pk': f'PLOT#{plot_id}',
+                'sk': 'Metadata',
+                'plot_id': plot_id,
                 'facility_id': plot.get('facility_id'),
-                'species': plot.get('species'),
+                'species_id': plot.get('species'),
                 'name': plot.get('name')
-            }
-            print(f"Found metadata via scan: {metadata}")
-            return metadata
-        
-        # Method 2: Try GSI_TypeIndex query with filter (fallback)
-        print(f"Scan returned no results, trying GSI query...")
-        response = table.query(
-            IndexName='GSI_TypeIndex',
-            KeyConditionExpression='#type = :type',
-            FilterExpression='plot_id = :plot_id',
-            ExpressionAttributeNames={'#type': 'type'},
-            ExpressionAttributeValues={
-                ':type': 'PLOT',
-                ':plot_id': plot_id
-            }
-        )
-        
-        items = response.get('Items', [])
-        if items:
-            plot = items[0]
+            })
             metadata = {
                 'facility_id': plot.get('facility_id'),
                 'species': plot.get('species'),
                 'name': plot.get('name')
             }
-            print(f"Found metadata via GSI: {metadata}")
+            print(f"Found metadata via GSI and backfilled lookup item: {metadata}")
             return metadata
-        
-        print(f"No metadata found for plot_id: {plot_id}")
-        
-    except Exception as e:
-        print(f"Error fetching plot metadata for {plot_id}: {e}")
-        import traceback
-        traceback.print_exc()
-    
+        if 'LastEvaluatedKey' not in response:
+            break
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"No metadata found for plot_id: {plot_id}")
     return None
 
 
 def format_for_dynamodb(payload, plot_id):
     """
-    Format the payload for DynamoDB using Single-Table Design
-    
-    Handles two types of messages:
-    1. "state" - Sensor data readings (sensor_data field or sensor fields)
-    2. "event" - Events like irrigation (event_type or irrigation fields)
-    
-    DynamoDB structure:
-    - pk: PLOT#<plot_id>
-    - sk: STATE#<timestamp> or EVENT#<timestamp>
-    - GSI_PK: FACILITY#<facility_id>
-    - GSI_SK: TIMESTAMP#<timestamp>
-    - Type-specific data as top-level attributes
+    Format the payload for DynamoDB using Single-Table Design.
+
+    The item shape (STATE#/EVENT# sk, GSI_PK/GSI_SK, attributes) lives in the
+    shared readings.py so bulk imports write exactly the same items; here
+    the payload is only completed with the plot metadata when it has no
+    facility_id.
     """
-    # Use provided timestamp or generate new one automatically
-    if 'timestamp' in payload and payload['timestamp']:
-        timestamp = payload['timestamp']
-    else:
-        timestamp = datetime.utcnow().isoformat() + 'Z'
-        print(f"Generated automatic timestamp: {timestamp}")
-    
-    # Auto-detect message type based on content
-    # If it has event_type or irrigation fields, it's an event
-    # If it has sensor_data or sensor fields, it's state
-    if 'event_type' in payload or 'duration' in payload or 'water_amount' in payload:
-        message_type = 'event'
-        print(f"Auto-detected message type: event (irrigation)")
-    elif 'type' in payload:
-        message_type = payload['type']
-    else:
-        message_type = 'state'  # default for backwards compatibility
-    
+    if not payload.get('timestamp'):
+        print("No timestamp in payload, using current time")
+
     # If facility_id is not in payload, fetch it from plot metadata
     if 'facility_id' not in payload or not payload.get('facility_id'):
         print(f"facility_id not in payload, fetching from plot metadata for plot {plot_id}")
@@ -170,95 +362,5 @@ def format_for_dynamodb(payload, plot_id):
                 payload['species_id'] = plot_metadata['species']
             if plot_metadata.get('name') and 'plot_name' not in payload:
                 payload['plot_name'] = plot_metadata['name']
-    
-    # Convert numeric values to Decimal for DynamoDB compatibility
-    def convert_to_decimal(obj):
-        if isinstance(obj, float):
-            return Decimal(str(obj))
-        elif isinstance(obj, dict):
-            return {k: convert_to_decimal(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_to_decimal(item) for item in obj]
-        else:
-            return obj
-    
-    # Helper to convert metadata values (including numbers) to DynamoDB-compatible types
-    def convert_scalar(value):
-        if isinstance(value, float):
-            return Decimal(str(value))
-        if isinstance(value, dict):
-            return convert_to_decimal(value)
-        if isinstance(value, list):
-            return [convert_scalar(item) for item in value]
-        return value
-
-    # Create base DynamoDB item
-    item = {
-        'pk': f'PLOT#{plot_id}',
-        'Timestamp': timestamp,
-        'GSI_SK': f'TIMESTAMP#{timestamp}',
-    }
-    
-    # Preserve metadata (Species, Facility, Business, etc.)
-    metadata_map = {
-        'SpeciesId': 'SpeciesId',
-        'species_id': 'SpeciesId',
-        'FacilityId': 'FacilityId',
-        'facility_id': 'FacilityId',
-        'BusinessId': 'BusinessId',
-        'business_id': 'BusinessId',
-        'PlotName': 'PlotName',
-        'plot_name': 'PlotName',
-    }
-
-    for source_key, target_key in metadata_map.items():
-        if source_key in payload and payload[source_key] not in (None, ''):
-            item[target_key] = convert_scalar(payload[source_key])
-
-    # Add plot_id (snake_case) for backend compatibility
-    item['plot_id'] = plot_id
-    # Also keep PlotId (PascalCase) for backwards compatibility
-    item['PlotId'] = plot_id
-
-    # Set facility-based GSI partition key if available
-    facility_id = item.get('FacilityId')
-    if facility_id:
-        item['GSI_PK'] = f'FACILITY#{facility_id}'
-    else:
-        item['GSI_PK'] = 'FACILITY#UNKNOWN'
-    
-    # Process based on message type
-    if message_type == 'state':
-        # STATE message: sensor readings
-        item['sk'] = f'STATE#{timestamp}'
-        sensor_data = payload.get('sensor_data', {})
-        sensor_data_converted = convert_to_decimal(sensor_data)
-        if isinstance(sensor_data_converted, dict):
-            item.update(sensor_data_converted)
-    
-    elif message_type == 'event':
-        # EVENT message: irrigation, alerts, etc.
-        item['sk'] = f'EVENT#{timestamp}'
-        
-        # Map irrigation fields to DynamoDB format (both snake_case and PascalCase)
-        irrigation_field_map = {
-            'event_type': 'EventType',
-            'duration': 'Duration',
-            'water_amount': 'WaterAmount',
-            'type': 'IrrigationType',  # Changed from 'type' to avoid conflict
-        }
-        
-        # Add all event fields to the item
-        for key, value in payload.items():
-            if key not in ['plot_id', 'timestamp', 'facility_id', 'species_id', 'business_id', 'plot_name']:
-                # Use mapped name if available, otherwise use original key
-                target_key = irrigation_field_map.get(key, key)
-                item[target_key] = convert_to_decimal(value)
-    
-    else:
-        # Unknown type, use generic sk
-        item['sk'] = f'DATA#{timestamp}'
-        print(f"Warning: Unknown message type '{message_type}'")
-    
-    return item
 
+    return format_reading(payload, plot_id)
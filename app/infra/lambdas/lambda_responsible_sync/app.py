@@ -1,20 +1,22 @@
 import logging
 import os
-from typing import Any, Dict, Optional, Sequence, Set
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
-import boto3
-from boto3.dynamodb.types import TypeDeserializer
+from aws_clients import get_client
 from botocore.exceptions import ClientError
+from dynamo_stream import StreamRecord, StreamRouter
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-deserializer = TypeDeserializer()
-
-sns_client = boto3.client("sns")
+sns_client = get_client("sns")
 
 ALERTS_TOPIC_ARN = os.environ["ALERTS_TOPIC_ARN"]
 
+# Concurrent subscribe/unsubscribe calls; the shared client pool (aws_clients) holds 64 connections
+SNS_SYNC_MAX_WORKERS = int(os.environ.get("SNS_SYNC_MAX_WORKERS", "16"))
+
 # Attribute names we will consider when extracting responsible emails
 RESPONSIBLE_ATTRIBUTES: Sequence[str] = (
     "responsibles",
@@ -33,57 +35,73 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
     Triggered by DynamoDB Streams on records where:
     - PK = FACILITY#{facility_id}
     - SK = RESPONSIBLES
-    """
-    logger.info("Received %d stream records", len(event.get("Records", [])))
-
-    for record in event.get("Records", []):
-        event_name = record.get("eventName")
-        dynamodb_record = record.get("dynamodb", {})
-
-        pk = _get_key_value(dynamodb_record, "pk")
-        sk = _get_key_value(dynamodb_record, "sk")
-
-        if not pk or not sk:
-            logger.debug("Record without pk/sk, skipping: %s", record)
-            continue
-
-        # New structure: PK = FACILITY#{facility_id}, SK = RESPONSIBLES
-        if not pk.startswith("FACILITY#") or sk != "RESPONSIBLES":
-            logger.debug("Record does not match FACILITY#/RESPONSIBLES pattern, skipping")
-            continue
-
-        facility_id = pk.split("#", maxsplit=1)[-1]
-
-        new_emails = _extract_emails(dynamodb_record.get("NewImage"))
-        old_emails = _extract_emails(dynamodb_record.get("OldImage"))
 
+    Several edits of the same facility in one batch collapse into a single
+    net diff (oldest OldImage -> newest NewImage), and the subscribe/unsubscribe
+    calls of the whole batch run on a bounded thread pool.
+    """
+    records = event.get("Records", [])
+    logger.info("Received %d stream records", len(records))
+
+    # facility_id -> [emails before the batch, emails after the batch]
+    facilities: Dict[str, List[Set[str]]] = {}
+
+    def collect_responsibles(record: StreamRecord) -> None:
+        new_emails = _extract_emails(record.new_image)
+        state = facilities.get(record.pk_id)
+        if state is None:
+            # Stream records of a key arrive in order: the first OldImage is the pre-batch state
+            facilities[record.pk_id] = [_extract_emails(record.old_image), new_emails]
+        else:
+            state[1] = new_emails
+
+    # Only the Keys of each record are decoded before routing; the images are
+    # deserialized for FACILITY#/RESPONSIBLES records alone. Unexpected errors
+    # propagate so Lambda retries the batch, as before.
+    router = StreamRouter()
+    router.add(collect_responsibles, "FACILITY#", sk="RESPONSIBLES", raise_errors=True, name="responsibles")
+    router.dispatch(records)
+
+    to_add: Set[str] = set()
+    to_remove: Set[str] = set()
+    for facility_id, (old_emails, new_emails) in facilities.items():
         logger.info(
-            "Processing %s for facility=%s (new=%s old=%s)",
-            event_name,
+            "Facility %s responsibles: new=%s old=%s",
             facility_id,
             sorted(new_emails),
             sorted(old_emails),
         )
+        to_add |= new_emails - old_emails
+        to_remove |= old_emails - new_emails
 
-        _sync_subscriptions(new_emails, old_emails)
+    # All facilities share one topic: an email added anywhere in the batch stays subscribed
+    to_remove -= to_add
 
-    return {"statusCode": 200}
+    _sync_subscriptions(to_add, to_remove)
 
+    return {
+        "statusCode": 200,
+        "facilities": len(facilities),
+        "subscribed": len(to_add),
+        "unsubscribed": len(to_remove),
+    }
 
-def _sync_subscriptions(new_emails: Set[str], old_emails: Set[str]) -> None:
-    """Create or delete SNS subscriptions to match the provided email sets."""
-    to_add = new_emails - old_emails
-    to_remove = old_emails - new_emails
+
+def _sync_subscriptions(to_add: Set[str], to_remove: Set[str]) -> None:
+    """Create and delete SNS subscriptions in parallel; the topic is listed at most once."""
+    calls: List[Tuple[str, str, Callable[..., Any], Dict[str, Any]]] = []
 
     if to_add:
         logger.info("Adding subscriptions: %s", sorted(to_add))
         for email in to_add:
-            try:
-                sns_client.subscribe(
-                    TopicArn=ALERTS_TOPIC_ARN, Protocol="email", Endpoint=email
+            calls.append(
+                (
+                    "subscribe",
+                    email,
+                    sns_client.subscribe,
+                    {"TopicArn": ALERTS_TOPIC_ARN, "Protocol": "email", "Endpoint": email},
                 )
-            except ClientError as error:  # pragma: no cover
-                logger.error("Failed to subscribe %s: %s", email, error)
+            )
 
     if to_remove:
         logger.info("Removing subscriptions: %s", sorted(to_remove))
@@ -100,10 +118,19 @@ def _sync_subscriptions(new_emails: Set[str], old_emails: Set[str]) -> None:
                 )
                 continue
 
+            calls.append(("unsubscribe", email, sns_client.unsubscribe, {"SubscriptionArn": subscription_arn}))
+
+    if not calls:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(SNS_SYNC_MAX_WORKERS, len(calls))) as executor:
+        futures = {executor.submit(call, **params): (action, email) for action, email, call, params in calls}
+        for future in as_completed(futures):
+            action, email = futures[future]
             try:
-                sns_client.unsubscribe(SubscriptionArn=subscription_arn)
+                future.result()
             except ClientError as error:  # pragma: no cover
-                logger.error("Failed to unsubscribe %s: %s", email, error)
+                logger.error("Failed to %s %s: %s", action, email, error)
 
 
 def _list_topic_subscriptions() -> Dict[str, str]:
@@ -133,14 +160,13 @@ def _list_topic_subscriptions() -> Dict[str, str]:
 
 
 def _extract_emails(image: Optional[Dict[str, Any]]) -> Set[str]:
-    """Extract a set of emails from a DynamoDB Streams image."""
+    """Extract a set of emails from a deserialized DynamoDB Streams image."""
     if not image:
         return set()
 
-    python_dict = _deserialize_image(image)
     for key in RESPONSIBLE_ATTRIBUTES:
-        if key in python_dict:
-            raw_value = python_dict[key]
+        if key in image:
+            raw_value = image[key]
             if isinstance(raw_value, str):
                 return {
                     email.strip().lower()
@@ -155,18 +181,3 @@ def _extract_emails(image: Optional[Dict[str, Any]]) -> Set[str]:
                 }
 
     return set()
-
-
-def _deserialize_image(image: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert DynamoDB Streams attribute map to a native Python dict."""
-    return {key: deserializer.deserialize(value) for key, value in image.items()}
-
-
-def _get_key_value(dynamodb_record: Dict[str, Any], key_name: str) -> Optional[str]:
-    """Fetch the primary key value (pk/sk) from a DynamoDB stream record."""
-    keys = dynamodb_record.get("Keys")
-    if not keys or key_name not in keys:
-        return None
-    value = deserializer.deserialize(keys[key_name])
-    return str(value) if value is not None else None
-
@@ -0,0 +1,263 @@
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from aws_clients import get_table
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from dynamo_stream import StreamRecord, StreamRouter
+from usage_days import (
+    add_event,
+    empty_stats,
+    event_projection,
+    plot_usage_item,
+    remove_facility_usage,
+    set_facility_usage,
+    usage_sk,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+table = get_table(os.environ["DYNAMO_TABLE_NAME"])
+
+METRICS: Tuple[str, ...] = ("temperature", "humidity", "soil_moisture", "light")
+
+HOURLY = "1h"
+DAILY = "1d"
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    DynamoDB Streams handler that keeps hourly and daily rollups per plot,
+    plus daily irrigation water usage per plot and per facility.
+
+    Rollup items live next to the raw readings:
+    - PK = PLOT#{plot_id}, SK = ROLLUP#1h#YYYY-MM-DDTHH:00:00Z
+    - PK = PLOT#{plot_id}, SK = ROLLUP#1d#YYYY-MM-DDT00:00:00Z
+    - PK = PLOT#{plot_id}, SK = USAGE#1d#YYYY-MM-DD
+    - PK = FACILITY#{facility_id}, SK = USAGE#1d#YYYY-MM-DD (one map entry per plot)
+
+    Each touched hour is rebuilt from its raw STATE# readings, each touched
+    day from its hourly rollups and each usage day from its raw EVENT# items,
+    so replaying the same stream records always produces the same items
+    (idempotent under redelivery).
+    """
+    records = event.get("Records", [])
+    logger.info("Received %d DynamoDB stream records", len(records))
+
+    hours: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def collect_hour(record: StreamRecord) -> None:
+        touched = _touched_hour(record)
+        if touched is not None:
+            key, facility_id = touched
+            hours[key] = hours.get(key) or facility_id
+
+    usage_days: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def collect_usage_day(record: StreamRecord) -> None:
+        day = record.sk.split("#", maxsplit=1)[-1][:10]
+        if len(day) < 10:
+            logger.warning("Unexpected timestamp in %s/%s, skipping", record.pk, record.sk)
+            return
+        key = (record.pk_id, day)
+        usage_days[key] = usage_days.get(key) or _event_facility_id(record)
+
+    router = StreamRouter()
+    router.add(collect_hour, "PLOT#", sk_prefix="STATE#", events=("INSERT", "MODIFY"), name="plot_state")
+    router.add(collect_usage_day, "PLOT#", sk_prefix="EVENT#", name="irrigation_event")
+    router.dispatch(records)
+
+    days: Dict[Tuple[str, str], Optional[str]] = {}
+    for (plot_id, hour), facility_id in hours.items():
+        try:
+            _rebuild_hour(plot_id, hour, facility_id)
+        except ClientError as error:
+            logger.error("Failed to rebuild hourly rollup %s/%s: %s", plot_id, hour, error)
+            raise
+        day = hour[:10]
+        days[(plot_id, day)] = days.get((plot_id, day)) or facility_id
+
+    for (plot_id, day), facility_id in days.items():
+        try:
+            _rebuild_day(plot_id, day, facility_id)
+        except ClientError as error:
+            logger.error("Failed to rebuild daily rollup %s/%s: %s", plot_id, day, error)
+            raise
+
+    for (plot_id, day), facility_id in usage_days.items():
+        try:
+            _rebuild_usage_day(plot_id, day, facility_id)
+        except ClientError as error:
+            logger.error("Failed to rebuild water usage %s/%s: %s", plot_id, day, error)
+            raise
+
+    logger.info(
+        "Rebuilt %d hourly and %d daily rollups, %d usage days",
+        len(hours),
+        len(days),
+        len(usage_days),
+    )
+    return {
+        "statusCode": 200,
+        "hourly_rollups": len(hours),
+        "daily_rollups": len(days),
+        "usage_days": len(usage_days),
+    }
+
+
+def _touched_hour(record: StreamRecord) -> Optional[Tuple[Tuple[str, str], Optional[str]]]:
+    """Return ((plot_id, hour_prefix), facility_id) for a STATE# record, None otherwise."""
+    timestamp = record.sk.split("#", maxsplit=1)[-1]
+    # Hour prefix of an ISO timestamp: YYYY-MM-DDTHH
+    if len(timestamp) < 13:
+        logger.warning("Unexpected timestamp in %s/%s, skipping", record.pk, record.sk)
+        return None
+
+    # Only FacilityId is read from NewImage; the rest of the image is never deserialized
+    facility_id = record.new_value("FacilityId")
+    return (record.pk_id, timestamp[:13]), str(facility_id) if facility_id is not None else None
+
+
+def _query_all(**kwargs) -> Iterable[Dict[str, Any]]:
+    """Yield every item of a query, following LastEvaluatedKey."""
+    while True:
+        response = table.query(**kwargs)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _empty_stats() -> Dict[str, Dict[str, Any]]:
+    return {metric: {"count": 0, "sum": Decimal(0), "min": None, "max": None} for metric in METRICS}
+
+
+def _merge(stats: Dict[str, Any], count: int, total: Decimal, low: Decimal, high: Decimal) -> None:
+    stats["count"] += count
+    stats["sum"] += total
+    stats["min"] = low if stats["min"] is None else min(stats["min"], low)
+    stats["max"] = high if stats["max"] is None else max(stats["max"], high)
+
+
+def _rebuild_hour(plot_id: str, hour: str, facility_id: Optional[str]) -> None:
+    """Recompute ROLLUP#1h from the raw STATE# readings of that hour."""
+    stats = _empty_stats()
+    readings = 0
+
+    for item in _query_all(
+        KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with(f"STATE#{hour}"),
+        ProjectionExpression="#fid, " + ", ".join(f"#{metric}" for metric in METRICS),
+        ExpressionAttributeNames={"#fid": "FacilityId", **{f"#{metric}": metric for metric in METRICS}},
+    ):
+        readings += 1
+        facility_id = facility_id or item.get("FacilityId")
+        for metric in METRICS:
+            value = item.get(metric)
+            if isinstance(value, (Decimal, int)):
+                value = Decimal(value)
+                _merge(stats[metric], 1, value, value, value)
+
+    _write_rollup(plot_id, HOURLY, f"{hour}:00:00Z", stats, readings, facility_id)
+
+
+def _rebuild_day(plot_id: str, day: str, facility_id: Optional[str]) -> None:
+    """Recompute ROLLUP#1d by combining the hourly rollups of that day."""
+    stats = _empty_stats()
+    readings = 0
+
+    for item in _query_all(
+        KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with(f"ROLLUP#{HOURLY}#{day}"),
+    ):
+        readings += int(item.get("readings", 0))
+        facility_id = facility_id or item.get("FacilityId")
+        for metric in METRICS:
+            hourly = item.get(metric)
+            if hourly and hourly.get("count"):
+                _merge(stats[metric], int(hourly["count"]), hourly["sum"], hourly["min"], hourly["max"])
+
+    _write_rollup(plot_id, DAILY, f"{day}T00:00:00Z", stats, readings, facility_id)
+
+
+def _write_rollup(
+    plot_id: str,
+    resolution: str,
+    bucket_start: str,
+    stats: Dict[str, Dict[str, Any]],
+    readings: int,
+    facility_id: Optional[str],
+) -> None:
+    key = {"pk": f"PLOT#{plot_id}", "sk": f"ROLLUP#{resolution}#{bucket_start}"}
+
+    if readings == 0:
+        # The source readings are gone; drop the rollup instead of keeping stale numbers
+        table.delete_item(Key=key)
+        return
+
+    item: Dict[str, Any] = {
+        **key,
+        "plot_id": plot_id,
+        "resolution": resolution,
+        "bucket_start": bucket_start,
+        "readings": readings,
+        "updated_at": datetime.utcnow().isoformat() + "Z",
+    }
+    if facility_id:
+        item["FacilityId"] = facility_id
+
+    for metric, values in stats.items():
+        if values["count"]:
+            item[metric] = values
+
+    table.put_item(Item=item)
+
+
+def _event_facility_id(record: StreamRecord) -> Optional[str]:
+    """FacilityId of an EVENT# record (GSI_PK as fallback); REMOVE records only carry OldImage."""
+    value = record.old_value if record.event_name == "REMOVE" else record.new_value
+    facility_id = value("FacilityId")
+    if not facility_id:
+        gsi_pk = value("GSI_PK")
+        if isinstance(gsi_pk, str) and gsi_pk.startswith("FACILITY#"):
+            facility_id = gsi_pk.split("#", maxsplit=1)[-1]
+    if not facility_id or facility_id == "UNKNOWN":
+        return None
+    return str(facility_id)
+
+
+def _plot_facility_id(plot_id: str) -> Optional[str]:
+    """Facility of a plot from its PLOT#{plot_id} / Metadata lookup item."""
+    response = table.get_item(
+        Key={"pk": f"PLOT#{plot_id}", "sk": "Metadata"},
+        ProjectionExpression="facility_id",
+    )
+    return response.get("Item", {}).get("facility_id")
+
+
+def _rebuild_usage_day(plot_id: str, day: str, facility_id: Optional[str]) -> None:
+    """Recompute USAGE#1d for a plot from its raw EVENT# items of that day."""
+    stats = empty_stats()
+
+    for item in _query_all(
+        KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with(f"EVENT#{day}"),
+        **event_projection(),
+    ):
+        facility_id = facility_id or item.get("FacilityId")
+        add_event(stats, item)
+
+    facility_id = facility_id or _plot_facility_id(plot_id)
+
+    if stats["events"] == 0:
+        table.delete_item(Key={"pk": f"PLOT#{plot_id}", "sk": usage_sk(day)})
+        if facility_id:
+            remove_facility_usage(table, facility_id, day, plot_id)
+        return
+
+    now = datetime.utcnow().isoformat() + "Z"
+    table.put_item(Item=plot_usage_item(plot_id, day, stats, facility_id, now))
+
+    if facility_id:
+        set_facility_usage(table, facility_id, day, plot_id, stats, now)
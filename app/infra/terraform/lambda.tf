@@ -7,7 +7,13 @@ module "lambda_iot_handler" {
   function_name = var.lambda_function_name
   description   = "IoT Handler Lambda - Processes messages from system/plot/+ topics"
 
-  source_path = var.lambda_source_path
+  source_path = [
+    var.lambda_source_path,
+    {
+      path     = var.lambda_shared_source_path
+      patterns = ["!.*", "aws_clients\\.py", "readings\\.py"]
+    },
+  ]
   handler     = var.lambda_handler
   runtime     = var.lambda_runtime
 
@@ -23,7 +23,13 @@ module "lambda_alert_processor" {
 
   handler     = var.alert_lambda_handler
   runtime     = var.alert_lambda_runtime
-  source_path = var.alert_lambda_source_path
+  source_path = [
+    var.alert_lambda_source_path,
+    {
+      path     = var.lambda_shared_source_path
+      patterns = ["!.*", "aws_clients\\.py", "dynamo_stream\\.py"]
+    },
+  ]
 
   timeout     = var.alert_lambda_timeout
   memory_size = var.alert_lambda_memory_size
@@ -32,8 +38,12 @@ module "lambda_alert_processor" {
   lambda_role = var.lab_role_arn
 
   environment_variables = {
-    DYNAMO_TABLE_NAME  = module.dynamodb_table.table_name
-    ALERTS_TOPIC_ARN   = aws_sns_topic.alerts.arn
+    DYNAMO_TABLE_NAME        = module.dynamodb_table.table_name
+    ALERTS_TOPIC_ARN         = aws_sns_topic.alerts.arn
+    ITEM_CACHE_TTL_SECONDS   = var.alert_lambda_cache_ttl_seconds
+    ALERT_HYSTERESIS_PERCENT = var.alert_lambda_hysteresis_percent
+    ALERT_COOLDOWN_SECONDS   = var.alert_lambda_cooldown_seconds
+    ALERT_REMINDER_SECONDS   = var.alert_lambda_reminder_seconds
   }
 
   cloudwatch_logs_retention_in_days = var.alert_lambda_log_retention_days
@@ -9,7 +9,13 @@ module "lambda_responsible_sync" {
 
   handler     = var.responsible_sync_lambda_handler
   runtime     = var.responsible_sync_lambda_runtime
-  source_path = var.responsible_sync_lambda_source_path
+  source_path = [
+    var.responsible_sync_lambda_source_path,
+    {
+      path     = var.lambda_shared_source_path
+      patterns = ["!.*", "aws_clients\\.py", "dynamo_stream\\.py"]
+    },
+  ]
 
   timeout     = var.responsible_sync_lambda_timeout
   memory_size = var.responsible_sync_lambda_memory_size
@@ -18,7 +24,8 @@ module "lambda_responsible_sync" {
   lambda_role = var.lab_role_arn
 
   environment_variables = {
-    ALERTS_TOPIC_ARN = aws_sns_topic.alerts.arn
+    ALERTS_TOPIC_ARN     = aws_sns_topic.alerts.arn
+    SNS_SYNC_MAX_WORKERS = var.responsible_sync_lambda_max_workers
   }
 
   cloudwatch_logs_retention_in_days = var.responsible_sync_lambda_log_retention_days
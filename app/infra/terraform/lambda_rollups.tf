@@ -0,0 +1,101 @@
+##############################################
+# Lambda Function - Hourly/Daily Rollups
+##############################################
+module "lambda_rollup_processor" {
+  source = "./modules/lambda"
+
+  function_name = var.rollup_lambda_function_name
+  description   = "Maintains hourly and daily ROLLUP items per plot from the DynamoDB stream"
+
+  handler     = var.rollup_lambda_handler
+  runtime     = var.rollup_lambda_runtime
+  source_path = [
+    var.rollup_lambda_source_path,
+    {
+      path     = var.lambda_shared_source_path
+      patterns = ["!.*", "aws_clients\\.py", "dynamo_stream\\.py", "usage_days\\.py"]
+    },
+  ]
+
+  timeout     = var.rollup_lambda_timeout
+  memory_size = var.rollup_lambda_memory_size
+
+  create_role = false
+  lambda_role = var.lab_role_arn
+
+  environment_variables = {
+    DYNAMO_TABLE_NAME = module.dynamodb_table.table_name
+  }
+
+  cloudwatch_logs_retention_in_days = var.rollup_lambda_log_retention_days
+
+  tags = var.tags
+}
+
+##############################################
+# DynamoDB Stream Event Source Mapping (Rollups)
+##############################################
+resource "aws_lambda_event_source_mapping" "rollup_stream" {
+  event_source_arn                   = module.dynamodb_table.table_stream_arn
+  function_name                      = module.lambda_rollup_processor.lambda_function_arn
+  starting_position                  = "LATEST"
+  batch_size                         = var.rollup_lambda_batch_size
+  maximum_batching_window_in_seconds = var.rollup_lambda_batching_window
+  enabled                            = true
+
+  # Only raw readings and irrigation events; the rollup/usage items written by
+  # this Lambda do not re-trigger it
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY"]
+        dynamodb = {
+          Keys = {
+            pk = {
+              S = [
+                {
+                  prefix = "PLOT#"
+                }
+              ]
+            }
+            sk = {
+              S = [
+                {
+                  prefix = "STATE#"
+                }
+              ]
+            }
+          }
+        }
+      })
+    }
+
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT", "MODIFY", "REMOVE"]
+        dynamodb = {
+          Keys = {
+            pk = {
+              S = [
+                {
+                  prefix = "PLOT#"
+                }
+              ]
+            }
+            sk = {
+              S = [
+                {
+                  prefix = "EVENT#"
+                }
+              ]
+            }
+          }
+        }
+      })
+    }
+  }
+
+  depends_on = [
+    module.lambda_rollup_processor
+  ]
+}
@@ -22,8 +22,8 @@ variable "runtime" {
 }
 
 variable "source_path" {
-  description = "Path to the Lambda source code directory (for ZIP deployment)"
-  type        = string
+  description = "Path (or list of paths/objects) with the Lambda source code (for ZIP deployment)"
+  type        = any
   default     = null
 }
 
@@ -28,6 +28,12 @@ variable "lambda_source_path" {
   default     = "../../../lambdas/lambda_iot_handler"
 }
 
+variable "lambda_shared_source_path" {
+  description = "Directory with the shared modules bundled into the Lambdas (aws_clients.py, readings.py for the IoT handler, dynamo_stream.py for the stream consumers, usage_days.py for the rollups)"
+  type        = string
+  default     = "../../server/src/utils"
+}
+
 variable "lambda_log_retention_days" {
   description = "CloudWatch Logs retention in days"
   type        = number
@@ -88,6 +94,30 @@ variable "alert_lambda_batch_size" {
   default     = 10
 }
 
+variable "alert_lambda_cache_ttl_seconds" {
+  description = "Seconds the alert processor keeps thresholds/responsibles cached in a warm container"
+  type        = number
+  default     = 300
+}
+
+variable "alert_lambda_hysteresis_percent" {
+  description = "Fraction of the allowed range a metric must move back inside before an alert is considered recovered"
+  type        = number
+  default     = 0.05
+}
+
+variable "alert_lambda_cooldown_seconds" {
+  description = "Minimum seconds between two new-alert notifications for the same plot metric"
+  type        = number
+  default     = 900
+}
+
+variable "alert_lambda_reminder_seconds" {
+  description = "Seconds between \"still alerting\" reminders while a metric stays out of range"
+  type        = number
+  default     = 14400
+}
+
 variable "responsible_sync_lambda_function_name" {
   description = "Name of the Lambda function that synchronises SNS subscriptions with facility responsibles"
   type        = string
@@ -130,6 +160,66 @@ variable "responsible_sync_lambda_log_retention_days" {
   default     = 14
 }
 
+variable "responsible_sync_lambda_max_workers" {
+  description = "Concurrent SNS subscribe/unsubscribe calls per responsible sync invocation"
+  type        = number
+  default     = 16
+}
+
+variable "rollup_lambda_function_name" {
+  description = "Name of the Lambda function that maintains hourly/daily rollups per plot"
+  type        = string
+  default     = "PlotRollupProcessor"
+}
+
+variable "rollup_lambda_handler" {
+  description = "Lambda handler for the rollup processor function"
+  type        = string
+  default     = "app.lambda_handler"
+}
+
+variable "rollup_lambda_runtime" {
+  description = "Runtime for the rollup processor Lambda"
+  type        = string
+  default     = "python3.11"
+}
+
+variable "rollup_lambda_source_path" {
+  description = "Source path for the rollup processor Lambda code"
+  type        = string
+  default     = "../lambdas/lambda_rollup_processor"
+}
+
+variable "rollup_lambda_timeout" {
+  description = "Timeout in seconds for the rollup processor Lambda"
+  type        = number
+  default     = 60
+}
+
+variable "rollup_lambda_memory_size" {
+  description = "Memory size in MB for the rollup processor Lambda"
+  type        = number
+  default     = 256
+}
+
+variable "rollup_lambda_log_retention_days" {
+  description = "CloudWatch Logs retention in days for the rollup processor Lambda"
+  type        = number
+  default     = 14
+}
+
+variable "rollup_lambda_batch_size" {
+  description = "Maximum number of stream records to process per rollup invocation"
+  type        = number
+  default     = 100
+}
+
+variable "rollup_lambda_batching_window" {
+  description = "Seconds to buffer stream records so each touched hour is rebuilt once per batch"
+  type        = number
+  default     = 10
+}
+
 variable "terraform_state_bucket_name" {
   description = "S3 bucket name used to store Terraform remote state"
   type        = string
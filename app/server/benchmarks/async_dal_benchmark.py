@@ -0,0 +1,75 @@
+"""
+Benchmark del acceso a DynamoDB desde handlers async.
+
+Compara peticiones/segundo bajo concurrencia entre:
+- antes: el handler llama a boto3 (bloqueante) directamente dentro de `async def`
+- después: el handler pasa por AsyncTable (pool acotado de hilos)
+
+DynamoDB se simula con una tabla que duerme `--latency-ms` por llamada, así el
+benchmark no necesita credenciales AWS.
+
+Uso (desde app/server):
+    python -m benchmarks.async_dal_benchmark --requests 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import time
+
+from src.dal.async_table import AsyncTable
+
+
+class SlowTable:
+    """Tabla falsa con latencia fija, equivalente a un get_item de boto3."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_item(self, **kwargs):
+        time.sleep(self.latency)
+        return {"Item": {"pk": kwargs["Key"]["pk"], "sk": kwargs["Key"]["sk"]}}
+
+
+async def _blocking_handler(table: SlowTable, i: int):
+    return table.get_item(Key={"pk": f"FACILITY#{i}", "sk": "Metadata"})
+
+
+async def _async_handler(table: AsyncTable, i: int):
+    return await table.get_item(Key={"pk": f"FACILITY#{i}", "sk": "Metadata"})
+
+
+async def _run(handler, table, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await handler(table, i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=64)
+    args = parser.parse_args()
+
+    slow_table = SlowTable(args.latency_ms / 1000)
+    async_table = AsyncTable(slow_table, max_workers=args.workers)
+
+    before = asyncio.run(_run(_blocking_handler, slow_table, args.requests, args.concurrency))
+    after = asyncio.run(_run(_async_handler, async_table, args.requests, args.concurrency))
+    async_table.shutdown()
+
+    print(f"requests={args.requests} concurrency={args.concurrency} latency={args.latency_ms}ms workers={args.workers}")
+    print(f"antes   (boto3 bloqueante): {before:8.1f} req/s")
+    print(f"después (AsyncTable):       {after:8.1f} req/s")
+    print(f"mejora: x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark del backtest de umbrales (src.utils.backtest).
+
+Compara el tiempo de evaluar un histórico de lecturas por minuto entre:
+- antes: un bucle Python por lectura con la regla de _find_deviations
+  (avisos, episodios y tiempo fuera de rango)
+- después: ThresholdBacktest (NumPy, página a página)
+
+Las páginas (como las devuelve DynamoDB) se generan una vez y se reutilizan
+para cada parcela; solo se mide la evaluación, no la lectura de DynamoDB.
+
+Uso (desde app/server):
+    python -m benchmarks.backtest_benchmark --days 365 --plots 10
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from src.utils.aggregation import item_timestamp, parse_timestamp
+from src.utils.backtest import MAX_GAP_SECONDS, ThresholdBacktest
+
+BOUNDS = {"temperature": (15.0, 30.0), "humidity": (40.0, 80.0)}
+PAGE_SIZE = 5000
+
+
+def _pages(days: int) -> list[list[dict]]:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    items = [
+        {
+            "sk": f"STATE#{(start + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            "temperature": Decimal(str(round(random.uniform(10, 35), 2))),
+            "humidity": Decimal(str(round(random.uniform(30, 90), 1))),
+        }
+        for i in range(days * 24 * 60)
+    ]
+    return [items[i:i + PAGE_SIZE] for i in range(0, len(items), PAGE_SIZE)]
+
+
+def _loop_backtest(pages: list[list[dict]]) -> tuple[int, int]:
+    """Misma salida que ThresholdBacktest, lectura a lectura."""
+    alerts = episodes = 0
+    out_of_range = 0.0
+    previous = {metric: None for metric in BOUNDS}
+    for page in pages:
+        for item in page:
+            when = parse_timestamp(item_timestamp(item)).timestamp()
+            deviated = False
+            for metric, (lower, upper) in BOUNDS.items():
+                value = float(item[metric])
+                violated = value < lower or value > upper
+                last = previous[metric]
+                if last is not None and last[1]:
+                    out_of_range += min(when - last[0], MAX_GAP_SECONDS)
+                if violated and not (last is not None and last[1]):
+                    episodes += 1
+                previous[metric] = (when, violated)
+                deviated = deviated or violated
+            alerts += deviated
+    return alerts, episodes
+
+
+def _numpy_backtest(pages: list[list[dict]]) -> tuple[int, int]:
+    backtest = ThresholdBacktest(BOUNDS)
+    for page in pages:
+        backtest.add(page)
+    result = backtest.result()
+    return result["alerts"], result["episodes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--plots", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    pages = _pages(args.days)
+    readings = sum(len(page) for page in pages)
+
+    start = time.perf_counter()
+    expected = [_loop_backtest(pages) for _ in range(args.plots)]
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = [_numpy_backtest(pages) for _ in range(args.plots)]
+    after = time.perf_counter() - start
+
+    assert got == expected, (got, expected)
+    print(f"days={args.days} plots={args.plots} lecturas/parcela={readings}")
+    print(f"antes   (bucle Python):     {before:8.2f} s")
+    print(f"después (ThresholdBacktest): {after:8.2f} s")
+    print(f"mejora: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de la serialización de respuestas con ítems de DynamoDB (Decimal).
+
+Mide el tiempo de convertir en bytes JSON una respuesta de /plots/{id}/history
+con `--items` lecturas (y un listado de ítems genéricos como /plots):
+- antes: conversión a mano en el endpoint (float() por campo en el historial,
+  convert_decimals recursivo en los listados), jsonable_encoder (FastAPI sin
+  response_model) y JSONResponse
+- después: el ítem tal cual validado y volcado por el response_model
+  (validate_python + dump_python(mode="json"), lo que hace FastAPI) y
+  FastJSONResponse
+
+Uso (desde app/server):
+    python -m benchmarks.serialization_benchmark --items 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+from typing import List, Union
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.schemas.plot import AggregatedHistory, HistoryPoint, PlotPage
+from src.utils.serialization import FastJSONResponse, orjson
+
+
+def _state_items(count: int) -> list[dict]:
+    items = []
+    for i in range(count):
+        timestamp = f"2025-01-{1 + i // 1440:02d}T{i // 60 % 24:02d}:{i % 60:02d}:00Z"
+        items.append({
+            "pk": "PLOT#p1",
+            "sk": f"STATE#{timestamp}",
+            "GSI_PK": "FACILITY#f1",
+            "GSI_SK": f"TIMESTAMP#{timestamp}",
+            "Timestamp": timestamp,
+            "plot_id": "p1",
+            "temperature": Decimal(f"{20 + i % 70 / 10:.1f}"),
+            "humidity": Decimal(f"{50 + i % 300 / 10:.1f}"),
+            "soil_moisture": Decimal(f"{30 + i % 150 / 10:.1f}"),
+            "light": Decimal(800 + i % 400),
+        })
+    return items
+
+
+def _plot_items(count: int) -> list[dict]:
+    return [
+        {
+            "pk": "FACILITY#f1",
+            "sk": f"PLOT#p{i}",
+            "type": "PLOT",
+            "plot_id": f"p{i}",
+            "facility_id": "f1",
+            "name": f"Parcela {i}",
+            "location": "Invernadero 2",
+            "mac_address": "AA:BB:CC:DD:EE:FF",
+            "species": "tomate",
+            "area": Decimal(f"{10 + i % 50}.5"),
+            "sensors": {"count": Decimal(4), "calibration": [Decimal("0.98"), Decimal("1.02")]},
+        }
+        for i in range(count)
+    ]
+
+
+def _convert_decimals(obj):
+    # Conversión recursiva que hacía routers/plot.py
+    if isinstance(obj, list):
+        return [_convert_decimals(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {key: _convert_decimals(value) for key, value in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    return obj
+
+
+def _history_before(items: list[dict]) -> bytes:
+    history = []
+    for item in items:
+        history.append({
+            "timestamp": item.get("Timestamp"),
+            "temperature": float(item.get("temperature", 0)) if item.get("temperature") is not None else None,
+            "humidity": float(item.get("humidity", 0)) if item.get("humidity") is not None else None,
+            "soil_moisture": float(item.get("soil_moisture", 0)) if item.get("soil_moisture") is not None else None,
+            "light": float(item.get("light", 0)) if item.get("light") is not None else None,
+        })
+    return JSONResponse(jsonable_encoder(history)).body
+
+
+def _plots_before(items: list[dict]) -> bytes:
+    plots = _convert_decimals(items)
+    return JSONResponse(jsonable_encoder({"count": len(plots), "plots": plots, "next_cursor": None})).body
+
+
+def _model_path(adapter: TypeAdapter, content) -> bytes:
+    return FastJSONResponse(adapter.dump_python(adapter.validate_python(content), mode="json")).body
+
+
+def _measure(fn, repeat: int) -> float:
+    fn()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000, help="ítems por respuesta")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    history_adapter = TypeAdapter(Union[AggregatedHistory, List[HistoryPoint]])
+    plots_adapter = TypeAdapter(PlotPage)
+    states = _state_items(args.items)
+    plots = _plot_items(args.items)
+    page = {"count": len(plots), "plots": plots, "next_cursor": None}
+
+    cases = [
+        ("historial", lambda: _history_before(states), lambda: _model_path(history_adapter, states)),
+        ("parcelas", lambda: _plots_before(plots), lambda: _model_path(plots_adapter, page)),
+    ]
+
+    print(f"ítems={args.items} repeticiones={args.repeat} encoder={'orjson' if orjson else 'json'}")
+    for name, before_fn, after_fn in cases:
+        assert json.loads(before_fn()) == json.loads(after_fn()), name
+        before = _measure(before_fn, args.repeat)
+        after = _measure(after_fn, args.repeat)
+        print(f"{name}:")
+        print(f"  antes   (a mano + jsonable_encoder):         {before * 1000:8.3f} ms")
+        print(f"  después (response_model + FastJSONResponse): {after * 1000:8.3f} ms")
+        print(f"  mejora: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark del despacho de registros de DynamoDB Streams (src.utils.dynamo_stream).
+
+Compara el tiempo de filtrar un lote en el que solo una parte de los registros
+son lecturas PLOT#/STATE# entre:
+- antes: deserializar NewImage completo de cada registro y filtrar por pk/sk
+  (lo que hacía lambda_alert_processor)
+- después: StreamRouter, que decodifica solo Keys y deserializa NewImage de
+  los registros que coinciden
+
+Uso (desde app/server):
+    python -m benchmarks.stream_benchmark --records 100000 --relevant 0.1
+"""
+import argparse
+import logging
+import random
+import time
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from src.utils.dynamo_stream import StreamRouter
+
+deserializer = TypeDeserializer()
+
+
+def _image(pk: str, sk: str) -> dict:
+    return {
+        "pk": {"S": pk},
+        "sk": {"S": sk},
+        "GSI_PK": {"S": "FACILITY#f1"},
+        "GSI_SK": {"S": "TIMESTAMP#2025-01-01T00:00:00Z"},
+        "FacilityId": {"S": "f1"},
+        "temperature": {"N": "21.5"},
+        "humidity": {"N": "55.2"},
+        "soil_moisture": {"N": "33.1"},
+        "light": {"N": "870"},
+        "Timestamp": {"S": "2025-01-01T00:00:00Z"},
+        "details": {"M": {"source": {"S": "iot"}, "tags": {"L": [{"S": "a"}, {"S": "b"}]}}},
+    }
+
+
+def _records(count: int, relevant: float) -> list[dict]:
+    other_keys = [("FACILITY#f1", "EVENT#2025-01-01T00:00:00Z"), ("PLOT#1", "THRESHOLDS"), ("PLOT#1", "Metadata")]
+    records = []
+    for i in range(count):
+        if random.random() < relevant:
+            pk, sk = f"PLOT#{i % 50}", f"STATE#2025-01-01T00:{i % 60:02d}:00Z"
+        else:
+            pk, sk = random.choice(other_keys)
+        image = _image(pk, sk)
+        records.append({
+            "eventName": "INSERT",
+            "dynamodb": {"Keys": {"pk": image["pk"], "sk": image["sk"]}, "NewImage": image},
+        })
+    return records
+
+
+def _eager(records: list[dict]) -> int:
+    items = []
+    for record in records:
+        image = record["dynamodb"]["NewImage"]
+        item = {key: deserializer.deserialize(value) for key, value in image.items()}
+        if item["pk"].startswith("PLOT#") and item["sk"].startswith("STATE#"):
+            items.append(item)
+    return len(items)
+
+
+def _routed(records: list[dict]) -> int:
+    items = []
+    router = StreamRouter()
+    router.add(lambda record: items.append(record.new_image), "PLOT#", sk_prefix="STATE#", events=("INSERT",))
+    router.dispatch(records)
+    return len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--relevant", type=float, default=0.1, help="fracción de registros PLOT#/STATE#")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    random.seed(0)
+    records = _records(args.records, args.relevant)
+
+    start = time.perf_counter()
+    expected = _eager(records)
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    got = _routed(records)
+    after = time.perf_counter() - start
+
+    assert got == expected, (got, expected)
+    print(f"registros={args.records} relevantes={expected}")
+    print(f"antes   (NewImage completo): {before:8.3f} s")
+    print(f"después (StreamRouter):      {after:8.3f} s")
+    print(f"mejora: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Importa histórico de sensores (CSV o NDJSON) en la tabla de DynamoDB.
+
+Los ítems tienen la misma forma que los de lambda_iot_handler (ver
+src.dal.bulk_import). El CSV lleva cabecera con plot_id, timestamp,
+facility_id... y una columna por métrica; el NDJSON, un payload IoT por línea.
+El timestamp puede ser ISO (sin zona se asume UTC) o epoch en segundos; se
+guarda en UTC con 'Z' y las filas que no se pueden interpretar se rechazan.
+
+Uso (desde app/server, con credenciales AWS y DYNAMO_TABLE_NAME):
+    python -m scripts.import_readings lecturas.csv
+    python -m scripts.import_readings sd_card.ndjson --plot-id 42 --workers 32
+    python -m scripts.import_readings - --format ndjson < lecturas.ndjson
+"""
+import argparse
+import logging
+import sys
+
+from src.dal.bulk_import import FORMATS, IMPORT_INITIAL_RATE, IMPORT_WORKERS, AdaptiveRateLimiter, BulkImporter, read_payloads
+from src.dal.database import table
+
+
+def _print_progress(stats: dict) -> None:
+    print(
+        f"filas={stats['rows']} escritas={stats['written']} rechazadas={stats['rejected']} "
+        f"fallidas={stats['failed']} throttled={stats['throttled']} "
+        f"{stats['rows_per_second']:.0f} filas/s (límite {stats['rate_limit']:.0f}/s) {stats['seconds']:.0f}s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Fichero a importar ('-' para la entrada estándar)")
+    parser.add_argument("--format", choices=FORMATS, help="Por defecto, según la extensión del fichero")
+    parser.add_argument("--plot-id", help="plot_id de las filas que no lo traigan")
+    parser.add_argument("--facility-id", help="facility_id de las filas que no lo traigan")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    parser.add_argument("--rate", type=float, default=IMPORT_INITIAL_RATE, help="Ítems/s de partida")
+    parser.add_argument("--max-rate", type=float, default=None, help="Techo de ítems/s (p. ej. la capacidad provisionada)")
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl", ".json")) else "csv")
+    defaults = {
+        key: value
+        for key, value in (("plot_id", args.plot_id), ("facility_id", args.facility_id))
+        if value
+    }
+    importer = BulkImporter(
+        table,
+        workers=args.workers,
+        limiter=AdaptiveRateLimiter(args.rate, max_rate=args.max_rate),
+        defaults=defaults,
+        on_progress=_print_progress,
+        progress_interval=args.progress_interval,
+    )
+
+    source = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+    with source:
+        stats = importer.run(read_payloads(source, fmt))
+
+    print(
+        f"importadas {stats['written']} de {stats['rows']} filas en {stats['seconds']:.1f}s "
+        f"({stats['rows_per_second']:.0f} filas/s); rechazadas {stats['rejected']}, fallidas {stats['failed']}"
+    )
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
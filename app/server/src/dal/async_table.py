@@ -0,0 +1,111 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+# Número máximo de llamadas a DynamoDB en vuelo por contenedor
+MAX_WORKERS = int(os.getenv("DYNAMO_MAX_WORKERS", "64"))
+
+# Límite de claves por BatchGetItem impuesto por DynamoDB
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 5
+
+
+class AsyncTable:
+    """
+    Envoltorio asíncrono sobre una Table de boto3.
+
+    boto3 es bloqueante: cada operación se ejecuta en un pool acotado de hilos
+    para que una consulta lenta no detenga el event loop de uvicorn.
+    """
+
+    def __init__(self, table, max_workers: int = MAX_WORKERS):
+        self._table = table
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dynamo")
+
+    @property
+    def table(self):
+        return self._table
+
+    async def run(self, fn, *args, **kwargs) -> Any:
+        """Ejecuta una función bloqueante en el pool de DynamoDB."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def get_item(self, **kwargs) -> dict:
+        return await self.run(self._table.get_item, **kwargs)
+
+    async def put_item(self, **kwargs) -> dict:
+        return await self.run(self._table.put_item, **kwargs)
+
+    async def update_item(self, **kwargs) -> dict:
+        return await self.run(self._table.update_item, **kwargs)
+
+    async def delete_item(self, **kwargs) -> dict:
+        return await self.run(self._table.delete_item, **kwargs)
+
+    async def query(self, **kwargs) -> dict:
+        return await self.run(self._table.query, **kwargs)
+
+    async def query_all(self, max_items: int | None = None, **kwargs) -> list:
+        """
+        Ejecuta una query siguiendo LastEvaluatedKey hasta agotar los resultados
+        o hasta reunir `max_items` ítems.
+        """
+        items = []
+        while True:
+            if max_items is not None:
+                kwargs["Limit"] = max_items - len(items)
+            response = await self.query(**kwargs)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            if max_items is not None and len(items) >= max_items:
+                return items
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    async def batch_get(self, keys: list[dict], **kwargs) -> list:
+        """
+        BatchGetItem sobre esta tabla: trocea en lotes de 100 claves, los lanza
+        en paralelo y reintenta las UnprocessedKeys con backoff exponencial.
+        El orden de los ítems devueltos no está garantizado.
+        """
+        chunks = [keys[i:i + BATCH_GET_MAX_KEYS] for i in range(0, len(keys), BATCH_GET_MAX_KEYS)]
+        results = await asyncio.gather(*(self._batch_get_chunk(chunk, kwargs) for chunk in chunks))
+        return [item for items in results for item in items]
+
+    async def _batch_get_chunk(self, keys: list[dict], options: dict) -> list:
+        # El cliente del recurso ya (de)serializa los tipos de Python
+        client = self._table.meta.client
+        name = self._table.name
+        items = []
+        request = {name: {"Keys": keys, **options}}
+
+        for attempt in range(BATCH_GET_MAX_RETRIES + 1):
+            response = await self.run(client.batch_get_item, RequestItems=request)
+            items.extend(response.get("Responses", {}).get(name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                return items
+            if attempt < BATCH_GET_MAX_RETRIES:
+                await asyncio.sleep(0.05 * 2 ** attempt)
+
+        raise RuntimeError(f"BatchGetItem left {len(request[name]['Keys'])} unprocessed keys")
+
+    async def batch_write(self, put_items: list[dict] = (), delete_keys: list[dict] = ()) -> None:
+        """
+        Escrituras en lote (PutItem / DeleteItem). batch_writer agrupa de 25 en
+        25 y reenvía los UnprocessedItems; todo corre en un solo hilo del pool.
+        """
+        await self.run(self._batch_write_sync, list(put_items), list(delete_keys))
+
+    def _batch_write_sync(self, put_items: list[dict], delete_keys: list[dict]) -> None:
+        with self._table.batch_writer(overwrite_by_pkeys=["pk", "sk"]) as batch:
+            for item in put_items:
+                batch.put_item(Item=item)
+            for key in delete_keys:
+                batch.delete_item(Key=key)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
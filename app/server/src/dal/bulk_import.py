@@ -0,0 +1,367 @@
+"""
+Importación masiva de histórico de sensores (logs de tarjetas SD, migraciones).
+
+Las filas (CSV o NDJSON) se convierten en payloads como los que llegan por IoT
+y pasan por src.utils.readings.format_reading, así que los ítems son los
+mismos que escribe lambda_iot_handler, más `Source = "import"` para que
+lambda_alert_processor no evalúe alertas sobre datos pasados (los rollups y
+el consumo diario sí se calculan).
+
+Escritura:
+- Lotes de 25 ítems (límite de BatchWriteItem) repartidos entre IMPORT_WORKERS
+  hilos, con un número acotado de lotes en vuelo: la memoria no depende del
+  tamaño del fichero.
+- Los UnprocessedItems y los errores de throughput se reintentan con backoff
+  exponencial y jitter.
+- AdaptiveRateLimiter limita los ítems/s: baja a la mitad cuando DynamoDB
+  estrangula y sube poco a poco mientras no lo hace (AIMD).
+
+Al terminar, PLOT#<id> / LATEST se actualiza una vez por parcela con la
+lectura más reciente importada (escritura condicional, como en la Lambda).
+"""
+import csv
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable, Iterator
+
+from botocore.exceptions import ClientError
+
+from src.utils.aggregation import parse_timestamp
+from src.utils.readings import EVENT_FIELDS, format_reading, latest_state_item, message_type
+
+logger = logging.getLogger("uvicorn")
+
+IMPORT_SOURCE = "import"
+FORMATS = ("csv", "ndjson")
+
+# Ítems por BatchWriteItem impuesto por DynamoDB
+BATCH_WRITE_MAX_ITEMS = 25
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "16"))
+# Ítems/s de partida; luego el limitador se adapta al throttling
+IMPORT_INITIAL_RATE = float(os.getenv("IMPORT_INITIAL_RATE", "1000"))
+IMPORT_MIN_RATE = 25.0
+IMPORT_MAX_RETRIES = 10
+IMPORT_BACKOFF_BASE_SECONDS = 0.05
+IMPORT_BACKOFF_MAX_SECONDS = 5.0
+
+_THROTTLING_CODES = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded")
+
+# Columnas CSV que son campos del payload (el resto son métricas de sensor_data)
+PAYLOAD_COLUMNS = ("plot_id", "timestamp", "facility_id", "species_id", "business_id", "plot_name", "type", *EVENT_FIELDS)
+_TEXT_COLUMNS = ("plot_id", "timestamp", "facility_id", "species_id", "business_id", "plot_name", "type", "event_type")
+
+
+class AdaptiveRateLimiter:
+    """Token bucket de ítems/s con ajuste AIMD según el throttling de DynamoDB."""
+
+    def __init__(self, rate: float = IMPORT_INITIAL_RATE, max_rate: float | None = None, min_rate: float = IMPORT_MIN_RATE):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = max(min_rate, min(rate, max_rate) if max_rate else rate)
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # Como mucho un segundo de ráfaga acumulada
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount or self._tokens >= self.rate:
+                    self._tokens -= amount
+                    return
+                wait_seconds = (amount - self._tokens) / self.rate
+            time.sleep(min(wait_seconds, 1.0))
+
+    def throttled(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            # Los lotes en vuelo se estrangulan a la vez: una sola bajada por segundo
+            if now - self._last_decrease >= 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._last_decrease = now
+
+    def succeeded(self, amount: int) -> None:
+        with self._lock:
+            # +~5 % por cada segundo de escrituras a ritmo completo sin throttling
+            self.rate += 0.05 * amount
+            if self.max_rate:
+                self.rate = min(self.rate, self.max_rate)
+
+
+def _number(value: str):
+    """Decimal si la celda es numérica; None si es NaN/inf (DynamoDB no los admite)."""
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, ValueError):
+        return value
+    return number if number.is_finite() else None
+
+
+def csv_payloads(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Payloads de un CSV con cabecera: plot_id, timestamp, facility_id... y una
+    columna por métrica (temperature, humidity...). Las celdas vacías se omiten.
+    Con event_type/duration/water_amount la fila es un evento de riego.
+    """
+    for row in csv.DictReader(lines):
+        payload, extra = {}, {}
+        for column, value in row.items():
+            if column is None or value is None or value == "":
+                continue
+            column = column.strip()
+            value = value.strip() if column in _TEXT_COLUMNS else _number(value)
+            if value is None:
+                continue
+            if column in PAYLOAD_COLUMNS:
+                payload[column] = value
+            else:
+                extra[column] = value
+        if message_type(payload) == "state":
+            payload["sensor_data"] = extra
+        else:
+            payload.update(extra)
+        yield payload
+
+
+def ndjson_payloads(lines: Iterable[str]) -> Iterator[dict]:
+    """Payloads de un NDJSON: una lectura, una lista o un {"readings": [...]} por línea."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line, parse_float=Decimal)
+        except ValueError:
+            # La línea llega tal cual y BulkImporter la cuenta como rechazada
+            yield line
+            continue
+        if isinstance(payload, dict) and "readings" in payload:
+            defaults = {k: v for k, v in payload.items() if k != "readings"}
+            yield from ({**defaults, **reading} for reading in payload["readings"])
+        elif isinstance(payload, list):
+            yield from payload
+        else:
+            yield payload
+
+
+def read_payloads(lines: Iterable[str], fmt: str) -> Iterator[dict]:
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    return csv_payloads(lines) if fmt == "csv" else ndjson_payloads(lines)
+
+
+def normalize_timestamp(value) -> str:
+    """
+    Timestamp de una fila en la forma de IoT (ISO en UTC con 'Z'), para que las
+    claves STATE#/EVENT# se ordenen igual que las de la Lambda. Acepta ISO con
+    o sin zona (sin zona se asume UTC) y epoch en segundos; lo demás es ValueError.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if isinstance(value, str):
+        value = value.strip()
+        # En CSV el timestamp es texto: un epoch llega como "1700000000"
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            pass
+    if isinstance(value, (int, float, Decimal)):
+        try:
+            parsed = datetime.fromtimestamp(float(value), tz=timezone.utc)
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"Invalid timestamp: {value!r}") from e
+    elif isinstance(value, str):
+        parsed = parse_timestamp(value)
+    else:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    return parsed.replace(tzinfo=None).isoformat() + "Z"
+
+
+class BulkImporter:
+    """
+    Convierte payloads en ítems y los escribe en paralelo.
+
+    `defaults` completa los campos que no traiga cada fila (p. ej. el plot_id
+    de un log de tarjeta SD de un solo dispositivo).
+    """
+
+    def __init__(
+        self,
+        table,
+        workers: int = IMPORT_WORKERS,
+        limiter: AdaptiveRateLimiter | None = None,
+        defaults: dict | None = None,
+        on_progress: Callable[[dict], None] | None = None,
+        progress_interval: float = 5.0,
+    ):
+        self._table = table
+        self._client = table.meta.client
+        self._workers = max(1, workers)
+        self._limiter = limiter or AdaptiveRateLimiter()
+        self._defaults = defaults or {}
+        self._on_progress = on_progress
+        self._progress_interval = progress_interval
+        self._metadata: dict[str, dict | None] = {}
+        self._latest: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "rows": 0,
+            "written": 0,
+            "rejected": 0,
+            "failed": 0,
+            "retries": 0,
+            "throttled": 0,
+            "seconds": 0.0,
+            "rows_per_second": 0.0,
+        }
+
+    def run(self, payloads: Iterable[dict]) -> dict:
+        started = time.monotonic()
+        last_report = started
+        in_flight = set()
+
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="import") as executor:
+            for batch in self._batches(payloads):
+                # Acota los lotes pendientes: no se lee más de lo que se puede escribir
+                if len(in_flight) >= self._workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                in_flight.add(executor.submit(self._write_batch, batch))
+
+                now = time.monotonic()
+                if now - last_report >= self._progress_interval:
+                    self._report(started)
+                    last_report = now
+
+            self._collect(wait(in_flight).done)
+
+        self._update_latest()
+        self._report(started)
+        return dict(self.stats)
+
+    def _collect(self, futures) -> None:
+        for future in futures:
+            future.result()
+
+    def _report(self, started: float) -> None:
+        elapsed = time.monotonic() - started
+        self.stats["seconds"] = round(elapsed, 1)
+        self.stats["rows_per_second"] = round(self.stats["written"] / elapsed, 1) if elapsed else 0.0
+        self.stats["rate_limit"] = round(self._limiter.rate, 1)
+        if self._on_progress:
+            self._on_progress(dict(self.stats))
+
+    def _batches(self, payloads: Iterable[dict]) -> Iterator[list[dict]]:
+        batch: dict[tuple, dict] = {}
+        for payload in payloads:
+            self.stats["rows"] += 1
+            item = self._to_item(payload)
+            if item is None:
+                continue
+            # BatchWriteItem rechaza claves repetidas en la misma petición: gana la última
+            batch[(item["pk"], item["sk"])] = item
+            if len(batch) == BATCH_WRITE_MAX_ITEMS:
+                yield list(batch.values())
+                batch = {}
+        if batch:
+            yield list(batch.values())
+
+    def _to_item(self, payload: dict) -> dict | None:
+        try:
+            if not isinstance(payload, dict):
+                raise TypeError(f"Unexpected payload type: {type(payload).__name__}")
+            payload = {**self._defaults, **payload}
+            plot_id = str(payload.get("plot_id") or "")
+            if not plot_id:
+                raise ValueError("Missing plot_id")
+            if not payload.get("timestamp"):
+                # Sin timestamp se usaría la hora actual: no tiene sentido en un histórico
+                raise ValueError("Missing timestamp")
+            payload["timestamp"] = normalize_timestamp(payload["timestamp"])
+            if not payload.get("facility_id"):
+                self._add_plot_metadata(payload, plot_id)
+
+            item = format_reading(payload, plot_id)
+            item["Source"] = IMPORT_SOURCE
+        except (TypeError, ValueError) as e:
+            self.stats["rejected"] += 1
+            if self.stats["rejected"] <= 10:
+                logger.warning("Rejected row %d: %s", self.stats["rows"], e)
+            return None
+
+        if item["sk"].startswith("STATE#"):
+            # Timestamps ya normalizados: la comparación de cadenas sigue el orden temporal
+            current = self._latest.get(item["pk"])
+            if current is None or current["Timestamp"] < item["Timestamp"]:
+                self._latest[item["pk"]] = item
+        return item
+
+    def _add_plot_metadata(self, payload: dict, plot_id: str) -> None:
+        """Como lambda_iot_handler: completa instalación, especie y nombre desde PLOT#<id> / Metadata."""
+        if plot_id not in self._metadata:
+            response = self._table.get_item(Key={"pk": f"PLOT#{plot_id}", "sk": "Metadata"})
+            self._metadata[plot_id] = response.get("Item")
+        metadata = self._metadata[plot_id]
+        if not metadata:
+            return
+        if metadata.get("facility_id"):
+            payload["facility_id"] = metadata["facility_id"]
+        if metadata.get("species_id") and "species_id" not in payload:
+            payload["species_id"] = metadata["species_id"]
+        if metadata.get("name") and "plot_name" not in payload:
+            payload["plot_name"] = metadata["name"]
+
+    def _write_batch(self, items: list[dict]) -> None:
+        requests = [{"PutRequest": {"Item": item}} for item in items]
+        for attempt in range(IMPORT_MAX_RETRIES + 1):
+            self._limiter.acquire(len(requests))
+            try:
+                response = self._client.batch_write_item(RequestItems={self._table.name: requests})
+                unprocessed = response.get("UnprocessedItems", {}).get(self._table.name, [])
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in _THROTTLING_CODES:
+                    raise
+                unprocessed = requests
+
+            written = len(requests) - len(unprocessed)
+            with self._lock:
+                self.stats["written"] += written
+            if not unprocessed:
+                self._limiter.succeeded(written)
+                return
+
+            self._limiter.throttled()
+            with self._lock:
+                self.stats["retries"] += 1
+                self.stats["throttled"] += len(unprocessed)
+            requests = unprocessed
+            delay = min(IMPORT_BACKOFF_MAX_SECONDS, IMPORT_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(delay / 2, delay))
+
+        with self._lock:
+            self.stats["failed"] += len(requests)
+        logger.error("Gave up on %d items after %d retries", len(requests), IMPORT_MAX_RETRIES)
+
+    def _update_latest(self) -> None:
+        for item in self._latest.values():
+            try:
+                self._table.put_item(
+                    Item=latest_state_item(item),
+                    ConditionExpression="attribute_not_exists(pk) OR #ts < :ts",
+                    ExpressionAttributeNames={"#ts": "Timestamp"},
+                    ExpressionAttributeValues={":ts": item["Timestamp"]},
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
@@ -0,0 +1,130 @@
+"""
+Borrado en cascada de parcelas e instalaciones.
+
+Una parcela son todos los ítems de su partición PLOT#{plot_id} (STATE#,
+EVENT#, THRESHOLDS, LATEST, ROLLUP#, USAGE#, RECOMMENDATION#...) más su
+entrada FACILITY#{facility_id} / PLOT#{plot_id}. Una instalación son sus
+parcelas más todos los ítems de su partición FACILITY#{facility_id}.
+
+Las claves se leen página a página (solo pk/sk) y cada página se borra con
+BatchWriteItem mientras se pide la siguiente. Las parcelas de una instalación
+se borran en paralelo. La entrada que hace visible la parcela (y el Metadata
+de la instalación) se borra al final, así un borrado interrumpido se puede
+repetir sin dejar ítems huérfanos.
+
+El borrado corre como trabajo en segundo plano (src.dal.jobs); al ser
+idempotente, un trabajo interrumpido por un reinicio se reanuda sin más. Su
+progreso se consulta en /jobs/{job_id}.
+"""
+import asyncio
+import os
+
+from boto3.dynamodb.conditions import Key
+
+from src.dal.database import async_table
+from src.dal.jobs import Job, job_handler, job_runner
+from src.dal.metadata_cache import invalidate_item
+from src.utils.keys import pk_facility, pk_plot
+
+# Páginas de claves borrándose a la vez por partición
+DELETE_PAGE_CONCURRENCY = int(os.getenv("CASCADE_DELETE_PAGE_CONCURRENCY", "4"))
+# Parcelas borrándose a la vez al borrar una instalación
+DELETE_PLOT_CONCURRENCY = int(os.getenv("CASCADE_DELETE_PLOT_CONCURRENCY", "8"))
+
+# Ítems cacheados en metadata_cache que desaparecen con el borrado
+_CACHED_PLOT_SKS = ("THRESHOLDS", "Metadata")
+_CACHED_FACILITY_SKS = ("Metadata", "RESPONSIBLES")
+
+
+@job_handler("plot_deletion")
+async def _plot_deletion_job(job: Job) -> None:
+    await delete_plot_cascade(job.params["plot_id"], job.params.get("facility_id"), job.progress)
+
+
+@job_handler("facility_deletion")
+async def _facility_deletion_job(job: Job) -> None:
+    await delete_facility_cascade(job.params["facility_id"], job.progress)
+
+
+async def start_plot_deletion(plot_id: str, facility_id: str) -> dict:
+    return await job_runner.submit(
+        "plot_deletion",
+        {"plot_id": plot_id, "facility_id": facility_id},
+        {"plots_total": 1, "plots_done": 0, "items_deleted": 0},
+    )
+
+
+async def start_facility_deletion(facility_id: str) -> dict:
+    return await job_runner.submit(
+        "facility_deletion",
+        {"facility_id": facility_id},
+        {"plots_total": None, "plots_done": 0, "items_deleted": 0},
+    )
+
+
+async def delete_partition(pk: str, progress: dict, keep: set[str] = frozenset()) -> None:
+    """Borra todos los ítems de una partición salvo los sk de `keep`."""
+    semaphore = asyncio.Semaphore(max(1, DELETE_PAGE_CONCURRENCY))
+    tasks: list[asyncio.Task] = []
+
+    async def delete_page(keys: list[dict]) -> None:
+        try:
+            await async_table.batch_write(delete_keys=keys)
+            progress["items_deleted"] += len(keys)
+        finally:
+            semaphore.release()
+
+    query = {
+        "KeyConditionExpression": Key("pk").eq(pk),
+        "ProjectionExpression": "pk, sk",
+    }
+    try:
+        while True:
+            response = await async_table.query(**query)
+            keys = [{"pk": item["pk"], "sk": item["sk"]} for item in response.get("Items", []) if item["sk"] not in keep]
+            if keys:
+                # Acota las páginas en vuelo: no se lee más de lo que se puede borrar
+                await semaphore.acquire()
+                if any(task.done() and task.exception() for task in tasks):
+                    semaphore.release()
+                    break
+                tasks.append(asyncio.create_task(delete_page(keys)))
+            if "LastEvaluatedKey" not in response:
+                break
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    finally:
+        # Propaga el primer error de borrado después de esperar a las páginas en vuelo
+        await asyncio.gather(*tasks)
+
+
+async def delete_plot_cascade(plot_id: str, facility_id: str | None, progress: dict) -> None:
+    await delete_partition(pk_plot(plot_id), progress)
+    for sk in _CACHED_PLOT_SKS:
+        invalidate_item(pk_plot(plot_id), sk)
+    if facility_id:
+        await async_table.delete_item(Key={"pk": pk_facility(facility_id), "sk": f"PLOT#{plot_id}"})
+        progress["items_deleted"] += 1
+    progress["plots_done"] += 1
+
+
+async def delete_facility_cascade(facility_id: str, progress: dict) -> None:
+    plots = await async_table.query_all(
+        KeyConditionExpression=Key("pk").eq(pk_facility(facility_id)) & Key("sk").begins_with("PLOT#"),
+        ProjectionExpression="sk, plot_id",
+    )
+    # Al reanudar, las parcelas ya borradas no aparecen en la query
+    progress["plots_total"] = progress.get("plots_done", 0) + len(plots)
+    semaphore = asyncio.Semaphore(max(1, DELETE_PLOT_CONCURRENCY))
+
+    async def delete_plot(plot: dict) -> None:
+        async with semaphore:
+            await delete_plot_cascade(plot.get("plot_id") or plot["sk"].split("#", 1)[-1], facility_id, progress)
+
+    await asyncio.gather(*(delete_plot(plot) for plot in plots))
+
+    # El Metadata se borra el último: mientras exista, la instalación sigue visible
+    await delete_partition(pk_facility(facility_id), progress, keep={"Metadata"})
+    await async_table.delete_item(Key={"pk": pk_facility(facility_id), "sk": "Metadata"})
+    progress["items_deleted"] += 1
+    for sk in _CACHED_FACILITY_SKS:
+        invalidate_item(pk_facility(facility_id), sk)
@@ -1,17 +1,20 @@
 import os
-import boto3
 import asyncio
 from botocore.exceptions import ClientError
+from src.dal.async_table import AsyncTable
+from src.utils.aws_clients import get_client, get_region, get_resource, get_table
 from dotenv import load_dotenv
 load_dotenv()
 
 TABLE_NAME = os.getenv("DYNAMO_TABLE_NAME")
-dynamodb_resource = boto3.resource('dynamodb')
-table = dynamodb_resource.Table(TABLE_NAME)
+dynamodb_resource = get_resource("dynamodb")
+table = get_table(TABLE_NAME)
+async_table = AsyncTable(table)
 
-REGION = os.getenv("AWS_REGION", "us-east-1")
+REGION = get_region()
 
-dynamodb_client = boto3.client("dynamodb", region_name=REGION)
+# Comparte el pool de conexiones con el recurso (ver src.utils.aws_clients)
+dynamodb_client = get_client("dynamodb")
 
 def _create_table_sync():
     """Función bloqueante que usa boto3 para crear la tabla si no existe."""
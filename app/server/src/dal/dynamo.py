@@ -3,15 +3,7 @@ from functools import lru_cache
 from dotenv import load_dotenv
 load_dotenv()
 
-import boto3
-
-
-@lru_cache(maxsize=1)
-def _get_resource():
-    region = os.getenv("AWS_REGION")
-    if region:
-        return boto3.resource("dynamodb", region_name=region)
-    return boto3.resource("dynamodb")
+from src.utils import aws_clients
 
 
 @lru_cache(maxsize=1)
@@ -24,7 +16,7 @@ def _get_table_name() -> str:
 
 @lru_cache(maxsize=1)
 def get_table():
-    return _get_resource().Table(_get_table_name())
+    return aws_clients.get_table(_get_table_name())
 
 
 table = get_table()
@@ -1,9 +1,8 @@
-import boto3
 import os
 from uuid import UUID
+from src.utils.aws_clients import get_table
 
-dynamodb = boto3.resource("dynamodb", region_name=os.getenv("AWS_REGION", "us-east-2"))
-table = dynamodb.Table(os.getenv("TABLE_NAME", "MeridaMainTable"))
+table = get_table(os.getenv("TABLE_NAME", "MeridaMainTable"))
 
 def create_facility(facility_id: UUID, name: str, location: str):
     item = {
@@ -0,0 +1,395 @@
+"""
+Trabajos en segundo plano (borrados masivos, backfills, exportaciones...).
+
+Cada trabajo es un ítem JOB#{job_id} / JOB con su estado, progreso y
+resultado, así que se puede consultar desde cualquier contenedor y sobrevive
+a un reinicio. Un pool acotado de JOB_WORKERS tareas asyncio los ejecuta
+fuera del ciclo de las peticiones HTTP.
+
+Estados: queued -> running -> completed | failed | cancelled.
+
+- El contenedor que ejecuta un trabajo es su `owner` y renueva `heartbeat_at`
+  (y guarda `progress`) cada JOB_HEARTBEAT_SECONDS.
+- Al arrancar se reclaman los trabajos activos sin dueño o con el heartbeat
+  caducado (JOB_LEASE_SECONDS) y se vuelven a ejecutar desde el principio con
+  su último progreso guardado: los handlers deben ser idempotentes.
+- La cancelación marca `cancel_requested`; el dueño la ve en el siguiente
+  heartbeat y cancela la tarea.
+
+Los handlers se registran por tipo con @job_handler("tipo") y reciben un Job.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+from uuid import uuid4
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from src.dal.database import async_table
+
+logger = logging.getLogger("uvicorn")
+
+# Trabajos ejecutándose a la vez por contenedor
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Cada cuánto el dueño guarda progreso y renueva su reclamación
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "5"))
+# Sin heartbeat durante este tiempo, otro contenedor puede retomar el trabajo
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+STATUSES = ACTIVE_STATUSES + FINISHED_STATUSES
+
+JOB_TYPE = "JOB"
+JOB_SORT_KEY = "JOB"
+
+# Atributos internos que no se devuelven por la API
+_INTERNAL_FIELDS = ("pk", "sk", "type", "owner")
+
+_handlers: dict[str, Callable[["Job"], Awaitable[dict | None]]] = {}
+
+
+def job_handler(kind: str):
+    """Registra la corrutina que ejecuta los trabajos de tipo `kind`."""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+class Job:
+    """Lo que recibe un handler: parámetros y un dict de progreso que se persiste solo."""
+
+    def __init__(self, item: dict):
+        self.job_id: str = item["job_id"]
+        self.kind: str = item["kind"]
+        self.params: dict = item.get("params") or {}
+        self.progress: dict = item.get("progress") or {}
+        # Un intento > 1 es una reanudación tras un reinicio
+        self.attempt: int = int(item.get("attempts") or 1)
+
+
+def pk_job(job_id: str) -> str:
+    return f"JOB#{job_id}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _new_job_id() -> str:
+    # Ordenable por fecha de creación (GSI_TypeIndex ordena por pk)
+    return f"{_now().strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:12]}"
+
+
+def _is_conditional_failure(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def serialize_job(item: dict) -> dict:
+    return {key: value for key, value in item.items() if key not in _INTERNAL_FIELDS}
+
+
+class JobRunner:
+    """Cola y pool de workers de los trabajos de este contenedor."""
+
+    def __init__(self, table, workers: int = JOB_WORKERS):
+        self._table = table
+        self._size = max(1, workers)
+        self._owner = uuid4().hex
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._size)]
+        try:
+            resumed = await self.resume()
+            if resumed:
+                logger.info("Resumed %d background jobs", resumed)
+        except Exception:
+            logger.exception("Error resuming background jobs")
+
+    async def stop(self) -> None:
+        """Para los workers y libera los trabajos pendientes para que otro contenedor los retome."""
+        self._stopping = True
+        pending = set(self._running)
+        while not self._queue.empty():
+            pending.add(self._queue.get_nowait())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for job_id in pending:
+            try:
+                await self._table.update_item(
+                    Key={"pk": pk_job(job_id), "sk": JOB_SORT_KEY},
+                    UpdateExpression="REMOVE #owner",
+                    ConditionExpression="#owner = :me",
+                    ExpressionAttributeNames={"#owner": "owner"},
+                    ExpressionAttributeValues={":me": self._owner},
+                )
+            except Exception:
+                logger.warning("Could not release job %s", job_id)
+
+    async def submit(self, kind: str, params: dict, progress: dict | None = None) -> dict:
+        """Guarda el trabajo como queued y lo encola en este contenedor."""
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = _new_job_id()
+        now = _iso(_now())
+        item = {
+            "pk": pk_job(job_id),
+            "sk": JOB_SORT_KEY,
+            "type": JOB_TYPE,
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "progress": progress or {},
+            "attempts": 0,
+            "owner": self._owner,
+            "created_at": now,
+            "heartbeat_at": now,
+        }
+        await self._table.put_item(Item=item)
+        self._queue.put_nowait(job_id)
+        return serialize_job(item)
+
+    async def get(self, job_id: str) -> dict | None:
+        response = await self._table.get_item(Key={"pk": pk_job(job_id), "sk": JOB_SORT_KEY})
+        item = response.get("Item")
+        return serialize_job(item) if item else None
+
+    async def list_jobs(self, status: str | None = None, kind: str | None = None, limit: int = 50) -> list[dict]:
+        """Trabajos más recientes primero."""
+        query = {
+            "IndexName": "GSI_TypeIndex",
+            "KeyConditionExpression": Key("type").eq(JOB_TYPE),
+            "ScanIndexForward": False,
+        }
+        filters = [Attr(name).eq(value) for name, value in (("status", status), ("kind", kind)) if value]
+        if filters:
+            condition = filters[0]
+            for extra in filters[1:]:
+                condition = condition & extra
+            query["FilterExpression"] = condition
+        items = await self._table.query_all(max_items=limit, **query)
+        return [serialize_job(item) for item in items]
+
+    async def cancel(self, job_id: str) -> dict | None:
+        """
+        Pide la cancelación de un trabajo activo. Un trabajo en cola pasa a
+        cancelled al momento; uno en ejecución, en el siguiente heartbeat.
+        Devuelve None si no existe y el trabajo tal cual si ya había terminado.
+        """
+        key = {"pk": pk_job(job_id), "sk": JOB_SORT_KEY}
+        try:
+            response = await self._table.update_item(
+                Key=key,
+                UpdateExpression="SET cancel_requested = :true",
+                ConditionExpression="#status IN (:queued, :running)",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":true": True, ":queued": "queued", ":running": "running"},
+                ReturnValues="ALL_NEW",
+            )
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+            return await self.get(job_id)
+
+        item = response["Attributes"]
+        task = self._running.get(job_id)
+        if task:
+            task.cancel()
+        elif item["status"] == "queued":
+            item = await self._finish(item, "cancelled", condition_status="queued") or item
+        return serialize_job(item)
+
+    async def resume(self) -> int:
+        """Reclama y encola los trabajos activos abandonados (sin dueño o sin heartbeat reciente)."""
+        stale = _iso(_now() - timedelta(seconds=JOB_LEASE_SECONDS))
+        items = await self._table.query_all(
+            IndexName="GSI_TypeIndex",
+            KeyConditionExpression=Key("type").eq(JOB_TYPE),
+            FilterExpression=Attr("status").is_in(list(ACTIVE_STATUSES)),
+        )
+        resumed = 0
+        for item in items:
+            if item.get("owner") and item.get("heartbeat_at", "") >= stale:
+                continue
+            try:
+                await self._table.update_item(
+                    Key={"pk": item["pk"], "sk": item["sk"]},
+                    UpdateExpression="SET #owner = :me, heartbeat_at = :now",
+                    ConditionExpression=(
+                        "#status IN (:queued, :running) "
+                        "AND (attribute_not_exists(#owner) OR heartbeat_at < :stale)"
+                    ),
+                    ExpressionAttributeNames={"#owner": "owner", "#status": "status"},
+                    ExpressionAttributeValues={
+                        ":me": self._owner,
+                        ":now": _iso(_now()),
+                        ":stale": stale,
+                        ":queued": "queued",
+                        ":running": "running",
+                    },
+                )
+            except ClientError as e:
+                if _is_conditional_failure(e):
+                    continue  # lo ha reclamado otro contenedor
+                raise
+            self._queue.put_nowait(item["job_id"])
+            resumed += 1
+        return resumed
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error running job %s", job_id)
+
+    async def _claim(self, job_id: str) -> dict | None:
+        """Pasa el trabajo a running si sigue siendo nuestro y no se ha cancelado."""
+        now = _iso(_now())
+        try:
+            response = await self._table.update_item(
+                Key={"pk": pk_job(job_id), "sk": JOB_SORT_KEY},
+                UpdateExpression=(
+                    "SET #status = :running, heartbeat_at = :now, "
+                    "started_at = if_not_exists(started_at, :now), attempts = attempts + :one"
+                ),
+                ConditionExpression=(
+                    "#status IN (:queued, :running) AND #owner = :me "
+                    "AND attribute_not_exists(cancel_requested)"
+                ),
+                ExpressionAttributeNames={"#status": "status", "#owner": "owner"},
+                ExpressionAttributeValues={
+                    ":running": "running",
+                    ":queued": "queued",
+                    ":now": now,
+                    ":one": 1,
+                    ":me": self._owner,
+                },
+                ReturnValues="ALL_NEW",
+            )
+            return response["Attributes"]
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+        # Cancelado antes de empezar: se cierra aquí si nadie lo ha hecho
+        item = (await self._table.get_item(Key={"pk": pk_job(job_id), "sk": JOB_SORT_KEY})).get("Item")
+        if item and item.get("cancel_requested") and item["status"] in ACTIVE_STATUSES:
+            await self._finish(item, "cancelled")
+        return None
+
+    async def _run(self, job_id: str) -> None:
+        item = await self._claim(job_id)
+        if item is None:
+            return
+        handler = _handlers.get(item["kind"])
+        if handler is None:
+            await self._finish(item, "failed", error=f"Unknown job kind: {item['kind']}")
+            return
+
+        job = Job(item)
+        task = asyncio.create_task(handler(job))
+        self._running[job_id] = task
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        status, result, error = "completed", None, None
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping:
+                raise  # queda running; stop() lo libera para que se reanude
+            status = "cancelled"
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, job.kind)
+            status, error = "failed", str(e)
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+
+        await self._finish(item, status, progress=job.progress, result=result, error=error, owned=True)
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                response = await self._table.update_item(
+                    Key={"pk": pk_job(job.job_id), "sk": JOB_SORT_KEY},
+                    UpdateExpression="SET progress = :progress, heartbeat_at = :now",
+                    ConditionExpression="#owner = :me",
+                    ExpressionAttributeNames={"#owner": "owner"},
+                    ExpressionAttributeValues={":progress": job.progress, ":now": _iso(_now()), ":me": self._owner},
+                    ReturnValues="ALL_NEW",
+                )
+            except ClientError as e:
+                if _is_conditional_failure(e):
+                    logger.warning("Job %s was claimed by another container, cancelling", job.job_id)
+                    task.cancel()
+                    return
+                logger.warning("Heartbeat of job %s failed: %s", job.job_id, e)
+                continue
+            if response["Attributes"].get("cancel_requested"):
+                task.cancel()
+                return
+
+    async def _finish(
+        self,
+        item: dict,
+        status: str,
+        progress: dict | None = None,
+        result: dict | None = None,
+        error: str | None = None,
+        condition_status: str | None = None,
+        owned: bool = False,
+    ) -> dict | None:
+        fields = {"status": status, "finished_at": _iso(_now()), "error": error}
+        if progress is not None:
+            fields["progress"] = progress
+        if result is not None:
+            fields["result"] = result
+        names = {f"#{name}": name for name in fields}
+        values = {f":{name}": value for name, value in fields.items()}
+        if condition_status:
+            condition = "#status = :expected"
+            values[":expected"] = condition_status
+        else:
+            condition = "#status IN (:queued, :running)"
+            values.update({":queued": "queued", ":running": "running"})
+        if owned:
+            # Si otro contenedor lo ha retomado, el resultado es suyo
+            condition += " AND #owner = :me"
+            values[":me"] = self._owner
+        try:
+            response = await self._table.update_item(
+                Key={"pk": item["pk"], "sk": item["sk"]},
+                UpdateExpression="SET " + ", ".join(f"#{name} = :{name}" for name in fields) + " REMOVE #owner",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={**names, "#owner": "owner"},
+                ExpressionAttributeValues=values,
+                ReturnValues="ALL_NEW",
+            )
+            return response["Attributes"]
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return None  # ya lo cerró otro (cancelación o fin concurrente)
+            raise
+
+
+job_runner = JobRunner(async_table)
@@ -0,0 +1,101 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from src.dal.database import async_table
+
+# Configuración de la caché de metadatos (facilities, species, thresholds)
+CACHE_TTL_SECONDS = float(os.getenv("METADATA_CACHE_TTL", "60"))
+CACHE_MAX_SIZE = int(os.getenv("METADATA_CACHE_MAXSIZE", "1024"))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con expiración por TTL.
+
+    Guarda también los resultados negativos (None) para no repetir lecturas
+    de ítems que no existen. Expone contadores de hits/misses/evictions.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Devuelve el valor cacheado o _MISSING si no existe o expiró."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return _MISSING
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+metadata_cache = TTLCache()
+
+
+async def get_cached_item(pk: str, sk: str) -> dict | None:
+    """
+    Lectura read-through de un ítem por (pk, sk).
+    Devuelve una copia para que el llamador pueda modificarla sin tocar la caché.
+    """
+    key = (pk, sk)
+    item = metadata_cache.get(key)
+    if item is _MISSING:
+        response = await async_table.get_item(Key={"pk": pk, "sk": sk})
+        item = response.get("Item")
+        metadata_cache.set(key, item)
+    return copy.deepcopy(item)
+
+
+def invalidate_item(pk: str, sk: str) -> None:
+    """Invalida un ítem tras escribirlo o borrarlo."""
+    metadata_cache.invalidate((pk, sk))
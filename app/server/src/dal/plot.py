@@ -54,16 +54,16 @@ def update_plot_state(plot_id: str, new_state: PlotState) -> None:
     )
 
 def delete_plot(plot_id: str) -> None:
-    response = table.query(
-        KeyConditionExpression=Key("pk").eq(pk_plot(plot_id))
-    )
-    items = response.get("Items", [])
-    
-    for item in items:
-        table.delete_item(
-            Key={
-                "pk": item["pk"],
-                "sk": item["sk"]
-            }
-        )   
+    query = {
+        "KeyConditionExpression": Key("pk").eq(pk_plot(plot_id)),
+        "ProjectionExpression": "pk, sk",
+    }
+    with table.batch_writer() as batch:
+        while True:
+            response = table.query(**query)
+            for item in response.get("Items", []):
+                batch.delete_item(Key={"pk": item["pk"], "sk": item["sk"]})
+            if "LastEvaluatedKey" not in response:
+                break
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
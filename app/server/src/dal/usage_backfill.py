@@ -0,0 +1,117 @@
+"""
+Reconstrucción de los consumos de agua diarios (USAGE#1d#<día>) a partir de
+los EVENT# existentes.
+
+lambda_rollup_processor solo mantiene los días de los eventos que pasan por
+el stream después de su despliegue; este trabajo recalcula el resto con el
+mismo código (src.utils.usage_days). Cada parcela se lee entera una vez,
+página a página, y sus días se escriben con BatchWriteItem; los USAGE#1d
+sin eventos se borran. Es idempotente: se puede repetir o reanudar sin más.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from boto3.dynamodb.conditions import Key
+
+from src.dal.database import async_table
+from src.dal.jobs import Job, job_handler, job_runner
+from src.dal.metadata_cache import get_cached_item
+from src.utils.keys import pk_facility, pk_plot, sk_event, sk_usage
+from src.utils.usage_days import (
+    add_event,
+    empty_stats,
+    event_projection,
+    plot_usage_item,
+    remove_facility_usage,
+    set_facility_usage,
+)
+
+# Parcelas reconstruyéndose a la vez en una instalación
+BACKFILL_PLOT_CONCURRENCY = int(os.getenv("USAGE_BACKFILL_PLOT_CONCURRENCY", "8"))
+
+
+@job_handler("usage_backfill")
+async def _usage_backfill_job(job: Job) -> None:
+    # Al reanudar se rehace todo (es idempotente): los contadores empiezan de cero
+    job.progress.update({"plots_done": 0, "events": 0, "days_written": 0, "days_deleted": 0})
+    if job.params.get("plot_id"):
+        await backfill_plot_usage(job.params["plot_id"], job.params.get("facility_id"), job.progress)
+        job.progress["plots_done"] = 1
+    else:
+        await backfill_facility_usage(job.params["facility_id"], job.progress)
+
+
+async def start_usage_backfill(facility_id: str | None = None, plot_id: str | None = None) -> dict:
+    return await job_runner.submit(
+        "usage_backfill",
+        {"facility_id": facility_id, "plot_id": plot_id},
+        {"plots_total": 1 if plot_id else None, "plots_done": 0, "events": 0, "days_written": 0, "days_deleted": 0},
+    )
+
+
+async def backfill_plot_usage(plot_id: str, facility_id: str | None, progress: dict) -> None:
+    """
+    Reescribe los USAGE#1d de una parcela (y su entrada en los de la
+    instalación) y borra los días que ya no tienen eventos.
+    """
+    query = {
+        "KeyConditionExpression": Key("pk").eq(pk_plot(plot_id)) & Key("sk").begins_with(sk_event("")),
+        **event_projection(),
+    }
+    days: dict[str, dict] = {}
+    while True:
+        response = await async_table.query(**query)
+        for item in response.get("Items", []):
+            facility_id = facility_id or item.get("FacilityId")
+            add_event(days.setdefault(item["sk"][len(sk_event("")):][:10], empty_stats()), item)
+            progress["events"] += 1
+        if "LastEvaluatedKey" not in response:
+            break
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    if not facility_id:
+        lookup = await get_cached_item(pk_plot(plot_id), "Metadata")
+        facility_id = (lookup or {}).get("facility_id")
+
+    # Días guardados cuyos eventos ya no existen
+    stale = [
+        item for item in await async_table.query_all(
+            KeyConditionExpression=Key("pk").eq(pk_plot(plot_id)) & Key("sk").begins_with(sk_usage("")),
+            ProjectionExpression="pk, sk, FacilityId",
+        )
+        if item["sk"][len(sk_usage("")):] not in days
+    ]
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    await async_table.batch_write(
+        [plot_usage_item(plot_id, day, stats, facility_id, now) for day, stats in days.items()],
+        [{"pk": item["pk"], "sk": item["sk"]} for item in stale],
+    )
+
+    table = async_table.table
+    if facility_id:
+        for day, stats in days.items():
+            await async_table.run(set_facility_usage, table, facility_id, day, plot_id, stats, now)
+    for item in stale:
+        stale_facility = item.get("FacilityId") or facility_id
+        if stale_facility:
+            await async_table.run(remove_facility_usage, table, stale_facility, item["sk"][len(sk_usage("")):], plot_id)
+    progress["days_written"] += len(days)
+    progress["days_deleted"] += len(stale)
+
+
+async def backfill_facility_usage(facility_id: str, progress: dict) -> None:
+    plots = await async_table.query_all(
+        KeyConditionExpression=Key("pk").eq(pk_facility(facility_id)) & Key("sk").begins_with("PLOT#"),
+        ProjectionExpression="sk, plot_id",
+    )
+    progress["plots_total"] = len(plots)
+    semaphore = asyncio.Semaphore(max(1, BACKFILL_PLOT_CONCURRENCY))
+
+    async def backfill(plot: dict) -> None:
+        async with semaphore:
+            await backfill_plot_usage(plot.get("plot_id") or plot["sk"].split("#", 1)[-1], facility_id, progress)
+            progress["plots_done"] += 1
+
+    await asyncio.gather(*(backfill(plot) for plot in plots))
@@ -8,11 +8,14 @@ from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 import logging
 from contextlib import asynccontextmanager
-from src.routers import facilities, irrigations, plot, sensors, recommended_irrigation, user, species  
+from src.routers import facilities, irrigations, jobs, plot, sensors, recommended_irrigation, user, species  
 from src.dal.database import table 
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from src.dal.database import init_db
+from src.dal.database import init_db, async_table
+from src.dal.jobs import job_runner
+from src.dal.metadata_cache import metadata_cache
+from src.utils.serialization import FastJSONResponse
 
 logger = logging.getLogger("uvicorn")
 BASE_DIR = Path(__file__).resolve().parent
@@ -23,8 +26,11 @@ async def lifespan(app: FastAPI):
     """Gestor de contexto para el ciclo de vida de la aplicación FastAPI."""
     logger.info("🚀 Iniciando API de MERIDA...")
     await init_db()  # crea la tabla si no existe (no bloquea FastAPI)
+    await job_runner.start()  # workers de trabajos en segundo plano y reanudación de los pendientes
     yield
     logger.info("🛑 Apagando API de MERIDA...")
+    await job_runner.stop()
+    async_table.shutdown()
 
 app = FastAPI(
     title="FASTAPI - MÉRIDA",
@@ -35,6 +41,7 @@ app = FastAPI(
     redoc_url="/redoc",
     swagger_favicon_url="src/static/plant.ico",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,  # orjson y Decimal -> int/float
     redirect_slashes=False  # Deshabilitar redirects automáticos de trailing slash
 )
 
@@ -58,8 +65,9 @@ logger.info("🚀🪴 API de MERIDA iniciada. DynamoDB listo para recibir consul
 
 app.include_router(facilities.router)
 app.include_router(irrigations.router)
+app.include_router(jobs.router)
 app.include_router(plot.router)
-#app.include_router(recommended_irrigation.router)
+app.include_router(recommended_irrigation.router)
 app.include_router(sensors.router)
 app.include_router(species.router)
 #app.include_router(user.router)
@@ -71,4 +79,8 @@ def read_root():
 @app.get("/ping")
 def ping():
     return {"status": "OK"}
-    
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Contadores de la caché de metadatos (hits, misses, evictions)."""
+    return metadata_cache.stats()
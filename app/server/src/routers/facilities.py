@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
 from botocore.exceptions import ClientError
 import json
 from boto3.dynamodb.conditions import Key, Attr
-from src.schemas.facilities import FacilityCreate, FacilityUpdate
-from src.dal.database import table
+from src.schemas.facilities import FacilityCreate, FacilityCurrentStates, FacilityItem, FacilityPage, FacilityUpdate
+from src.dal.cascade import start_facility_deletion
+from src.dal.database import async_table
+from src.dal.metadata_cache import get_cached_item, invalidate_item
+from src.routers.plot import serialize_plot_state
+from src.utils.aggregation import METRICS
+from src.utils.export import check_export_params, export_response, iter_facility_rows
+from src.utils.keys import pk_plot, sk_latest
+from src.utils.pagination import DEFAULT_PAGE_SIZE, iter_query, ndjson_response, query_page, wants_ndjson
 from uuid import uuid4
 """
 🏢 Instalaciones
@@ -12,36 +20,32 @@ GET /facilities/{facility_id}
 POST /facilities
 PUT /facilities/{facility_id}
 DELETE /facilities/{facility_id}
+GET /facilities/{facility_id}/current-states
+GET /facilities/{facility_id}/export
 """
 
 router = APIRouter(prefix="/facilities", tags=["Instalaciones"])
 
-@router.get("/", description="Obtener todas las instalaciones")
-async def get_facilities():
+@router.get("/", response_model=FacilityPage, description="Obtener todas las instalaciones")
+async def get_facilities(request: Request, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, stream: bool = False):
+    """
+    Devuelve las instalaciones paginadas por cursor (`next_cursor`).
+    Con stream=true o Accept: application/x-ndjson responde en NDJSON.
+    """
+    query = {
+        "IndexName": "GSI_TypeIndex",
+        "KeyConditionExpression": Key("type").eq("FACILITY")
+    }
     try:
-        response = table.query(
-            IndexName="GSI_TypeIndex",
-            KeyConditionExpression=Key("type").eq("FACILITY")
-        )
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
 
-        facilities = response.get("Items", [])
-
-        # Manejo de paginación si hay más resultados
-        while "LastEvaluatedKey" in response:
-            response = table.query(
-                IndexName="GSI_TypeIndex",
-                KeyConditionExpression=Key("type").eq("FACILITY"),
-                ProjectionExpression="#pk, #sk, #n, #l",
-                ExpressionAttributeNames={
-                    "#pk": "pk",
-                    "#sk": "sk",
-                    "#n": "name",
-                    "#l": "location"
-                }
-            )
-            facilities.extend(response.get("Items", []))
-
-        return {"count": len(facilities), "facilities": facilities}
+        facilities, next_cursor = await query_page(async_table, limit, cursor, **query)
+
+        return {"count": len(facilities), "facilities": facilities, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
 
     except ClientError as e:
         msg = e.response.get("Error", {}).get("Message", str(e))
@@ -64,7 +68,7 @@ async def create_facility(facility: FacilityCreate):
             "type": "FACILITY"
         }
 
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
 
         return {
             "message": "Facility created successfully",
@@ -75,28 +79,107 @@ async def create_facility(facility: FacilityCreate):
         raise HTTPException(status_code=500, detail=f"Error creating facility: {e}")
     
 
-@router.get("/{facility_id}", description="Obtener detalles de una instalación")
+@router.get("/{facility_id}", response_model=FacilityItem, description="Obtener detalles de una instalación")
 async def get_facility(facility_id: str):
-    response = table.get_item(
-        Key={
-            "pk": f"FACILITY#{facility_id}",
-            "sk": "Metadata"
-        }
-    )
+    facility = await get_cached_item(f"FACILITY#{facility_id}", "Metadata")
 
-    if "Item" not in response:
+    if not facility:
         raise HTTPException(status_code=404, detail="Facility not found")
     
-    return response.get("Item")
+    return facility
 
-@router.put("/{facility_id}", description="Actualizar una instalación")
-async def update_facility(facility_id: str, facility: FacilityUpdate):
+@router.get("/{facility_id}/current-states", response_model=FacilityCurrentStates, description="Obtener el estado actual de todas las parcelas de una instalación")
+async def get_facility_current_states(facility_id: str):
+    """
+    Último estado de sensores de cada parcela de la instalación.
+
+    Una query de las parcelas (FACILITY#id / PLOT#) y un BatchGetItem de sus
+    ítems PLOT#id / LATEST, en lotes de 100 lanzados en paralelo. Solo las
+    parcelas sin LATEST (datos anteriores a este ítem) consultan su última
+    lectura STATE#. Las parcelas sin lecturas se devuelven con timestamp None.
+    """
     try:
-        response = table.get_item(
-            Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"}
+        plots = await async_table.query_all(
+            KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#"),
+            ProjectionExpression="sk, plot_id, #name",
+            ExpressionAttributeNames={"#name": "name"},
         )
 
-        if "Item" not in response:
+        if not plots and not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
+            raise HTTPException(status_code=404, detail="Facility not found")
+
+        plot_ids = [plot.get("plot_id") or plot["sk"].split("#", 1)[-1] for plot in plots]
+        latest = await async_table.batch_get(
+            [{"pk": pk_plot(plot_id), "sk": sk_latest()} for plot_id in plot_ids],
+            ProjectionExpression="pk, #ts, " + ", ".join(f"#{metric}" for metric in METRICS),
+            ExpressionAttributeNames={"#ts": "Timestamp", **{f"#{metric}": metric for metric in METRICS}},
+        )
+        states = {item["pk"].split("#", 1)[-1]: item for item in latest}
+
+        missing = [plot_id for plot_id in plot_ids if plot_id not in states]
+        for plot_id, state in zip(missing, await asyncio.gather(*(_latest_state_reading(p) for p in missing))):
+            if state is not None:
+                states[plot_id] = state
+
+        results = []
+        for plot, plot_id in zip(plots, plot_ids):
+            entry = serialize_plot_state(plot_id, states.get(plot_id, {}))
+            entry["name"] = plot.get("name")
+            results.append(entry)
+
+        return {
+            "facility_id": facility_id,
+            "count": len(results),
+            "states": results
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining current states: {e}")
+
+
+async def _latest_state_reading(plot_id: str) -> dict | None:
+    response = await async_table.query(
+        KeyConditionExpression=Key("pk").eq(pk_plot(plot_id)) & Key("sk").begins_with("STATE#"),
+        ScanIndexForward=False,
+        Limit=1
+    )
+    items = response.get("Items", [])
+    return items[0] if items else None
+
+
+@router.get("/{facility_id}/export", description="Exportar el historial de estados de todas las parcelas de una instalación (CSV o Parquet)")
+async def export_facility_history(facility_id: str, format: str = "csv", start_date: str = None, end_date: str = None):
+    """
+    Descarga las lecturas del rango de todas las parcelas, parcela a parcela
+    y en orden cronológico dentro de cada una. Se emite en streaming: la
+    memoria no depende del tamaño del rango.
+    """
+    check_export_params(format, start_date, end_date)
+    try:
+        plots = await async_table.query_all(
+            KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#"),
+            ProjectionExpression="sk, plot_id",
+        )
+        if not plots and not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
+            raise HTTPException(status_code=404, detail="Facility not found")
+
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting facility history: {e}")
+
+    plot_ids = sorted(plot.get("plot_id") or plot["sk"].split("#", 1)[-1] for plot in plots)
+    return export_response(
+        format,
+        iter_facility_rows(async_table, plot_ids, start_date, end_date),
+        "facility", facility_id, start_date, end_date,
+    )
+
+
+@router.put("/{facility_id}", description="Actualizar una instalación")
+async def update_facility(facility_id: str, facility: FacilityUpdate):
+    try:
+        if not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Facility not found")
 
         update_data = facility.model_dump(exclude_unset=True)
@@ -118,13 +201,14 @@ async def update_facility(facility_id: str, facility: FacilityUpdate):
 
         update_expression = "SET " + ", ".join(update_expressions)
 
-        result = table.update_item(
+        result = await async_table.update_item(
             Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"},
             UpdateExpression=update_expression,
             ExpressionAttributeNames=expression_attribute_names,
             ExpressionAttributeValues=expression_attribute_values,
             ReturnValues="ALL_NEW"  # Devuelve el ítem actualizado
         )
+        invalidate_item(f"FACILITY#{facility_id}", "Metadata")
 
         return {
             "message": "Facility updated successfully",
@@ -136,23 +220,22 @@ async def update_facility(facility_id: str, facility: FacilityUpdate):
 
 
 
-@router.delete("/{facility_id}", description="Eliminar una instalación")
+@router.delete("/{facility_id}", status_code=202, description="Eliminar una instalación")
 async def delete_facility(facility_id: str):
+    """
+    Borra en segundo plano la instalación, sus parcelas y todos sus ítems.
+    El progreso se consulta en /jobs/{job_id}.
+    """
     try:
-        response = table.get_item(
-            Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"}
-        )
-
-        if "Item" not in response:
+        if not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Facility not found")
 
-        table.delete_item(
-            Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"}
-        )
-
+        job = await start_facility_deletion(facility_id)
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Error deleting facility: {e}")
 
+    return {"message": f"Deletion of facility {facility_id} started", "job": job}
+
 
 @router.get("/{facility_id}/responsibles", description="Obtener emails de responsables de una facility")
 async def get_facility_responsibles(facility_id: str):
@@ -162,28 +245,18 @@ async def get_facility_responsibles(facility_id: str):
     """
     try:
         # Verificar que la facility existe
-        facility_response = table.get_item(
-            Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"}
-        )
-        
-        if "Item" not in facility_response:
+        if not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Facility not found")
         
         # Buscar responsables
-        response = table.get_item(
-            Key={
-                "pk": f"FACILITY#{facility_id}",
-                "sk": "RESPONSIBLES"
-            }
-        )
+        record = await get_cached_item(f"FACILITY#{facility_id}", "RESPONSIBLES")
         
-        if "Item" not in response:
+        if not record:
             return {
                 "facility_id": facility_id,
                 "responsibles": []
             }
         
-        record = response["Item"]
         responsibles = record.get("responsibles", [])
         
         return {
@@ -209,11 +282,7 @@ async def update_facility_responsibles(facility_id: str, emails: dict):
     """
     try:
         # Verificar que la facility existe
-        facility_response = table.get_item(
-            Key={"pk": f"FACILITY#{facility_id}", "sk": "Metadata"}
-        )
-        
-        if "Item" not in facility_response:
+        if not await get_cached_item(f"FACILITY#{facility_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Facility not found")
         
         # Validar emails
@@ -238,7 +307,8 @@ async def update_facility_responsibles(facility_id: str, emails: dict):
             "type": "FACILITY_RESPONSIBLES"
         }
         
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
+        invalidate_item(f"FACILITY#{facility_id}", "RESPONSIBLES")
         
         return {
             "message": "Responsibles updated successfully",
@@ -1,20 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request
 from boto3.dynamodb.conditions import Key, Attr
-from src.dal.database import table
+from botocore.exceptions import ClientError
+from src.dal.database import async_table
+from src.dal.usage_backfill import start_usage_backfill
+from src.schemas.irrigations import IrrigationPage
+from src.utils.aggregation import parse_timestamp
+from src.utils.keys import gsi_pk, gsi_sk_bounds, pk_facility, pk_plot, sk_usage
+from src.utils.usage import DEFAULT_RANGE_DAYS, MAX_RANGE_DAYS as MAX_USAGE_RANGE_DAYS, PERIODS, summarize
+from src.utils.pagination import DEFAULT_PAGE_SIZE, iter_query, ndjson_response, query_page, wants_ndjson
 
 """
 💧 Riegos
 GET /plots/{plot_id}/last-irrigation
 GET /plots/{plot_id}/irrigations
 POST /plots/{plot_id}/irrigation
+GET /irrigations/facility/{facility_id}/irrigations?date=|start_date=&end_date=
+GET /irrigations/plot/{plot_id}/usage
+GET /irrigations/facility/{facility_id}/usage
+POST /irrigations/plot/{plot_id}/usage/backfill
+POST /irrigations/facility/{facility_id}/usage/backfill
 """
 
 router = APIRouter(prefix="/irrigations", tags=["Riegos"])
 
+# Sub-queries diarias en vuelo para los rangos de varios días
+IRRIGATION_QUERY_CONCURRENCY = int(os.getenv("IRRIGATION_QUERY_CONCURRENCY", "8"))
+MAX_RANGE_DAYS = 366
+
 @router.get("/plot/{plot_id}/last-irrigation",  description="Obtener el último riego de una parcela")
 async def get_last_irrigation(plot_id: str):
     try:
-        response = table.query(
+        response = await async_table.query(
             KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("EVENT#"),
             ScanIndexForward=False,  # orden descendente (último primero)
             Limit=1
@@ -63,57 +82,141 @@ async def get_last_irrigation(plot_id: str):
         raise HTTPException(status_code=500, detail=f"Error obtaining last irrigation: {e}")
     
 
-@router.get("/plot/{plot_id}/irrigations", description="Obtener todos los riegos de una parcela")
-async def get_irrigations(plot_id: str):
+@router.get("/plot/{plot_id}/irrigations", response_model=IrrigationPage, description="Obtener todos los riegos de una parcela")
+async def get_irrigations(
+    request: Request,
+    plot_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    stream: bool = False,
+):
+    query = {
+        "KeyConditionExpression": Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("EVENT#"),
+        "ScanIndexForward": False  # opcional: False para más recientes primero
+    }
     try:
-        response = table.query(
-            KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("EVENT#"),
-            ScanIndexForward=False  # opcional: False para más recientes primero
-        )
-        items = response.get("Items", [])
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
+
+        items, next_cursor = await query_page(async_table, limit, cursor, **query)
 
         return {
             "count": len(items),
-            "irrigations": items
+            "irrigations": items,
+            "next_cursor": next_cursor
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obtaining irrigations: {e}")
 
 
-@router.get("/facility/{facility_id}/irrigations", description="Obtener riegos de todos los plots de una facility en una fecha")
-async def get_facility_irrigations(facility_id: str, date: str = None):
+@router.get("/plot/{plot_id}/usage", description="Consumo de agua de riego de una parcela por día, semana o mes")
+async def get_plot_water_usage(plot_id: str, period: str = "day", start_date: str = None, end_date: str = None):
     """
-    Obtener irrigaciones de una facility en una fecha específica.
-    date format: YYYY-MM-DD (ejemplo: 2024-11-10)
+    Agua total, número de riegos y duración media por periodo, a partir de
+    los agregados diarios PLOT#id / USAGE#1d#<día> (una query por rango).
     """
+    start, end = _usage_range(period, start_date, end_date)
     try:
-        from datetime import datetime, timedelta
-        
-        # Si no se proporciona fecha, usar hoy
-        if not date:
-            target_date = datetime.utcnow().date()
-        else:
-            try:
-                target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-        
-        # Calcular rango de timestamps para el día completo
-        start_time = datetime.combine(target_date, datetime.min.time()).isoformat() + "Z"
-        end_time = datetime.combine(target_date, datetime.max.time()).isoformat() + "Z"
-        
-        # Consultar usando el GSI principal con facility_id
-        response = table.query(
-            IndexName="GSI",
-            KeyConditionExpression=Key("GSI_PK").eq(f"FACILITY#{facility_id}"),
-            FilterExpression=Attr("sk").begins_with("EVENT#") & 
-                           Attr("Timestamp").between(start_time, end_time)
-        )
-        
-        items = response.get("Items", [])
-        
-        # Organizar por plot_id
+        items = await _usage_items(pk_plot(plot_id), start, end)
+        return {"plot_id": plot_id, "period": period, "start_date": start, "end_date": end, **summarize(items, period)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining water usage: {e}")
+
+
+@router.get("/facility/{facility_id}/usage", description="Consumo de agua de riego de una instalación por día, semana o mes")
+async def get_facility_water_usage(facility_id: str, period: str = "day", start_date: str = None, end_date: str = None):
+    """
+    Como el de parcela, sobre FACILITY#id / USAGE#1d#<día>: un ítem por día
+    con el consumo de cada parcela, así un año son unas pocas páginas.
+    """
+    start, end = _usage_range(period, start_date, end_date)
+    try:
+        items = await _usage_items(pk_facility(facility_id), start, end)
+        return {"facility_id": facility_id, "period": period, "start_date": start, "end_date": end, **summarize(items, period)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining water usage: {e}")
+
+
+@router.post("/plot/{plot_id}/usage/backfill", status_code=202, description="Reconstruir los consumos diarios de una parcela a partir de sus riegos")
+async def backfill_plot_water_usage(plot_id: str):
+    """
+    Recalcula en segundo plano los USAGE#1d de todos los EVENT# de la parcela
+    (también los anteriores a lambda_rollup_processor). El progreso se
+    consulta en /jobs/{job_id}.
+    """
+    try:
+        job = await start_usage_backfill(plot_id=plot_id)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error starting water usage backfill: {e}")
+    return {"message": f"Water usage backfill of plot {plot_id} started", "job": job}
+
+
+@router.post("/facility/{facility_id}/usage/backfill", status_code=202, description="Reconstruir los consumos diarios de todas las parcelas de una instalación")
+async def backfill_facility_water_usage(facility_id: str):
+    """Como el de parcela, para todas las parcelas de la instalación."""
+    try:
+        job = await start_usage_backfill(facility_id=facility_id)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error starting water usage backfill: {e}")
+    return {"message": f"Water usage backfill of facility {facility_id} started", "job": job}
+
+
+def _usage_range(period: str, start_date: str | None, end_date: str | None) -> tuple[str, str]:
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period. Use one of: {', '.join(PERIODS)}")
+    try:
+        end = parse_timestamp(end_date).date() if end_date else datetime.now(timezone.utc).date()
+        start = parse_timestamp(start_date).date() if start_date else end - timedelta(days=DEFAULT_RANGE_DAYS[period] - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    if (end - start).days + 1 > MAX_USAGE_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {MAX_USAGE_RANGE_DAYS} days)")
+    return start.isoformat(), end.isoformat()
+
+
+async def _usage_items(pk: str, start: str, end: str) -> list:
+    return await async_table.query_all(
+        KeyConditionExpression=Key("pk").eq(pk) & Key("sk").between(sk_usage(start), sk_usage(end)),
+    )
+
+
+@router.get("/facility/{facility_id}/irrigations", description="Obtener riegos de todos los plots de una facility en una fecha o rango")
+async def get_facility_irrigations(facility_id: str, date: str = None, start_date: str = None, end_date: str = None):
+    """
+    Obtener irrigaciones de una facility en una fecha o en un rango de fechas.
+    date format: YYYY-MM-DD (ejemplo: 2024-11-10); start_date/end_date aceptan
+    YYYY-MM-DD o un timestamp ISO. Sin parámetros: hoy.
+
+    Consulta el GSI por GSI_PK = FACILITY#id y GSI_SK BETWEEN TIMESTAMP#inicio
+    AND TIMESTAMP#fin, un día por sub-query (en paralelo) siguiendo todas las
+    páginas. El coste de lectura depende solo de la ventana pedida; el filtro
+    por EVENT# descarta las lecturas STATE# de esa ventana, que comparten GSI_SK.
+    """
+    try:
+        start, end = _irrigation_range(date, start_date, end_date)
+        days = _split_days(start, end)
+        if len(days) > MAX_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail=f"Range too large: {len(days)} days (max {MAX_RANGE_DAYS})")
+
+        semaphore = asyncio.Semaphore(max(1, IRRIGATION_QUERY_CONCURRENCY))
+
+        async def query_day(low: str, high: str) -> list:
+            async with semaphore:
+                return await async_table.query_all(
+                    IndexName="GSI",
+                    KeyConditionExpression=Key("GSI_PK").eq(gsi_pk(facility_id)) & Key("GSI_SK").between(low, high),
+                    FilterExpression=Attr("sk").begins_with("EVENT#"),
+                )
+
+        pages = await asyncio.gather(*(query_day(*gsi_sk_bounds(low, high)) for low, high in days))
+        items = [item for page in pages for item in page]
+
+        # Organizar por plot_id (en orden cronológico: los días llegan en orden)
         irrigations_by_plot = {}
         for item in items:
             plot_id = item.get("PlotId") or item.get("plot_id")
@@ -124,15 +227,47 @@ async def get_facility_irrigations(facility_id: str, date: str = None):
                     "timestamp": item.get("Timestamp"),
                     "details": item
                 })
-        
+
         return {
             "facility_id": facility_id,
-            "date": date or target_date.isoformat(),
+            "date": date or (start[:10] if start[:10] == end[:10] else None),
+            "start_date": start,
+            "end_date": end,
             "irrigations_by_plot": irrigations_by_plot,
             "total_events": len(items)
         }
-    
+
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obtaining facility irrigations: {str(e)}")
+
+
+def _irrigation_range(date: str | None, start_date: str | None, end_date: str | None) -> tuple[str, str]:
+    """(inicio, fin) ISO inclusivos; una fecha sin hora abarca el día completo."""
+    if date:
+        start_date = end_date = date
+    if not start_date and not end_date:
+        start_date = end_date = datetime.now(timezone.utc).date().isoformat()
+    try:
+        end = parse_timestamp(end_date) if end_date else datetime.now(timezone.utc)
+        if end_date and len(end_date) == 10:
+            end = end.replace(hour=23, minute=59, second=59)
+        start = parse_timestamp(start_date) if start_date else (end - timedelta(days=1))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD or an ISO timestamp")
+    if start > end:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return start.strftime("%Y-%m-%dT%H:%M:%SZ"), end.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _split_days(start: str, end: str) -> list[tuple[str, str]]:
+    """Trocea [start, end] en intervalos de un día natural (UTC)."""
+    first = datetime.strptime(start[:10], "%Y-%m-%d").date()
+    last = datetime.strptime(end[:10], "%Y-%m-%d").date()
+    days = []
+    for offset in range((last - first).days + 1):
+        day = (first + timedelta(days=offset)).isoformat()
+        # Los extremos del rango pueden caer a mitad de día; los días intermedios van completos
+        days.append((start if offset == 0 else day, end if day == end[:10] else day))
+    return days
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException
+from botocore.exceptions import ClientError
+from src.dal.jobs import FINISHED_STATUSES, STATUSES, job_runner
+
+"""
+⚙️ Trabajos en segundo plano
+GET /jobs
+GET /jobs/{job_id}
+POST /jobs/{job_id}/cancel
+
+Los lanzan otros endpoints (p. ej. DELETE /plots/{plot_id}) y devuelven el
+trabajo creado; aquí se consulta su estado y progreso.
+"""
+
+router = APIRouter(prefix="/jobs", tags=["Trabajos"])
+
+MAX_JOBS_LIMIT = 200
+
+
+@router.get("/", description="Listar los trabajos más recientes")
+async def get_jobs(status: str = None, kind: str = None, limit: int = 50):
+    if status and status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(STATUSES)}")
+    if not 1 <= limit <= MAX_JOBS_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_JOBS_LIMIT}")
+    try:
+        jobs = await job_runner.list_jobs(status=status, kind=kind, limit=limit)
+        return {"jobs": jobs, "count": len(jobs)}
+
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching jobs: {e}")
+
+
+@router.get("/{job_id}", description="Consultar el estado y progreso de un trabajo")
+async def get_job(job_id: str):
+    try:
+        job = await job_runner.get(job_id)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job: {e}")
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", status_code=202, description="Cancelar un trabajo en cola o en ejecución")
+async def cancel_job(job_id: str):
+    try:
+        job = await job_runner.cancel(job_id)
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=f"Error cancelling job: {e}")
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in FINISHED_STATUSES and not job.get("cancel_requested"):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return {"message": "Job cancellation requested", "job": job}
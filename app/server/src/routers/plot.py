@@ -1,25 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+from typing import List, Union
+from fastapi import APIRouter, Depends, HTTPException, Request
 from boto3.dynamodb.conditions import Key, Attr
 from src.schemas.facilities import FacilityBase, FacilityCreate, FacilityRead, FacilityUpdate
-from src.schemas.plot import PlotBase, PlotCreate, PlotUpdate
-from src.dal.database import table
+from src.schemas.plot import (
+    AggregatedHistory,
+    FacilityPlotPage,
+    HistoryPoint,
+    PlotBase,
+    PlotCreate,
+    PlotCreated,
+    PlotPage,
+    PlotRead,
+    PlotState,
+    PlotThresholds,
+    PlotThresholdsUpdated,
+    PlotUpdate,
+    ThresholdsBacktest,
+)
+from src.dal.cascade import start_plot_deletion
+from src.dal.database import async_table
+from src.dal.metadata_cache import get_cached_item, invalidate_item
+from src.utils.aggregation import (
+    METRICS,
+    RESOLUTIONS,
+    ROLLUP_RESOLUTIONS,
+    BucketAggregator,
+    parse_range_end,
+    parse_timestamp,
+    rollup_to_bucket,
+)
+from src.utils.backtest import RANGE_FIELDS, ThresholdBacktest, resolve_bounds
+from src.utils.export import check_export_params, export_response, iter_plot_rows
+from src.utils.keys import sk_latest, sk_rollup, sk_state_bounds
+from src.utils.pagination import DEFAULT_PAGE_SIZE, iter_query, ndjson_response, query_page, wants_ndjson
 from uuid import uuid4
 from botocore.exceptions import ClientError
 from decimal import Decimal
+from datetime import datetime, timedelta, timezone
 
 
-def convert_decimals(obj):
-    """Convierte Decimal a float/int recursivamente para serialización JSON"""
-    if isinstance(obj, list):
-        return [convert_decimals(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimals(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        # Convertir a int si es un número entero, sino a float
-        return int(obj) if obj % 1 == 0 else float(obj)
-    else:
-        return obj
-
 """
 🪴 Parcelas
 GET /facilities/{facility_id}/plots
@@ -28,13 +49,19 @@ POST /plots
 PUT /plots/{plot_id}
 DELETE /plots/{plot_id}
 GET /plots/{plot_id}/location
+GET /plots/{plot_id}/export
 GET /plots/pending-irrigation
+POST /plots/{plot_id}/thresholds/backtest
+POST /plots/facility/{facility_id}/thresholds/backtest
 """
 
 router = APIRouter(prefix="/plots", tags=["Parcelas"])
 
+# Backtests de parcelas en paralelo para la variante por instalación
+BACKTEST_CONCURRENCY = int(os.getenv("BACKTEST_CONCURRENCY", "16"))
+
 
-def _create_default_thresholds(plot_id: str, facility_id: str, species_id: str):
+async def _create_default_thresholds(plot_id: str, facility_id: str, species_id: str):
     """
     Crea umbrales por defecto para un plot desde los umbrales de la especie.
     Si la especie no tiene umbrales configurados, crea umbrales genéricos por defecto.
@@ -45,28 +72,14 @@ def _create_default_thresholds(plot_id: str, facility_id: str, species_id: str):
     
     # 1. Intentar facility-specific
     try:
-        response = table.get_item(
-            Key={
-                "pk": f"FACILITY#{facility_id}",
-                "sk": f"SPECIES#{species_id}"
-            }
-        )
-        if "Item" in response:
-            species_thresholds = response["Item"]
+        species_thresholds = await get_cached_item(f"FACILITY#{facility_id}", f"SPECIES#{species_id}")
     except ClientError:
         pass
     
     # 2. Si no hay facility-specific, intentar global
     if not species_thresholds:
         try:
-            response = table.get_item(
-                Key={
-                    "pk": f"SPECIES#{species_id}",
-                    "sk": "PROFILE"
-                }
-            )
-            if "Item" in response:
-                species_thresholds = response["Item"]
+            species_thresholds = await get_cached_item(f"SPECIES#{species_id}", "PROFILE")
         except ClientError:
             pass
     
@@ -110,40 +123,37 @@ def _create_default_thresholds(plot_id: str, facility_id: str, species_id: str):
         print(f"No thresholds found for species {species_id}, created generic default thresholds for plot {plot_id} (umbral_enabled=False)")
     
     # Guardar en DynamoDB
-    table.put_item(Item=plot_thresholds)
+    await async_table.put_item(Item=plot_thresholds)
+    invalidate_item(f"PLOT#{plot_id}", "THRESHOLDS")
+
+@router.get("/", response_model=PlotPage, description="Obtener todas las parcelas")
+async def get_plots(request: Request, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, stream: bool = False):
+    """
+    Devuelve las parcelas paginadas por cursor.
 
-@router.get("/", description="Obtener todas las parcelas")
-async def get_plots():
+    Parámetros:
+    - limit: tamaño de página (default: DEFAULT_PAGE_SIZE, max: 1000)
+    - cursor: valor `next_cursor` de la página anterior
+    - stream: devuelve application/x-ndjson a medida que llegan las páginas
+      (también con el header Accept: application/x-ndjson)
+    """
+    query = {
+        "IndexName": "GSI_TypeIndex",
+        "KeyConditionExpression": Key("type").eq("PLOT")
+    }
     try:
-        response = table.query(
-            IndexName="GSI_TypeIndex",
-            KeyConditionExpression=Key("type").eq("PLOT")
-        )
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
 
-        plots = response.get("Items", [])
-
-        # Manejo de paginación si hay más resultados
-        while "LastEvaluatedKey" in response:
-            response = table.query(
-                IndexName="GSI_TypeIndex",
-                KeyConditionExpression=Key("type").eq("PLOT"),
-                ProjectionExpression="#pk, #sk, #n, #l",
-                ExpressionAttributeNames={
-                    "#pk": "pk",
-                    "#sk": "sk",
-                    "#n": "name",
-                    "#l": "location"
-                }
-            )
-            plots.extend(response.get("Items", []))
+        plots, next_cursor = await query_page(async_table, limit, cursor, **query)
         
-        if not plots:
+        if not plots and not cursor:
             raise HTTPException(status_code=404, detail="No plots found")
 
-        # Convertir Decimals a float/int para JSON
-        plots_converted = convert_decimals(plots)
+        return {"count": len(plots), "plots": plots, "next_cursor": next_cursor}
 
-        return {"count": len(plots_converted), "plots": plots_converted}
+    except HTTPException:
+        raise
 
     except ClientError as e:
         msg = e.response.get("Error", {}).get("Message", str(e))
@@ -152,43 +162,45 @@ async def get_plots():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-@router.get("/facility/{facility_id}", description="Obtener parcelas de una instalación")
-async def get_plots_by_facility(facility_id: str):
+@router.get("/facility/{facility_id}", response_model=FacilityPlotPage, description="Obtener parcelas de una instalación")
+async def get_plots_by_facility(
+    request: Request,
+    facility_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    stream: bool = False,
+):
     """
-    Devuelve todas las parcelas asociadas a una instalación específica.
+    Devuelve las parcelas asociadas a una instalación específica, paginadas por cursor.
     """
+    # Query DynamoDB usando pk y sk
+    query = {
+        "KeyConditionExpression": Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#")
+    }
     try:
-        # Query DynamoDB usando pk y sk
-        response = table.query(
-            KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#")
-        )
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
 
-        plots = response.get("Items", [])
+        plots, next_cursor = await query_page(async_table, limit, cursor, **query)
 
-        if not plots:
+        if not plots and not cursor:
             raise HTTPException(status_code=404, detail="No se encontraron parcelas para esta instalación")
 
-        # Convertir Decimals a float/int para JSON
-        plots_converted = convert_decimals(plots)
-
         return {
             "facility_id": facility_id,
-            "count": len(plots_converted),
-            "plots": plots_converted
+            "count": len(plots),
+            "plots": plots,
+            "next_cursor": next_cursor
         }
 
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Error obtaining plots for the facility: {e}")
 
-@router.post("/", description="Crear una nueva parcela")
+@router.post("/", response_model=PlotCreated, description="Crear una nueva parcela")
 async def create_plot(plot: PlotCreate):
     try:
         # Verificar que la instalación exista
-        response = table.get_item(
-            Key={"pk": f"FACILITY#{plot.facility_id}", "sk": "Metadata"}
-        )
-
-        if "Item" not in response:
+        if not await get_cached_item(f"FACILITY#{plot.facility_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Facility not found")
     
         plot_id = str(uuid4())
@@ -209,30 +221,44 @@ async def create_plot(plot: PlotCreate):
         if plot.area is not None:
             item["area"] = Decimal(str(plot.area))
 
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
+        await async_table.put_item(Item=_plot_lookup_item(item))
         
         # SIEMPRE crear umbrales por defecto (desde la especie o genéricos)
         try:
             species_for_thresholds = plot.species if plot.species else "generic"
-            _create_default_thresholds(plot_id, plot.facility_id, species_for_thresholds)
+            await _create_default_thresholds(plot_id, plot.facility_id, species_for_thresholds)
         except Exception as e:
             # No fallar la creación del plot si falla la creación de thresholds
             print(f"Warning: Could not create default thresholds: {e}")
-        
-        # Convertir Decimals a float/int para JSON
-        item_converted = convert_decimals(item)
-        
+
         return {
             "message": "Plot created successfully",
-            "created_plot": item_converted
+            "created_plot": item
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating plot: {e}")
 
-@router.get("/{plot_id}", description="Obtener detalles de una parcela")
+def _plot_lookup_item(plot: dict) -> dict:
+    """
+    Ítem PLOT#{plot_id} / Metadata: resuelve plot_id -> facility/especie/nombre
+    con un GetItem (lo usa lambda_iot_handler cuando el payload no trae facility_id).
+    La especie va en `species_id` para no indexar el ítem en GSI_SpeciesPlots.
+    """
+    return {
+        "pk": f"PLOT#{plot['plot_id']}",
+        "sk": "Metadata",
+        "plot_id": plot["plot_id"],
+        "facility_id": plot["facility_id"],
+        "species_id": plot.get("species"),
+        "name": plot.get("name"),
+    }
+
+
+@router.get("/{plot_id}", response_model=PlotRead, description="Obtener detalles de una parcela")
 async def get_plot(plot_id: str):
-    response = table.get_item(
+    response = await async_table.get_item(
         Key={
             "pk": f"PLOT#{plot_id}",
             "sk": "Metadata"
@@ -241,21 +267,34 @@ async def get_plot(plot_id: str):
 
     if "Item" not in response:
         raise HTTPException(status_code=404, detail="Plot not found")
-    
-    # Convertir Decimals a float/int para JSON
-    item = convert_decimals(response.get("Item"))
-    
-    return item
+
+    # El ítem completo vive bajo la instalación
+    lookup = response["Item"]
+    response = await async_table.get_item(
+        Key={
+            "pk": f"FACILITY#{lookup['facility_id']}",
+            "sk": f"PLOT#{plot_id}"
+        }
+    )
+
+    if "Item" not in response:
+        raise HTTPException(status_code=404, detail="Plot not found")
+
+    return response["Item"]
 
 #@router.put("/{plot_id}", description="Actualizar una parcela") #put o patch?
 async def update_plot(plot_id: str):
     #TODO
     return {"message": f"Plot {plot_id} updated"}
 
-@router.delete("/{plot_id}", description="Eliminar una parcela")
+@router.delete("/{plot_id}", status_code=202, description="Eliminar una parcela")
 async def delete_plot(plot_id: str, facility_id: str):
+    """
+    Borra en segundo plano la parcela y todo su histórico (estados, eventos,
+    umbrales, rollups...). El progreso se consulta en /jobs/{job_id}.
+    """
     try:
-        response = table.get_item(
+        response = await async_table.get_item(
             Key={
                 "pk": f"FACILITY#{facility_id}",
                 "sk": f"PLOT#{plot_id}"
@@ -265,19 +304,13 @@ async def delete_plot(plot_id: str, facility_id: str):
         if "Item" not in response:
             raise HTTPException(status_code=404, detail="Plot not found")
 
-        table.delete_item(
-            Key={
-                "pk": f"FACILITY#{facility_id}",
-                "sk": f"PLOT#{plot_id}"
-            }
-        )
+        job = await start_plot_deletion(plot_id, facility_id)
     except ClientError as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting plot: {e}") 
-    
-    facility_name = response['Item'].get('facility_id', 'unknown facility') if 'Item' in response else "unknown facility"
-    return {"message": f"Plot {plot_id} from {facility_name} deleted successfully"}
+        raise HTTPException(status_code=500, detail=f"Error deleting plot: {e}")
 
-@router.get("/{plot_id}/thresholds", description="Obtener umbrales del plot")
+    return {"message": f"Deletion of plot {plot_id} from {facility_id} started", "job": job}
+
+@router.get("/{plot_id}/thresholds", response_model=PlotThresholds, description="Obtener umbrales del plot")
 async def get_plot_thresholds(plot_id: str):
     """
     Obtiene los umbrales configurados para un plot específico.
@@ -285,26 +318,14 @@ async def get_plot_thresholds(plot_id: str):
     """
     try:
         # Obtener umbrales del plot
-        response = table.get_item(
-            Key={
-                "pk": f"PLOT#{plot_id}",
-                "sk": "THRESHOLDS"
-            }
-        )
+        thresholds = await get_cached_item(f"PLOT#{plot_id}", "THRESHOLDS")
         
-        if "Item" not in response:
+        if not thresholds:
             raise HTTPException(
                 status_code=404,
                 detail="No thresholds configured for this plot"
             )
-        
-        thresholds = response["Item"]
-        
-        # Convertir Decimal a float para JSON
-        for key, value in thresholds.items():
-            if isinstance(value, Decimal):
-                thresholds[key] = float(value)
-        
+
         return thresholds
     
     except HTTPException:
@@ -313,7 +334,7 @@ async def get_plot_thresholds(plot_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching plot thresholds: {e}")
 
 
-@router.put("/{plot_id}/thresholds", description="Actualizar umbrales del plot")
+@router.put("/{plot_id}/thresholds", response_model=PlotThresholdsUpdated, description="Actualizar umbrales del plot")
 async def update_plot_thresholds(plot_id: str, thresholds: dict):
     """
     Actualiza los umbrales de un plot y opcionalmente los activa.
@@ -331,20 +352,14 @@ async def update_plot_thresholds(plot_id: str, thresholds: dict):
     """
     try:
         # Verificar que el plot existe
-        plot_response = table.get_item(
-            Key={
-                "pk": f"PLOT#{plot_id}",
-                "sk": "THRESHOLDS"
-            }
-        )
+        existing_thresholds = await get_cached_item(f"PLOT#{plot_id}", "THRESHOLDS")
         
-        if "Item" not in plot_response:
+        if not existing_thresholds:
             raise HTTPException(
                 status_code=404,
                 detail="Plot thresholds not found. Create the plot first."
             )
         
-        existing_thresholds = plot_response["Item"]
         
         # Campos permitidos para actualizar
         allowed_fields = [
@@ -366,17 +381,12 @@ async def update_plot_thresholds(plot_id: str, thresholds: dict):
                     existing_thresholds[field] = value
         
         # Guardar
-        table.put_item(Item=existing_thresholds)
-        
-        # Convertir Decimal a float para respuesta
-        response_data = dict(existing_thresholds)
-        for key, value in response_data.items():
-            if isinstance(value, Decimal):
-                response_data[key] = float(value)
-        
+        await async_table.put_item(Item=existing_thresholds)
+        invalidate_item(f"PLOT#{plot_id}", "THRESHOLDS")
+
         return {
             "message": "Thresholds updated successfully",
-            "thresholds": response_data
+            "thresholds": existing_thresholds
         }
     
     except HTTPException:
@@ -385,88 +395,304 @@ async def update_plot_thresholds(plot_id: str, thresholds: dict):
         raise HTTPException(status_code=500, detail=f"Error updating plot thresholds: {e}")
 
 
-@router.get("/{plot_id}/state", description="Obtener el estado actual (más reciente) de un plot")
+@router.get("/{plot_id}/state", response_model=PlotState, description="Obtener el estado actual (más reciente) de un plot")
 async def get_plot_state(plot_id: str):
     """
     Devuelve el estado más reciente de sensores de un plot.
+    Lee el ítem LATEST que mantiene la ingesta; si aún no existe (plots con
+    datos anteriores a LATEST) consulta la última lectura STATE#.
     """
     try:
-        response = table.query(
-            KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("STATE#"),
-            ScanIndexForward=False,  # Más recientes primero
-            Limit=1  # Solo el más reciente
+        response = await async_table.get_item(Key={"pk": f"PLOT#{plot_id}", "sk": sk_latest()})
+        state = response.get("Item")
+
+        if state is None:
+            response = await async_table.query(
+                KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("STATE#"),
+                ScanIndexForward=False,  # Más recientes primero
+                Limit=1  # Solo el más reciente
+            )
+            items = response.get("Items", [])
+            if not items:
+                raise HTTPException(status_code=404, detail="No sensor data found for this plot")
+            state = items[0]
+
+        return serialize_plot_state(plot_id, state)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining plot state: {e}")
+
+
+def serialize_plot_state(plot_id: str, state: dict) -> dict:
+    """Convierte una lectura (STATE# o LATEST) al formato esperado por el frontend."""
+    return {
+        "plot_id": plot_id,
+        "timestamp": state.get("Timestamp"),
+        **{metric: state.get(metric) for metric in METRICS},
+    }
+
+
+@router.post("/{plot_id}/thresholds/backtest", description="Simular umbrales sobre el histórico del plot")
+async def backtest_plot_thresholds(plot_id: str, proposal: ThresholdsBacktest):
+    """
+    Evalúa umbrales propuestos contra las lecturas STATE# del rango con la
+    misma regla que la lambda de alertas, sin modificar nada.
+    Los Min/Max omitidos usan los umbrales actuales del plot.
+
+    Por métrica devuelve: violations (lecturas fuera de rango), episodes
+    (entradas en fuera de rango), first/last_violation y out_of_range_seconds.
+    `alerts` es el número de lecturas con al menos una desviación.
+    """
+    start, end = _backtest_range(proposal)
+    try:
+        current = await get_cached_item(f"PLOT#{plot_id}", "THRESHOLDS")
+        bounds = resolve_bounds(proposal.model_dump(include=set(RANGE_FIELDS)), current)
+        if not bounds:
+            raise HTTPException(status_code=400, detail="No thresholds to evaluate: send Min/Max values or configure the plot thresholds")
+
+        result = await _run_backtest(plot_id, bounds, start, end)
+        return {"plot_id": plot_id, "start_date": start, "end_date": end, **result}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running thresholds backtest: {e}")
+
+
+@router.post("/facility/{facility_id}/thresholds/backtest", description="Simular umbrales sobre el histórico de una instalación")
+async def backtest_facility_thresholds(facility_id: str, proposal: ThresholdsBacktest):
+    """
+    Backtest de los umbrales propuestos para todas las parcelas de la
+    instalación (en paralelo, BACKTEST_CONCURRENCY a la vez). Los Min/Max
+    omitidos usan los umbrales actuales de cada parcela.
+    """
+    start, end = _backtest_range(proposal)
+    proposed = proposal.model_dump(include=set(RANGE_FIELDS))
+    try:
+        plots = await async_table.query_all(
+            KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#"),
+            ProjectionExpression="sk, plot_id, #name",
+            ExpressionAttributeNames={"#name": "name"},
         )
-        
-        items = response.get("Items", [])
-        
-        if not items:
-            raise HTTPException(status_code=404, detail="No sensor data found for this plot")
-        
-        # Retornar el estado más reciente
-        state = items[0]
-        
-        # Convertir a formato esperado por el frontend
+        if not plots:
+            raise HTTPException(status_code=404, detail="No se encontraron parcelas para esta instalación")
+
+        plot_ids = [plot.get("plot_id") or plot["sk"].split("#", 1)[-1] for plot in plots]
+        thresholds = {
+            item["pk"].split("#", 1)[-1]: item
+            for item in await async_table.batch_get([{"pk": f"PLOT#{plot_id}", "sk": "THRESHOLDS"} for plot_id in plot_ids])
+        }
+        semaphore = asyncio.Semaphore(max(1, BACKTEST_CONCURRENCY))
+
+        async def backtest(plot: dict, plot_id: str) -> dict:
+            bounds = resolve_bounds(proposed, thresholds.get(plot_id))
+            if not bounds:
+                return {"plot_id": plot_id, "name": plot.get("name"), "readings": 0, "alerts": 0, "episodes": 0, "metrics": {}}
+            async with semaphore:
+                result = await _run_backtest(plot_id, bounds, start, end)
+            return {"plot_id": plot_id, "name": plot.get("name"), **result}
+
+        results = await asyncio.gather(*(backtest(plot, plot_id) for plot, plot_id in zip(plots, plot_ids)))
+
         return {
-            "plot_id": plot_id,
-            "timestamp": state.get("Timestamp"),
-            "temperature": float(state.get("temperature", 0)) if state.get("temperature") is not None else None,
-            "humidity": float(state.get("humidity", 0)) if state.get("humidity") is not None else None,
-            "soil_moisture": float(state.get("soil_moisture", 0)) if state.get("soil_moisture") is not None else None,
-            "light": float(state.get("light", 0)) if state.get("light") is not None else None,
+            "facility_id": facility_id,
+            "start_date": start,
+            "end_date": end,
+            "plots": len(results),
+            "readings": sum(result["readings"] for result in results),
+            "alerts": sum(result["alerts"] for result in results),
+            "episodes": sum(result["episodes"] for result in results),
+            "results": results,
         }
-    
+
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error obtaining plot state: {e}")
+        raise HTTPException(status_code=500, detail=f"Error running thresholds backtest: {e}")
+
 
+def _backtest_range(proposal: ThresholdsBacktest) -> tuple[str, str]:
+    try:
+        end = parse_range_end(proposal.end_date) if proposal.end_date else datetime.now(timezone.utc)
+        start = parse_timestamp(proposal.start_date) if proposal.start_date else end - timedelta(days=30)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return start.strftime("%Y-%m-%dT%H:%M:%S"), end.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+async def _run_backtest(plot_id: str, bounds: dict, start: str, end: str) -> dict:
+    """Recorre el rango página a página evaluando cada una con NumPy."""
+    backtest = ThresholdBacktest(bounds)
+    low, high = sk_state_bounds(start, end)
+    query = {
+        "KeyConditionExpression": Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").between(low, high),
+        # Solo los atributos necesarios para evaluar
+        "ProjectionExpression": "sk, #ts, " + ", ".join(f"#{metric}" for metric in bounds),
+        "ExpressionAttributeNames": {"#ts": "Timestamp", **{f"#{metric}": metric for metric in bounds}},
+    }
 
-@router.get("/{plot_id}/history", description="Obtener historial de estados de un plot")
-async def get_plot_history(plot_id: str, start_date: str = None, end_date: str = None, limit: int = 100):
+    while True:
+        response = await async_table.query(**query)
+        # NumPy y la conversión de los Decimal son CPU: fuera del event loop
+        await asyncio.to_thread(backtest.add, response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    return backtest.result()
+
+
+@router.get("/{plot_id}/history", response_model=Union[AggregatedHistory, List[HistoryPoint]], description="Obtener historial de estados de un plot")
+async def get_plot_history(
+    plot_id: str,
+    start_date: str = None,
+    end_date: str = None,
+    limit: int = 100,
+    resolution: str = None,
+):
     """
     Devuelve el historial de estados de sensores de un plot.
     
     Parámetros:
     - start_date: Fecha inicio en formato ISO (opcional)
-    - end_date: Fecha fin en formato ISO (opcional)
-    - limit: Número máximo de registros (default: 100, max: 1000)
+    - end_date: Fecha fin en formato ISO (opcional, una fecha sin hora incluye el día completo)
+    - limit: Número máximo de registros crudos (default: 100, max: 1000)
+    - resolution: 1m | 5m | 1h | 1d. Si se indica, devuelve min/max/avg/count por bucket
+      para todo el rango (default start_date: 7 días antes de end_date). 1h y 1d se leen
+      de los ROLLUP# precalculados cuando existen; lo anterior al primer ROLLUP# (datos
+      previos a lambda_rollup_processor) se agrega desde las lecturas STATE#
     """
     try:
+        if resolution is not None:
+            return await _get_aggregated_history(plot_id, start_date, end_date, resolution)
+
         # Limitar el limit para evitar consultas muy grandes
-        limit = min(limit, 1000)
-        
-        # Construir la consulta
-        key_condition = Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("STATE#")
-        
-        query_params = {
-            "KeyConditionExpression": key_condition,
-            "ScanIndexForward": False,  # Más recientes primero
-            "Limit": limit
-        }
+        limit = max(1, min(limit, 1000))
         
-        # TODO: Implementar filtro por fechas si es necesario
-        # Por ahora solo devolvemos los últimos N registros
-        
-        response = table.query(**query_params)
-        items = response.get("Items", [])
+        # Construir la consulta (sk BETWEEN STATE#start AND STATE#end)
+        low, high = sk_state_bounds(start_date, end_date)
+        items = await async_table.query_all(
+            max_items=limit,
+            KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").between(low, high),
+            ScanIndexForward=False,  # Más recientes primero
+            # Solo los atributos de la respuesta
+            ProjectionExpression="#ts, " + ", ".join(f"#{metric}" for metric in METRICS),
+            ExpressionAttributeNames={"#ts": "Timestamp", **{f"#{metric}": metric for metric in METRICS}},
+        )
         
         if not items:
             raise HTTPException(status_code=404, detail="No historical data found for this plot")
         
-        # Convertir a formato esperado por el frontend
-        history = []
-        for item in items:
-            history.append({
-                "timestamp": item.get("Timestamp"),
-                "temperature": float(item.get("temperature", 0)) if item.get("temperature") is not None else None,
-                "humidity": float(item.get("humidity", 0)) if item.get("humidity") is not None else None,
-                "soil_moisture": float(item.get("soil_moisture", 0)) if item.get("soil_moisture") is not None else None,
-                "light": float(item.get("light", 0)) if item.get("light") is not None else None,
-            })
-        
-        return history
+        # Los ítems van tal cual: HistoryPoint los valida y convierte al formato del frontend
+        return items
     
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error obtaining plot history: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error obtaining plot history: {e}")
+
+
+@router.get("/{plot_id}/export", description="Exportar el historial de estados de un plot (CSV o Parquet)")
+async def export_plot_history(plot_id: str, format: str = "csv", start_date: str = None, end_date: str = None):
+    """
+    Descarga todas las lecturas del rango (sin límite de filas) en orden
+    cronológico. Se emite en streaming según se leen las páginas de DynamoDB.
+
+    Parámetros:
+    - format: csv | parquet
+    - start_date / end_date: como en /history (opcionales; sin ellos, todo el histórico)
+    """
+    check_export_params(format, start_date, end_date)
+    return export_response(
+        format,
+        iter_plot_rows(async_table, plot_id, start_date, end_date),
+        "plot", plot_id, start_date, end_date,
+    )
+
+
+async def _get_aggregated_history(plot_id: str, start_date: str | None, end_date: str | None, resolution: str) -> dict:
+    """
+    Recorre todas las páginas del rango y agrega cada página en buckets a medida
+    que llega, sin mantener las lecturas crudas en memoria.
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid resolution '{resolution}'. Use one of: {', '.join(RESOLUTIONS)}"
+        )
+
+    try:
+        end = parse_range_end(end_date) if end_date else datetime.now(timezone.utc)
+        start = parse_timestamp(start_date) if start_date else end - timedelta(days=7)
+        aggregator = BucketAggregator(start, end, RESOLUTIONS[resolution])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rollups = []
+    read_raw = True
+    raw_until = end_date  # límite superior (inclusivo) de las lecturas STATE# que se agregan
+    if resolution in ROLLUP_RESOLUTIONS:
+        rollups = await _get_rollup_items(plot_id, end, resolution, aggregator.origin)
+    if rollups:
+        first_bucket = parse_timestamp(rollups[0]["bucket_start"])
+        if first_bucket.timestamp() > aggregator.origin:
+            # Los ROLLUP# solo existen desde que se desplegó lambda_rollup_processor: lo
+            # anterior al primero, y ese mismo bucket (puede estar incompleto), sale de STATE#
+            raw_until = (first_bucket + timedelta(seconds=aggregator.step - 1)).strftime("%Y-%m-%dT%H:%M:%S")
+            rollups = rollups[1:]
+        else:
+            read_raw = False
+
+    low, high = sk_state_bounds(start_date or start.strftime("%Y-%m-%dT%H:%M:%S"), raw_until)
+    query = {
+        "KeyConditionExpression": Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").between(low, high),
+        # Solo los atributos necesarios para agregar
+        "ProjectionExpression": "sk, #ts, " + ", ".join(f"#{metric}" for metric in METRICS),
+        "ExpressionAttributeNames": {"#ts": "Timestamp", **{f"#{metric}": metric for metric in METRICS}},
+    }
+
+    if read_raw:
+        while True:
+            response = await async_table.query(**query)
+            aggregator.add(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            query["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    buckets = aggregator.buckets() + [rollup_to_bucket(item) for item in rollups]
+    if not buckets:
+        raise HTTPException(status_code=404, detail="No historical data found for this plot")
+
+    readings = aggregator.readings + sum(int(item.get("readings", 0)) for item in rollups)
+    if not rollups:
+        source = "raw"
+    else:
+        source = "mixed" if aggregator.readings else "rollup"
+    return _history_response(plot_id, resolution, start, end, source, buckets, readings)
+
+
+async def _get_rollup_items(plot_id: str, end: datetime, resolution: str, origin: int) -> list:
+    """Ítems ROLLUP# precalculados del rango, en orden cronológico."""
+    first_bucket = datetime.fromtimestamp(origin, tz=timezone.utc)
+    last_instant = end - timedelta(seconds=1)
+    return await async_table.query_all(
+        KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").between(
+            sk_rollup(resolution, first_bucket.strftime("%Y-%m-%dT%H:%M:%SZ")),
+            sk_rollup(resolution, last_instant.strftime("%Y-%m-%dT%H:%M:%SZ")),
+        )
+    )
+
+
+def _history_response(plot_id: str, resolution: str, start: datetime, end: datetime, source: str, buckets: list, readings: int) -> dict:
+    return {
+        "plot_id": plot_id,
+        "resolution": resolution,
+        "start_date": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "end_date": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "source": source,
+        "readings": readings,
+        "count": len(buckets),
+        "buckets": buckets,
+    }
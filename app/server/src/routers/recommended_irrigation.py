@@ -1,28 +1,301 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
 from fastapi import APIRouter, Depends, HTTPException
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from src.dal.database import async_table
+from src.dal.metadata_cache import get_cached_item
+from src.schemas.recommended_irrigation import RecommendedIrrigationUpdate
+from src.utils.irrigation import DEMAND_WEIGHTS, WATER_FIELDS, WINDOW_HOURS, recommend
+from src.utils.keys import pk_plot, sk_event_bounds, sk_latest, sk_recommendation, sk_state_bounds
 
 """
 🧠 Riego Recomendado
-GET /plots/{plot_id}/recommended-irrigation
-POST /plots/{plot_id}/recommended-irrigation
-PUT /plots/{plot_id}/recommended-irrigation/{timestamp}
+GET /plot/{plot_id}/recommended-irrigation
+POST /plot/{plot_id}/recommended-irrigation
+PUT /plot/{plot_id}/recommended-irrigation/{timestamp}
+GET /facility/{facility_id}/recommended-irrigation
+
+Cada parcela tiene un único ítem PLOT#{plot_id} / RECOMMENDATION#CURRENT que
+se sobrescribe al recalcular. Solo se recalculan las parcelas con lecturas
+posteriores a su recomendación (según PLOT#{plot_id} / LATEST). Los ajustes
+manuales (PUT) se conservan en los recálculos del mismo día (UTC).
 """
 
 router = APIRouter(tags=["Riego Recomendado"])
 
+# Consultas de lecturas/riegos en paralelo al recalcular una instalación
+RECOMMENDATION_CONCURRENCY = int(os.getenv("RECOMMENDATION_CONCURRENCY", "16"))
+
+READING_FIELDS = ("soil_moisture", *DEMAND_WEIGHTS)
+
+# Campos que puede fijar el usuario con PUT y que sobreviven a un recálculo
+USER_FIELDS = ("amount", "scheduled_at", "status", "notes")
+
+
 @router.get("/plot/{plot_id}/recommended-irrigation", description="Obtener riego recomendado de una parcela")
-async def get_recommended_irrigation(plot_id: str):
-    #TODO
-    return {"message": f"Recommended irrigation for plot {plot_id}"}
+async def get_recommended_irrigation(plot_id: str, refresh: bool = False):
+    """
+    Devuelve la recomendación vigente; se recalcula si hay lecturas nuevas
+    desde que se calculó, si no existe o con refresh=true.
+    """
+    try:
+        current, latest = await asyncio.gather(_current_recommendation(plot_id), _latest_timestamp(plot_id))
+        if current and not refresh and not _is_stale(current, latest):
+            return _serialize(current, cached=True)
+
+        thresholds = await get_cached_item(pk_plot(plot_id), "THRESHOLDS")
+        if current is None and thresholds is None and latest is None:
+            raise HTTPException(status_code=404, detail="Plot not found or without data")
+
+        [item] = await _compute_and_store([plot_id], {plot_id: thresholds}, {plot_id: current}, {plot_id: latest})
+        return _serialize(item, cached=False)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining recommended irrigation: {e}")
+
 
 @router.post("/plot/{plot_id}/recommended-irrigation", description="Crear un nuevo riego recomendado para una parcela")
 async def create_recommended_irrigation(plot_id: str):
-    #TODO
-    return {"message": f"Recommended irrigation created for plot {plot_id}"}
+    """Recalcula y guarda la recomendación aunque no haya lecturas nuevas."""
+    try:
+        current, latest, thresholds = await asyncio.gather(
+            _current_recommendation(plot_id),
+            _latest_timestamp(plot_id),
+            get_cached_item(pk_plot(plot_id), "THRESHOLDS"),
+        )
+        if thresholds is None and latest is None:
+            raise HTTPException(status_code=404, detail="Plot not found or without data")
+
+        [item] = await _compute_and_store([plot_id], {plot_id: thresholds}, {plot_id: current}, {plot_id: latest})
+        return {"message": "Recommended irrigation created", "recommendation": _serialize(item, cached=False)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating recommended irrigation: {e}")
+
 
 @router.put("/plot/{plot_id}/recommended-irrigation/{timestamp}", description="Actualizar un riego recomendado de una parcela")
-async def update_recommended_irrigation(plot_id: str, timestamp: str):
-    #TODO
-    return {"message": f"Recommended irrigation for plot {plot_id} at {timestamp} updated"}
+async def update_recommended_irrigation(plot_id: str, timestamp: str, update: RecommendedIrrigationUpdate):
+    """
+    Ajuste manual (cantidad, momento, estado, notas) de la recomendación
+    vigente; `timestamp` es su computed_at. Los campos ajustados se guardan en
+    user_fields y los recálculos del mismo día los mantienen.
+    """
+    fields = update.model_dump(exclude_none=True)
+    if not fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if "amount" in fields:
+        fields["amount"] = Decimal(str(fields["amount"]))
+    values = {**fields, "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+    try:
+        response = await async_table.update_item(
+            Key={"pk": pk_plot(plot_id), "sk": sk_recommendation()},
+            UpdateExpression="SET " + ", ".join(f"#{name} = :{name}" for name in values) + " ADD #user_fields :user_fields",
+            ExpressionAttributeNames={**{f"#{name}": name for name in values}, "#computed_at": "computed_at", "#user_fields": "user_fields"},
+            ExpressionAttributeValues={
+                **{f":{name}": value for name, value in values.items()},
+                ":computed_at": timestamp,
+                ":user_fields": set(fields),
+            },
+            # Solo sobre la recomendación que vio el cliente
+            ConditionExpression="#computed_at = :computed_at",
+            ReturnValues="ALL_NEW",
+        )
+        return {"message": "Recommended irrigation updated", "recommendation": _serialize(response["Attributes"], cached=True)}
+
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            current = await _current_recommendation(plot_id)
+            if current:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Recommended irrigation was recomputed; current computed_at is {current.get('computed_at')}",
+                )
+            raise HTTPException(status_code=404, detail="Recommended irrigation not found")
+        raise HTTPException(status_code=500, detail=f"Error updating recommended irrigation: {e}")
+
+
+@router.get("/facility/{facility_id}/recommended-irrigation", description="Obtener el riego recomendado de todas las parcelas de una instalación")
+async def get_facility_recommended_irrigation(facility_id: str, refresh: bool = False):
+    """
+    Recomendaciones de todas las parcelas de la instalación. Las vigentes se
+    sirven tal cual; las parcelas con lecturas nuevas (o sin recomendación)
+    se recalculan juntas en una sola pasada vectorizada y se guardan.
+    """
+    try:
+        plots = await async_table.query_all(
+            KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").begins_with("PLOT#"),
+            ProjectionExpression="sk, plot_id, #name",
+            ExpressionAttributeNames={"#name": "name"},
+        )
+        if not plots:
+            raise HTTPException(status_code=404, detail="No plots found for this facility")
+
+        names = {plot.get("plot_id") or plot["sk"].split("#", 1)[-1]: plot.get("name") for plot in plots}
+        plot_ids = list(names)
+
+        # Un BatchGetItem con el LATEST y la recomendación vigente de cada parcela
+        items = await async_table.batch_get(
+            [{"pk": pk_plot(plot_id), "sk": sk} for plot_id in plot_ids for sk in (sk_latest(), sk_recommendation())]
+        )
+        latest = {}
+        cached = dict.fromkeys(plot_ids)
+        for item in items:
+            plot_id = item["pk"].split("#", 1)[-1]
+            if item["sk"] == sk_latest():
+                latest[plot_id] = item.get("Timestamp")
+            else:
+                cached[plot_id] = item
+
+        stale = [
+            plot_id for plot_id in plot_ids
+            if refresh or cached[plot_id] is None or _is_stale(cached[plot_id], latest.get(plot_id))
+        ]
+        fresh = {}
+        if stale:
+            thresholds = {
+                item["pk"].split("#", 1)[-1]: item
+                for item in await async_table.batch_get([{"pk": pk_plot(plot_id), "sk": "THRESHOLDS"} for plot_id in stale])
+            }
+            fresh = {item["plot_id"]: item for item in await _compute_and_store(stale, thresholds, cached, latest, facility_id)}
+
+        results = [
+            {
+                "name": names[plot_id],
+                **_serialize(fresh.get(plot_id) or cached[plot_id], cached=plot_id not in fresh),
+            }
+            for plot_id in plot_ids
+        ]
+        return {
+            "facility_id": facility_id,
+            "plots": len(results),
+            "recomputed": len(fresh),
+            "total_amount": round(sum(float(result["amount"]) for result in results), 1),
+            "results": results,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error obtaining facility recommended irrigation: {e}")
+
+
+async def _current_recommendation(plot_id: str) -> dict | None:
+    response = await async_table.get_item(Key={"pk": pk_plot(plot_id), "sk": sk_recommendation()})
+    return response.get("Item")
+
+
+async def _latest_timestamp(plot_id: str) -> str | None:
+    response = await async_table.get_item(
+        Key={"pk": pk_plot(plot_id), "sk": sk_latest()},
+        ProjectionExpression="#ts",
+        ExpressionAttributeNames={"#ts": "Timestamp"},
+    )
+    return response.get("Item", {}).get("Timestamp")
+
+
+def _is_stale(recommendation: dict, latest_timestamp: str | None) -> bool:
+    """El LATEST es posterior al que había cuando se calculó la recomendación."""
+    if not latest_timestamp:
+        return False
+    return latest_timestamp > (recommendation.get("source_timestamp") or "")
+
+
+async def _window_items(plot_id: str, bounds: tuple[str, str], fields: tuple[str, ...]) -> list:
+    low, high = bounds
+    return await async_table.query_all(
+        KeyConditionExpression=Key("pk").eq(pk_plot(plot_id)) & Key("sk").between(low, high),
+        ProjectionExpression="sk, #ts, " + ", ".join(f"#{field}" for field in fields),
+        ExpressionAttributeNames={"#ts": "Timestamp", **{f"#{field}": field for field in fields}},
+    )
+
+
+async def _compute_and_store(
+    plot_ids: list[str], thresholds: dict, current: dict, latest: dict, facility_id: str | None = None
+) -> list[dict]:
+    """
+    Lee la ventana reciente de cada parcela, calcula todas juntas y sobrescribe
+    su RECOMMENDATION#CURRENT (`current`: la recomendación vigente por parcela;
+    `latest`: el timestamp de su LATEST).
+    """
+    now = datetime.now(timezone.utc)
+    start = (now - timedelta(hours=WINDOW_HOURS)).strftime("%Y-%m-%dT%H:%M:%S")
+    semaphore = asyncio.Semaphore(max(1, RECOMMENDATION_CONCURRENCY))
+
+    async def load(plot_id: str) -> dict:
+        async with semaphore:
+            readings, events = await asyncio.gather(
+                _window_items(plot_id, sk_state_bounds(start, None), READING_FIELDS),
+                _window_items(plot_id, sk_event_bounds(start, None), WATER_FIELDS),
+            )
+        return {"plot_id": plot_id, "readings": readings, "events": events, "thresholds": thresholds.get(plot_id)}
+
+    inputs = await asyncio.gather(*(load(plot_id) for plot_id in plot_ids))
+    results = recommend(list(inputs), now)
+
+    items = []
+    for result in results:
+        plot_thresholds = thresholds.get(result["plot_id"]) or {}
+        item = {
+            "pk": pk_plot(result["plot_id"]),
+            "sk": sk_recommendation(),
+            "status": "pending",
+            **_to_dynamo(result),
+        }
+        # source_timestamp es el LATEST visto, no la última lectura de la ventana:
+        # una parcela sin lecturas recientes no queda desactualizada para siempre
+        if latest.get(result["plot_id"]):
+            item["source_timestamp"] = max(latest[result["plot_id"]], item.get("source_timestamp") or "")
+        _carry_user_fields(item, current.get(result["plot_id"]))
+        plot_facility = facility_id or plot_thresholds.get("facility_id")
+        if plot_facility:
+            item["facility_id"] = plot_facility
+        items.append(item)
+
+    await async_table.batch_write(items)
+    return items
+
+
+def _carry_user_fields(item: dict, previous: dict | None) -> None:
+    """Mantiene los ajustes manuales de `previous` si es del mismo día (UTC) que `item`."""
+    if not previous or not previous.get("user_fields"):
+        return
+    if (previous.get("computed_at") or "")[:10] != item["computed_at"][:10]:
+        return
+    user_fields = set(previous["user_fields"]) & set(USER_FIELDS)
+    if not user_fields:
+        return
+    if "amount" in user_fields:
+        # La cantidad calculada se conserva aparte
+        item["computed_amount"] = item["amount"]
+    for field in user_fields:
+        if field in previous:
+            item[field] = previous[field]
+    item["user_fields"] = user_fields
+    if previous.get("updated_at"):
+        item["updated_at"] = previous["updated_at"]
+
 
+def _to_dynamo(value):
+    """float -> Decimal (DynamoDB no acepta float)."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {key: _to_dynamo(item) for key, item in value.items()}
+    return value
 
 
+def _serialize(item: dict, cached: bool) -> dict:
+    result = {key: value for key, value in item.items() if key not in ("pk", "sk")}
+    if "user_fields" in result:
+        result["user_fields"] = sorted(result["user_fields"])
+    result["cached"] = cached
+    return result
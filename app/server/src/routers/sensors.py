@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request
 from boto3.dynamodb.conditions import Key, Attr
-from src.dal.database import table
+from src.dal.database import async_table
+from src.utils.keys import pk_plot, sk_state_bounds
+from src.utils.pagination import DEFAULT_PAGE_SIZE, iter_query, ndjson_response, query_page, wants_ndjson
 
 """
 📊 Sensores
@@ -10,54 +14,99 @@ GET /species/{species_id}/sensor-values
 
 router = APIRouter(prefix="/sensors", tags=["Sensores"])
 
+# Consultas por parcela en paralelo para el fan-out por especie
+SPECIES_FANOUT_CONCURRENCY = int(os.getenv("SPECIES_FANOUT_CONCURRENCY", "16"))
+SPECIES_FANOUT_MAX_CONCURRENCY = int(os.getenv("SPECIES_FANOUT_MAX_CONCURRENCY", "64"))
+
 @router.get("/plot/{plot_id}/sensor-values", description="Obtener valores de sensores de una parcela")
-async def get_sensor_values_by_plot(plot_id: str):
+async def get_sensor_values_by_plot(
+    request: Request,
+    plot_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    stream: bool = False,
+):
+    query = {
+        "KeyConditionExpression": Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("STATE#"),
+        "ScanIndexForward": False  # opcional: False para más recientes primero
+    }
     try:
-        response = table.query(
-            KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("STATE#"),
-            ScanIndexForward=False  # opcional: False para más recientes primero
-        )
-        items = response.get("Items", [])
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
+
+        items, next_cursor = await query_page(async_table, limit, cursor, **query)
 
         return {
             "count": len(items),
-            "states": items
+            "states": items,
+            "next_cursor": next_cursor
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obtaining sensor values: {e}")
 
 @router.get("/species/{species_id}/sensor-values", description="Obtener valores de sensores de una especie")
-async def get_sensor_values_by_species(species_id: str):
+async def get_sensor_values_by_species(
+    species_id: str,
+    start_date: str = None,
+    end_date: str = None,
+    limit_per_plot: int = 100,
+    concurrency: int = SPECIES_FANOUT_CONCURRENCY,
+):
+    """
+    Devuelve las lecturas de sensores de todas las parcelas de una especie.
+
+    Parámetros:
+    - start_date / end_date: rango ISO por parcela (opcional, inclusivo)
+    - limit_per_plot: máximo de lecturas por parcela, más recientes primero (max: 1000)
+    - concurrency: consultas por parcela en paralelo (max: SPECIES_FANOUT_MAX_CONCURRENCY)
+    """
     try:
-        # 1 - Obtener los plots vinculados a la especie
-        response = table.query(
+        # 1 - Obtener los plots vinculados a la especie (todas las páginas)
+        plot_items = await async_table.query_all(
             IndexName="GSI_SpeciesPlots",
             KeyConditionExpression=Key("species").eq(f"SPECIES#{species_id}")
         )
 
-        plot_items = response.get("Items", [])
         if not plot_items:
             raise HTTPException(status_code=404, detail=f"No plots found for species {species_id}")
 
-        plots_data = []
-
-        # 2 - Por cada parcela, traer sus valores de sensores
-        for plot in plot_items:
-            plot_id = plot["pk"].split("#")[-1]
+        plot_ids = list(dict.fromkeys(_plot_id_from_item(plot) for plot in plot_items))
+        limit_per_plot = max(1, min(limit_per_plot, 1000))
+        semaphore = asyncio.Semaphore(max(1, min(concurrency, SPECIES_FANOUT_MAX_CONCURRENCY)))
+        low, high = sk_state_bounds(start_date, end_date)
 
-            sensor_response = table.query(
-                KeyConditionExpression=Key("pk").eq(f"PLOT#{plot_id}") & Key("sk").begins_with("SENSOR#")
-            )
-
-            sensor_values = sensor_response.get("Items", [])
-            plots_data.append({
+        # 2 - Traer los valores de cada parcela en paralelo, con concurrencia acotada
+        async def fetch_plot(plot_id: str) -> dict:
+            async with semaphore:
+                sensor_values = await async_table.query_all(
+                    max_items=limit_per_plot,
+                    KeyConditionExpression=Key("pk").eq(pk_plot(plot_id)) & Key("sk").between(low, high),
+                    ScanIndexForward=False
+                )
+            return {
                 "plot_id": plot_id,
+                "count": len(sensor_values),
                 "sensor_values": sensor_values
-            })
+            }
+
+        plots_data = await asyncio.gather(*(fetch_plot(plot_id) for plot_id in plot_ids))
 
         # 3 - Respuesta final
-        return {"species_id": species_id, "plots": plots_data}
+        return {"species_id": species_id, "count": len(plots_data), "plots": plots_data}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _plot_id_from_item(item: dict) -> str:
+    """Extrae el plot_id de un ítem del GSI (FACILITY#f / PLOT#p o PLOT#p / ...)."""
+    if item.get("plot_id"):
+        return item["plot_id"]
+    if str(item.get("sk", "")).startswith("PLOT#"):
+        return item["sk"].split("#", 1)[-1]
+    return item["pk"].split("#", 1)[-1]
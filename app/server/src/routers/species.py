@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from boto3.dynamodb.conditions import Key, Attr
-from src.schemas.species import SpeciesBase, SpeciesCreate, SpeciesThresholdsUpdate
-from src.dal.database import table
+from src.schemas.species import SpeciesBase, SpeciesCreate, SpeciesPage, SpeciesThresholdsUpdate
+from src.dal.database import async_table
+from src.dal.metadata_cache import get_cached_item, invalidate_item
+from src.utils.pagination import DEFAULT_PAGE_SIZE, iter_query, ndjson_response, query_page, wants_ndjson
 from botocore.exceptions import ClientError
 from uuid import uuid4
 from decimal import Decimal
@@ -16,34 +18,30 @@ DELETE /species/{species_id}
 
 router = APIRouter(prefix="/species", tags=["Especies"])
 
-@router.get("/", description="Obtener todas las especies")
-async def get_species():
+@router.get("/", response_model=SpeciesPage, description="Obtener todas las especies")
+async def get_species(request: Request, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, stream: bool = False):
+    """
+    Devuelve las especies paginadas por cursor (`next_cursor`).
+    Con stream=true o Accept: application/x-ndjson responde en NDJSON.
+    """
+    query = {
+        "IndexName": "GSI_TypeIndex",
+        "KeyConditionExpression": Key("type").eq("SPECIES"),
+    }
     try:
-        species = []
-        last_evaluated_key = None
-
-        # Manejo de paginación automática
-        while True:
-            query_params = {
-                "IndexName": "GSI_TypeIndex",
-                "KeyConditionExpression": Key("type").eq("SPECIES"),
-            }
+        if wants_ndjson(request, stream):
+            return ndjson_response(iter_query(async_table, cursor, **query))
 
-            if last_evaluated_key:
-                query_params["ExclusiveStartKey"] = last_evaluated_key
-
-            response = table.query(**query_params)
-            species.extend(response.get("Items", []))
-
-            if "LastEvaluatedKey" not in response:
-                break
-            last_evaluated_key = response["LastEvaluatedKey"]
+        species, next_cursor = await query_page(async_table, limit, cursor, **query)
 
         # Si no hay especies
-        if not species:
+        if not species and not cursor:
             raise HTTPException(status_code=404, detail="No species found")
 
-        return {"count": len(species), "species": species}
+        return {"count": len(species), "species": species, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
 
     except ClientError as e:
         msg = e.response.get("Error", {}).get("Message", str(e))
@@ -64,7 +62,7 @@ async def create_species(species: SpeciesCreate):
             "type": "SPECIES"
         }
 
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
         return {
             "message": "Species created successfully",
             "created_species": item
@@ -81,22 +79,16 @@ async def update_species(species_id: str):
 @router.delete("/{species_id}", description="Eliminar una especie")
 async def delete_species(species_id: str):
     try:
-        response = table.get_item(
-            Key={
-                "pk": f"SPECIES#{species_id}",
-                "sk": "Metadata"
-            }
-        )
-
-        if "Item" not in response:
+        if not await get_cached_item(f"SPECIES#{species_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Plot not found")
 
-        table.delete_item(
+        await async_table.delete_item(
             Key={
                 "pk": f"SPECIES#{species_id}",
                 "sk": "Metadata"
             }
         )
+        invalidate_item(f"SPECIES#{species_id}", "Metadata")
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Error deleting species: {e}") 
     return {"message": f"Species {species_id} deleted successfully"}    
@@ -106,15 +98,11 @@ async def delete_species(species_id: str):
 async def assign_species_to_plot(species_id: str, facility_id: str, plot_id: str):
     try:
         # Verificar que la especie exista
-        species_response = table.get_item(
-            Key={"pk": f"SPECIES#{species_id}", "sk": "Metadata"}
-        )
-
-        if "Item" not in species_response:
+        if not await get_cached_item(f"SPECIES#{species_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Species not found")
 
         # Verificar que la parcela exista en la facility
-        plot_response = table.query(
+        plot_response = await async_table.query(
             KeyConditionExpression=Key("pk").eq(f"FACILITY#{facility_id}") & Key("sk").eq(f"PLOT#{plot_id}")
         )
 
@@ -128,7 +116,7 @@ async def assign_species_to_plot(species_id: str, facility_id: str, plot_id: str
             "type": "PLOT_SPECIES"
         }
 
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
 
         return {"message": f"Species {species_id} assigned to plot {plot_id} successfully"}
 
@@ -144,30 +132,20 @@ async def get_species_thresholds(species_id: str, facility_id: str = None):
     try:
         # Intentar primero con facility específica (si se proporciona)
         if facility_id:
-            response = table.get_item(
-                Key={
-                    "pk": f"FACILITY#{facility_id}",
-                    "sk": f"SPECIES#{species_id}"
-                }
-            )
-            if "Item" in response:
-                return response["Item"]
+            facility_thresholds = await get_cached_item(f"FACILITY#{facility_id}", f"SPECIES#{species_id}")
+            if facility_thresholds:
+                return facility_thresholds
         
         # Buscar en perfil global de la especie
-        response = table.get_item(
-            Key={
-                "pk": f"SPECIES#{species_id}",
-                "sk": "PROFILE"
-            }
-        )
+        thresholds = await get_cached_item(f"SPECIES#{species_id}", "PROFILE")
         
-        if "Item" not in response:
+        if not thresholds:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Thresholds not found for species {species_id}"
             )
         
-        return response["Item"]
+        return thresholds
     
     except ClientError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching thresholds: {e}")
@@ -180,11 +158,7 @@ async def update_species_thresholds(species_id: str, thresholds: SpeciesThreshol
     """
     try:
         # Verificar que la especie exista
-        species_response = table.get_item(
-            Key={"pk": f"SPECIES#{species_id}", "sk": "Metadata"}
-        )
-        
-        if "Item" not in species_response:
+        if not await get_cached_item(f"SPECIES#{species_id}", "Metadata"):
             raise HTTPException(status_code=404, detail="Species not found")
         
         # Preparar la clave según si es global o específica de facility
@@ -209,7 +183,8 @@ async def update_species_thresholds(species_id: str, thresholds: SpeciesThreshol
             if value is not None:
                 item[key] = Decimal(str(value))
         
-        table.put_item(Item=item)
+        await async_table.put_item(Item=item)
+        invalidate_item(pk, sk)
         
         return {
             "message": "Thresholds updated successfully",
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import Optional
+from src.utils.serialization import to_json_native
+
+class DynamoItem(BaseModel):
+    """
+    Ítem de DynamoDB devuelto tal cual: los campos declarados se validan y el
+    resto de atributos se conserva. Los Decimal salen como int/float.
+    """
+    model_config = ConfigDict(extra="allow")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _decode_numbers(cls, data):
+        return to_json_native(data) if isinstance(data, dict) else data
+
+class Page(BaseModel):
+    """Campos comunes de los listados paginados por cursor"""
+    count: int
+    next_cursor: Optional[str] = None
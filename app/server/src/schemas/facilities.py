@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
+from src.schemas.dynamo import DynamoItem, Page
+from src.schemas.plot import PlotState
 
 class FacilityBase(BaseModel):
     name: str
@@ -15,4 +17,21 @@ class FacilityRead(FacilityBase):
 
 class FacilityUpdate(BaseModel):
     name: Optional[str] = None
-    location: Optional[str] = None
\ No newline at end of file
+    location: Optional[str] = None
+
+class FacilityItem(DynamoItem):
+    """Ítem FACILITY#<id> / Metadata con todos sus atributos"""
+    facility_id: Optional[str] = None
+    name: Optional[str] = None
+    location: Optional[str] = None
+
+class FacilityPage(Page):
+    facilities: List[FacilityItem]
+
+class FacilityPlotState(PlotState):
+    name: Optional[str] = None
+
+class FacilityCurrentStates(BaseModel):
+    facility_id: str
+    count: int
+    states: List[FacilityPlotState]
@@ -0,0 +1,10 @@
+from typing import List, Optional
+from src.schemas.dynamo import DynamoItem, Page
+
+class IrrigationEvent(DynamoItem):
+    """Ítem PLOT#<id> / EVENT#<timestamp> con todos sus atributos"""
+    Timestamp: Optional[str] = None
+    EventType: Optional[str] = None
+
+class IrrigationPage(Page):
+    irrigations: List[IrrigationEvent]
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from src.schemas.dynamo import DynamoItem, Page
 from src.schemas.sensor_data import SensorData
 
 class PlotBase(BaseModel):
@@ -21,4 +22,90 @@ class PlotUpdate(BaseModel):
     location: Optional[str] = None
     species: Optional[str] = None
     area: Optional[float] = None
-    mac_address: Optional[str] = None
\ No newline at end of file
+    mac_address: Optional[str] = None
+
+class ThresholdsBacktest(BaseModel):
+    """Umbrales propuestos para el backtest; los omitidos toman el valor actual del plot"""
+    MinTemperature: Optional[float] = None
+    MaxTemperature: Optional[float] = None
+    MinHumidity: Optional[float] = None
+    MaxHumidity: Optional[float] = None
+    MinLight: Optional[float] = None
+    MaxLight: Optional[float] = None
+    MinIrrigation: Optional[float] = None
+    MaxIrrigation: Optional[float] = None
+    start_date: Optional[str] = Field(None, description="Inicio del histórico (ISO, default: end_date - 30 días)")
+    end_date: Optional[str] = Field(None, description="Fin del histórico (ISO, default: ahora)")
+
+class PlotRead(DynamoItem):
+    """Ítem FACILITY#<id> / PLOT#<id> con todos sus atributos"""
+    plot_id: Optional[str] = None
+    facility_id: Optional[str] = None
+    name: Optional[str] = None
+
+class PlotPage(Page):
+    plots: List[PlotRead]
+
+class FacilityPlotPage(PlotPage):
+    facility_id: str
+
+class PlotCreated(BaseModel):
+    message: str
+    created_plot: PlotRead
+
+class PlotThresholds(DynamoItem):
+    """Ítem PLOT#<id> / THRESHOLDS; los umbrales salen siempre como float"""
+    MinTemperature: Optional[float] = None
+    MaxTemperature: Optional[float] = None
+    MinHumidity: Optional[float] = None
+    MaxHumidity: Optional[float] = None
+    MinLight: Optional[float] = None
+    MaxLight: Optional[float] = None
+    MinIrrigation: Optional[float] = None
+    MaxIrrigation: Optional[float] = None
+    umbral_enabled: Optional[bool] = None
+
+class PlotThresholdsUpdated(BaseModel):
+    message: str
+    thresholds: PlotThresholds
+
+class PlotState(BaseModel):
+    """Última lectura de sensores de un plot"""
+    plot_id: str
+    timestamp: Optional[str] = None
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    soil_moisture: Optional[float] = None
+    light: Optional[float] = None
+
+class HistoryPoint(BaseModel):
+    """Lectura del historial, validada directamente desde el ítem STATE# (ignora el resto de atributos)"""
+    timestamp: Optional[str] = Field(None, validation_alias="Timestamp")
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    soil_moisture: Optional[float] = None
+    light: Optional[float] = None
+
+class MetricStats(BaseModel):
+    min: float
+    max: float
+    avg: float
+    count: int
+
+class HistoryBucket(BaseModel):
+    timestamp: str
+    temperature: Optional[MetricStats] = None
+    humidity: Optional[MetricStats] = None
+    soil_moisture: Optional[MetricStats] = None
+    light: Optional[MetricStats] = None
+
+class AggregatedHistory(BaseModel):
+    """Historial agregado por buckets (?resolution=)"""
+    plot_id: str
+    resolution: str
+    start_date: str
+    end_date: str
+    source: str = Field(..., description="rollup (ROLLUP# precalculados), raw (lecturas STATE#) o mixed (STATE# hasta el primer ROLLUP#)")
+    readings: int
+    count: int
+    buckets: List[HistoryBucket]
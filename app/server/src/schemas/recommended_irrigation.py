@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+class RecommendedIrrigationUpdate(BaseModel):
+    """Ajuste manual de un riego recomendado ya calculado"""
+    amount: Optional[float] = Field(None, ge=0, description="Cantidad de riego (mismas unidades que MinIrrigation)")
+    scheduled_at: Optional[str] = Field(None, description="Momento previsto del riego (ISO)")
+    status: Optional[Literal["pending", "applied", "dismissed"]] = None
+    notes: Optional[str] = None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from src.schemas.dynamo import DynamoItem, Page
 from datetime import datetime, timezone
 from uuid import uuid4
 
@@ -39,4 +40,11 @@ class SpeciesThresholdsUpdate(BaseModel):
     MinLight: Optional[float] = None
     MaxLight: Optional[float] = None
     MinIrrigation: Optional[float] = None
-    MaxIrrigation: Optional[float] = None
\ No newline at end of file
+    MaxIrrigation: Optional[float] = None
+
+class SpeciesItem(DynamoItem):
+    """Ítem SPECIES#<id> / Metadata con todos sus atributos"""
+    name: Optional[str] = None
+
+class SpeciesPage(Page):
+    species: List[SpeciesItem]
@@ -0,0 +1,155 @@
+"""
+Agregación vectorizada (NumPy) de lecturas STATE# en buckets de tiempo.
+
+Las lecturas se acumulan página a página, así la memoria depende del número
+de buckets y no del número de lecturas del rango.
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+METRICS = ("temperature", "humidity", "soil_moisture", "light")
+
+# Resoluciones soportadas -> segundos por bucket
+RESOLUTIONS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+
+# Resoluciones precalculadas por lambda_rollup_processor (ROLLUP#1h / ROLLUP#1d)
+ROLLUP_RESOLUTIONS = ("1h", "1d")
+
+MAX_BUCKETS = 50_000
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parsea un timestamp ISO (con o sin 'Z'); sin zona horaria se asume UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_range_end(value: str) -> datetime:
+    """Como parse_timestamp, pero una fecha sin hora (YYYY-MM-DD) incluye el día completo."""
+    parsed = parse_timestamp(value)
+    if len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def item_timestamp(item: dict) -> str:
+    return item.get("Timestamp") or str(item.get("sk", "")).split("#", 1)[-1]
+
+
+def to_epoch_seconds(timestamps: list[str]) -> np.ndarray:
+    """Convierte timestamps ISO UTC a segundos epoch (float, NaN si no se pueden parsear)."""
+    # Los primeros 19 caracteres son YYYY-MM-DDTHH:MM:SS; el resto es fracción/zona (UTC)
+    heads = [ts[:19] if isinstance(ts, str) else "NaT" for ts in timestamps]
+    try:
+        parsed = np.array(heads, dtype="datetime64[s]")
+    except ValueError:
+        parsed = np.array([_safe_datetime64(head) for head in heads], dtype="datetime64[s]")
+    seconds = parsed.astype("int64").astype(np.float64)
+    seconds[np.isnat(parsed)] = np.nan
+    return seconds
+
+
+def _safe_datetime64(value: str) -> np.datetime64:
+    try:
+        return np.datetime64(value, "s")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def metric_values(items: list[dict], metric: str) -> np.ndarray:
+    """Columna float de una métrica; NaN donde falta o no es numérica."""
+    values = np.full(len(items), np.nan)
+    for i, item in enumerate(items):
+        value = item.get(metric)
+        if value is None:
+            continue
+        try:
+            values[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+class BucketAggregator:
+    """Acumula min/max/sum/count por bucket y métrica entre start y end."""
+
+    def __init__(self, start: datetime, end: datetime, step_seconds: int, metrics=METRICS):
+        self.step = step_seconds
+        self.metrics = tuple(metrics)
+        # Buckets alineados a epoch (1d empieza a medianoche UTC)
+        self.origin = int(start.timestamp()) // step_seconds * step_seconds
+        self.size = max(1, -(-(int(end.timestamp()) - self.origin) // step_seconds))
+        if self.size > MAX_BUCKETS:
+            raise ValueError(f"Range too large for resolution: {self.size} buckets (max {MAX_BUCKETS})")
+
+        shape = (len(self.metrics), self.size)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.total = np.zeros(shape, dtype=np.float64)
+        self.minimum = np.full(shape, np.inf)
+        self.maximum = np.full(shape, -np.inf)
+        self.readings = 0
+
+    def add(self, items: list[dict]) -> None:
+        if not items:
+            return
+        seconds = to_epoch_seconds([item_timestamp(item) for item in items])
+        valid = ~np.isnan(seconds)
+        index = np.zeros(len(items), dtype=np.int64)
+        index[valid] = ((seconds[valid] - self.origin) // self.step).astype(np.int64)
+        valid &= (index >= 0) & (index < self.size)
+        self.readings += int(valid.sum())
+
+        for row, metric in enumerate(self.metrics):
+            values = metric_values(items, metric)
+            mask = valid & ~np.isnan(values)
+            if not mask.any():
+                continue
+            idx, vals = index[mask], values[mask]
+            np.add.at(self.count[row], idx, 1)
+            np.add.at(self.total[row], idx, vals)
+            np.minimum.at(self.minimum[row], idx, vals)
+            np.maximum.at(self.maximum[row], idx, vals)
+
+    def buckets(self) -> list[dict]:
+        """Buckets con al menos una lectura, en orden cronológico."""
+        non_empty = np.flatnonzero(self.count.sum(axis=0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = self.total / self.count
+
+        result = []
+        for b in non_empty:
+            bucket_start = datetime.fromtimestamp(self.origin + int(b) * self.step, tz=timezone.utc)
+            entry = {"timestamp": bucket_start.strftime("%Y-%m-%dT%H:%M:%SZ")}
+            for row, metric in enumerate(self.metrics):
+                count = int(self.count[row, b])
+                entry[metric] = {
+                    "min": float(self.minimum[row, b]),
+                    "max": float(self.maximum[row, b]),
+                    "avg": round(float(average[row, b]), 4),
+                    "count": count,
+                } if count else None
+            result.append(entry)
+        return result
+
+
+def rollup_to_bucket(item: dict, metrics=METRICS) -> dict:
+    """Convierte un ítem ROLLUP# (count/sum/min/max por métrica) al formato de bucket."""
+    entry = {"timestamp": item.get("bucket_start")}
+    for metric in metrics:
+        stats = item.get(metric)
+        count = int(stats.get("count", 0)) if stats else 0
+        entry[metric] = {
+            "min": float(stats["min"]),
+            "max": float(stats["max"]),
+            "avg": round(float(stats["sum"]) / count, 4),
+            "count": count,
+        } if count else None
+    return entry
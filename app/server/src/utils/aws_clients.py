@@ -0,0 +1,79 @@
+"""
+Factory compartida de clientes y recursos AWS.
+
+La usan la API y todas las Lambdas (se copia como `aws_clients.py` en cada
+paquete ZIP), así que solo puede depender de boto3/botocore y la stdlib.
+
+Configuración por variables de entorno:
+- AWS_REGION                 región (default us-east-1)
+- AWS_MAX_POOL_CONNECTIONS   tamaño del pool HTTP por cliente (default 64)
+- AWS_CONNECT_TIMEOUT        segundos para abrir conexión (default 2)
+- AWS_READ_TIMEOUT           segundos de espera de respuesta (default 10)
+- AWS_RETRY_MODE             standard | adaptive | legacy (default standard)
+- AWS_MAX_ATTEMPTS           intentos totales por llamada (default 5)
+- AWS_TCP_KEEPALIVE          true | false (default true)
+"""
+import os
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "us-east-1"
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_region() -> str:
+    return os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or DEFAULT_REGION
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Configuración de botocore común a todos los clientes."""
+    return Config(
+        region_name=get_region(),
+        max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "64")),
+        connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", "2")),
+        read_timeout=float(os.getenv("AWS_READ_TIMEOUT", "10")),
+        retries={
+            "mode": os.getenv("AWS_RETRY_MODE", "standard"),
+            "total_max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "5")),
+        },
+        tcp_keepalive=_env_bool("AWS_TCP_KEEPALIVE", True),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_session() -> boto3.session.Session:
+    return boto3.session.Session(region_name=get_region())
+
+
+@lru_cache(maxsize=None)
+def get_resource(service: str):
+    """Recurso boto3 único por servicio (p. ej. "dynamodb")."""
+    return get_session().resource(service, config=get_config())
+
+
+@lru_cache(maxsize=None)
+def get_client(service: str):
+    """
+    Cliente boto3 único por servicio.
+
+    Para servicios con recurso (dynamodb) se reutiliza el cliente del recurso,
+    de modo que tablas y cliente comparten un solo pool de conexiones.
+    """
+    if service in get_session().get_available_resources():
+        return get_resource(service).meta.client
+    return get_session().client(service, config=get_config())
+
+
+@lru_cache(maxsize=None)
+def get_table(table_name: str):
+    """Table de DynamoDB sobre el recurso compartido."""
+    return get_resource("dynamodb").Table(table_name)
@@ -0,0 +1,156 @@
+"""
+Backtest vectorizado (NumPy) de umbrales sobre el histórico STATE# de un plot.
+
+Reproduce la regla de lambda_alert_processor._find_deviations: una lectura
+está fuera de rango si value < Min o value > Max (comparación estricta, los
+límites no configurados no se evalúan). Las lecturas llegan por páginas en
+orden cronológico y el estado entre páginas se arrastra, así la memoria no
+depende del tamaño del rango.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.utils.aggregation import item_timestamp, metric_values, to_epoch_seconds
+
+# Mismo mapeo que METRIC_TO_RANGE_FIELDS en lambda_alert_processor
+METRIC_TO_RANGE_FIELDS = {
+    "temperature": ("MinTemperature", "MaxTemperature"),
+    "humidity": ("MinHumidity", "MaxHumidity"),
+    "light": ("MinLight", "MaxLight"),
+    "irrigation": ("MinIrrigation", "MaxIrrigation"),
+}
+
+RANGE_FIELDS = tuple(field for fields in METRIC_TO_RANGE_FIELDS.values() for field in fields)
+
+# Un hueco entre lecturas mayor que esto (sensor caído) cuenta como MAX_GAP_SECONDS fuera de rango
+MAX_GAP_SECONDS = 60 * 60
+
+
+def resolve_bounds(proposed: dict, current: dict | None) -> dict:
+    """
+    Límites (lower, upper) por métrica: los valores propuestos y, para los
+    campos omitidos, los umbrales actuales del plot (también en minúsculas,
+    como hace la lambda).
+    """
+    current = current or {}
+    bounds = {}
+    for metric, fields in METRIC_TO_RANGE_FIELDS.items():
+        pair = []
+        for field in fields:
+            value = proposed.get(field)
+            if value is None:
+                value = next((current[key] for key in (field, field.lower()) if current.get(key) not in (None, "")), None)
+            pair.append(_to_float(value))
+        if pair[0] is not None or pair[1] is not None:
+            bounds[metric] = tuple(pair)
+    return bounds
+
+
+def _to_float(value) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ThresholdBacktest:
+    """Acumula violaciones, episodios y tiempo fuera de rango por métrica."""
+
+    def __init__(self, bounds: dict):
+        self.bounds = bounds
+        self.stats = {
+            metric: {
+                "readings": 0,
+                "violations": 0,
+                "below": 0,
+                "above": 0,
+                "episodes": 0,
+                "first_violation": None,
+                "last_violation": None,
+                "out_of_range_seconds": 0.0,
+            }
+            for metric in bounds
+        }
+        # (timestamp, fuera_de_rango) de la última lectura vista por métrica
+        self._carry = {metric: None for metric in bounds}
+        self.readings = 0
+        # Lecturas con al menos una desviación (un aviso por lectura, como _find_deviations)
+        self.alerts = 0
+
+    def add(self, items: list[dict]) -> None:
+        if not items:
+            return
+        seconds = to_epoch_seconds([item_timestamp(item) for item in items])
+        self.readings += len(items)
+        any_violation = np.zeros(len(items), dtype=bool)
+
+        for metric, (lower, upper) in self.bounds.items():
+            values = metric_values(items, metric)
+            mask = ~np.isnan(values) & ~np.isnan(seconds)
+            if not mask.any():
+                continue
+            t, v = seconds[mask], values[mask]
+
+            below = v < lower if lower is not None else np.zeros(len(v), dtype=bool)
+            above = v > upper if upper is not None else np.zeros(len(v), dtype=bool)
+            violated = below | above
+            any_violation[mask] |= violated
+
+            stats = self.stats[metric]
+            carry = self._carry[metric]
+            prev_t = np.concatenate(([carry[0]], t)) if carry else t
+            prev_state = np.concatenate(([carry[1]], violated)) if carry else violated
+
+            # Cada intervalo entre lecturas se atribuye al estado de la lectura que lo abre
+            gaps = np.minimum(np.diff(prev_t), MAX_GAP_SECONDS)
+            stats["out_of_range_seconds"] += float(gaps[prev_state[:-1]].sum())
+
+            # Un episodio empieza en cada paso de "en rango" a "fuera de rango"
+            previous = prev_state[:-1] if carry else np.concatenate(([False], violated[:-1]))
+            stats["episodes"] += int((violated & ~previous).sum())
+
+            stats["readings"] += int(len(v))
+            stats["violations"] += int(violated.sum())
+            stats["below"] += int(below.sum())
+            stats["above"] += int(above.sum())
+            if violated.any():
+                hits = t[violated]
+                if stats["first_violation"] is None:
+                    stats["first_violation"] = float(hits[0])
+                stats["last_violation"] = float(hits[-1])
+
+            self._carry[metric] = (t[-1], bool(violated[-1]))
+
+        self.alerts += int(any_violation.sum())
+
+    def result(self) -> dict:
+        metrics = {}
+        for metric, stats in self.stats.items():
+            lower, upper = self.bounds[metric]
+            readings = stats["readings"]
+            metrics[metric] = {
+                "lower_bound": lower,
+                "upper_bound": upper,
+                "readings": readings,
+                "violations": stats["violations"],
+                "below": stats["below"],
+                "above": stats["above"],
+                "episodes": stats["episodes"],
+                "violation_ratio": round(stats["violations"] / readings, 4) if readings else 0.0,
+                "first_violation": _iso(stats["first_violation"]),
+                "last_violation": _iso(stats["last_violation"]),
+                "out_of_range_seconds": round(stats["out_of_range_seconds"], 1),
+            }
+        return {
+            "readings": self.readings,
+            "alerts": self.alerts,
+            "episodes": sum(stats["episodes"] for stats in self.stats.values()),
+            "metrics": metrics,
+        }
+
+
+def _iso(seconds: float | None) -> str | None:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
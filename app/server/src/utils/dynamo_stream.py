@@ -0,0 +1,238 @@
+"""
+Procesado compartido de registros de DynamoDB Streams.
+
+Lo usan las Lambdas disparadas por el stream de la tabla (se copia como
+`dynamo_stream.py` en cada paquete ZIP, igual que aws_clients.py), así que
+solo puede depender de boto3 y la stdlib.
+
+Cada registro se decodifica en dos pasos:
+1. Solo las claves (pk/sk), que son strings y se leen sin TypeDeserializer.
+2. NewImage/OldImage completos, y únicamente si el registro coincide con
+   alguna ruta y el handler los pide (StreamRecord.new_image / old_image).
+
+Así un registro que no interesa (EVENT#, THRESHOLDS, Metadata...) cuesta un
+par de lecturas de diccionario.
+
+Uso:
+    router = StreamRouter()
+
+    @router.route("PLOT#", sk_prefix="STATE#", events=("INSERT",))
+    def on_state(record):
+        item = record.new_image
+        ...
+
+    stats = router.dispatch(event.get("Records", []))
+"""
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from boto3.dynamodb.types import TypeDeserializer
+
+logger = logging.getLogger(__name__)
+
+deserializer = TypeDeserializer()
+
+ALL_EVENTS = ("INSERT", "MODIFY", "REMOVE")
+
+_UNSET = object()
+
+
+def deserialize_image(image: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convierte un mapa de atributos del stream en un dict de Python."""
+    if image is None:
+        return None
+    return {key: deserializer.deserialize(value) for key, value in image.items()}
+
+
+def _key_value(value: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not value:
+        return None
+    # pk/sk de la tabla son siempre strings: evita pasar por TypeDeserializer
+    if "S" in value:
+        return value["S"]
+    result = deserializer.deserialize(value)
+    return str(result) if result is not None else None
+
+
+class StreamRecord:
+    """Registro del stream con las claves decodificadas y las imágenes perezosas."""
+
+    __slots__ = ("raw", "event_name", "pk", "sk", "_new_image", "_old_image")
+
+    def __init__(self, raw: Dict[str, Any], pk: str, sk: str):
+        self.raw = raw
+        self.event_name = raw.get("eventName")
+        self.pk = pk
+        self.sk = sk
+        self._new_image: Any = _UNSET
+        self._old_image: Any = _UNSET
+
+    @property
+    def pk_id(self) -> str:
+        """Parte de la pk tras el prefijo (PLOT#123 -> 123)."""
+        return self.pk.split("#", maxsplit=1)[-1]
+
+    @property
+    def new_image(self) -> Optional[Dict[str, Any]]:
+        if self._new_image is _UNSET:
+            self._new_image = deserialize_image(self.raw.get("dynamodb", {}).get("NewImage"))
+        return self._new_image
+
+    @property
+    def old_image(self) -> Optional[Dict[str, Any]]:
+        if self._old_image is _UNSET:
+            self._old_image = deserialize_image(self.raw.get("dynamodb", {}).get("OldImage"))
+        return self._old_image
+
+    def new_value(self, name: str) -> Any:
+        """Un solo atributo de NewImage, sin deserializar el resto."""
+        if self._new_image is not _UNSET:
+            return (self._new_image or {}).get(name)
+        value = (self.raw.get("dynamodb", {}).get("NewImage") or {}).get(name)
+        return deserializer.deserialize(value) if value is not None else None
+
+    def old_value(self, name: str) -> Any:
+        """Un solo atributo de OldImage, sin deserializar el resto."""
+        if self._old_image is not _UNSET:
+            return (self._old_image or {}).get(name)
+        value = (self.raw.get("dynamodb", {}).get("OldImage") or {}).get(name)
+        return deserializer.deserialize(value) if value is not None else None
+
+
+def record_keys(record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(pk, sk) de un registro del stream, o None si no las trae."""
+    keys = record.get("dynamodb", {}).get("Keys")
+    if not keys:
+        return None
+    pk = _key_value(keys.get("pk"))
+    sk = _key_value(keys.get("sk"))
+    if not pk or not sk:
+        return None
+    return pk, sk
+
+
+class _Route:
+    __slots__ = ("name", "handler", "pk_prefix", "sk_prefix", "sk_values", "events", "raise_errors")
+
+    def __init__(self, name, handler, pk_prefix, sk_prefix, sk_values, events, raise_errors):
+        self.name = name
+        self.handler = handler
+        self.pk_prefix = pk_prefix
+        self.sk_prefix = sk_prefix
+        self.sk_values = sk_values
+        self.events = events
+        self.raise_errors = raise_errors
+
+    def matches(self, pk: str, sk: str) -> bool:
+        if not pk.startswith(self.pk_prefix):
+            return False
+        if self.sk_values is not None:
+            return sk in self.sk_values
+        return sk.startswith(self.sk_prefix)
+
+
+class StreamRouter:
+    """
+    Enruta registros del stream a handlers registrados por prefijo de pk/sk.
+
+    Un registro puede coincidir con varias rutas; se llaman en el orden en que
+    se registraron y comparten el mismo StreamRecord (las imágenes se
+    deserializan como mucho una vez). Por defecto la excepción de un handler
+    se registra en el log y el lote sigue; con raise_errors=True se propaga
+    para que Lambda reintente el lote.
+    """
+
+    def __init__(self):
+        self._routes: List[_Route] = []
+
+    def route(
+        self,
+        pk_prefix: str = "",
+        sk_prefix: str = "",
+        sk: Union[str, Sequence[str], None] = None,
+        events: Sequence[str] = ALL_EVENTS,
+        name: Optional[str] = None,
+        raise_errors: bool = False,
+    ) -> Callable:
+        """Decorador: registra handler(record: StreamRecord) para las claves indicadas."""
+        def decorator(handler: Callable[[StreamRecord], Any]) -> Callable[[StreamRecord], Any]:
+            self.add(handler, pk_prefix, sk_prefix, sk, events, name, raise_errors)
+            return handler
+        return decorator
+
+    def add(
+        self,
+        handler: Callable[[StreamRecord], Any],
+        pk_prefix: str = "",
+        sk_prefix: str = "",
+        sk: Union[str, Sequence[str], None] = None,
+        events: Sequence[str] = ALL_EVENTS,
+        name: Optional[str] = None,
+        raise_errors: bool = False,
+    ) -> None:
+        """Como route(), sin decorador. `sk` fija valores exactos y tiene prioridad sobre sk_prefix."""
+        sk_values = None if sk is None else frozenset((sk,) if isinstance(sk, str) else sk)
+        self._routes.append(
+            _Route(
+                name or handler.__name__,
+                handler,
+                pk_prefix,
+                sk_prefix,
+                sk_values,
+                frozenset(events),
+                raise_errors,
+            )
+        )
+
+    def dispatch(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Procesa un lote de registros y devuelve las estadísticas:
+        {"records", "matched", "skipped", "handlers": {name: {"records", "errors", "seconds"}}}
+        """
+        handlers = {route.name: {"records": 0, "errors": 0, "seconds": 0.0} for route in self._routes}
+        total = matched = 0
+
+        for raw in records:
+            total += 1
+            event_name = raw.get("eventName")
+            routes = [route for route in self._routes if event_name in route.events]
+            if not routes:
+                continue
+            keys = record_keys(raw)
+            if keys is None:
+                continue
+            pk, sk = keys
+            routes = [route for route in routes if route.matches(pk, sk)]
+            if not routes:
+                continue
+
+            matched += 1
+            record = StreamRecord(raw, pk, sk)
+            for route in routes:
+                timing = handlers[route.name]
+                timing["records"] += 1
+                start = time.perf_counter()
+                try:
+                    route.handler(record)
+                except Exception:  # pylint: disable=broad-except
+                    timing["errors"] += 1
+                    if route.raise_errors:
+                        raise
+                    logger.exception("Stream handler %s failed for %s/%s", route.name, pk, sk)
+                finally:
+                    timing["seconds"] += time.perf_counter() - start
+
+        stats = {"records": total, "matched": matched, "skipped": total - matched, "handlers": handlers}
+        logger.info(
+            "Stream batch: %d records, %d matched, %d skipped; %s",
+            total,
+            matched,
+            total - matched,
+            ", ".join(
+                f"{name}={timing['records']} in {timing['seconds'] * 1000:.1f}ms"
+                + (f" ({timing['errors']} errors)" if timing["errors"] else "")
+                for name, timing in handlers.items()
+            ) or "no handlers",
+        )
+        return stats
@@ -0,0 +1,198 @@
+"""
+Exportación en streaming del histórico STATE# de parcelas e instalaciones.
+
+Todo es una cadena de generadores asíncronos: páginas de DynamoDB -> filas ->
+trozos de bytes de la respuesta. Mientras se escribe una página ya se está
+pidiendo la siguiente, y en memoria solo hay una página (CSV) o un row group
+(Parquet), así que un rango de varios años ocupa lo mismo que uno de un día.
+
+Parquet necesita pyarrow (opcional): cada EXPORT_ROW_GROUP_ROWS filas se
+escribe un row group y sus bytes se envían en cuanto están listos; el pie
+del fichero se envía al final.
+"""
+import asyncio
+import csv
+import io
+import os
+from typing import AsyncIterator, Iterable
+
+from boto3.dynamodb.conditions import Key
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.utils.aggregation import METRICS, item_timestamp, parse_timestamp
+from src.utils.keys import pk_plot, sk_state_bounds
+
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+COLUMNS = ("plot_id", "timestamp", *METRICS)
+
+# Filas por row group de Parquet
+EXPORT_ROW_GROUP_ROWS = int(os.getenv("EXPORT_ROW_GROUP_ROWS", "50000"))
+# Filas por trozo de CSV enviado
+EXPORT_CSV_CHUNK_ROWS = 1000
+
+
+def check_export_params(fmt: str, start_date: str | None, end_date: str | None) -> None:
+    """Valida antes de empezar a emitir: después ya no se puede devolver un error HTTP."""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    try:
+        for value in (start_date, end_date):
+            if value:
+                parse_timestamp(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def iter_pages(table, query: dict) -> AsyncIterator[list[dict]]:
+    """Páginas de una query, pidiendo la siguiente mientras se consume la actual."""
+    pending = asyncio.ensure_future(table.query(**query))
+    try:
+        while True:
+            response = await pending
+            last_key = response.get("LastEvaluatedKey")
+            if last_key:
+                pending = asyncio.ensure_future(table.query(**{**query, "ExclusiveStartKey": last_key}))
+            yield response.get("Items", [])
+            if not last_key:
+                return
+    finally:
+        # El cliente cortó la descarga: no dejar la página adelantada colgando
+        if not pending.done():
+            pending.cancel()
+
+
+async def iter_plot_rows(table, plot_id: str, start_date: str | None, end_date: str | None) -> AsyncIterator[list[tuple]]:
+    """Filas (una lista por página) de las lecturas de una parcela en orden cronológico."""
+    low, high = sk_state_bounds(start_date, end_date)
+    query = {
+        "KeyConditionExpression": Key("pk").eq(pk_plot(plot_id)) & Key("sk").between(low, high),
+        "ProjectionExpression": "sk, #ts, " + ", ".join(f"#{metric}" for metric in METRICS),
+        "ExpressionAttributeNames": {"#ts": "Timestamp", **{f"#{metric}": metric for metric in METRICS}},
+    }
+    async for items in iter_pages(table, query):
+        yield [
+            (plot_id, item_timestamp(item), *(_number(item.get(metric)) for metric in METRICS))
+            for item in items
+        ]
+
+
+async def iter_facility_rows(table, plot_ids: Iterable[str], start_date: str | None, end_date: str | None) -> AsyncIterator[list[tuple]]:
+    """Filas de todas las parcelas, una parcela detrás de otra."""
+    for plot_id in plot_ids:
+        async for rows in iter_plot_rows(table, plot_id, start_date, end_date):
+            yield rows
+
+
+def _number(value) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def csv_chunks(pages: AsyncIterator[list[tuple]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    async for rows in pages:
+        for start in range(0, len(rows), EXPORT_CSV_CHUNK_ROWS):
+            writer.writerows(rows[start:start + EXPORT_CSV_CHUNK_ROWS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichero de solo escritura que acumula lo escrito hasta que se recoge con drain()."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [("plot_id", pa.string()), ("timestamp", pa.string())]
+        + [(metric, pa.float64()) for metric in METRICS]
+    )
+
+
+def _row_group(rows: list[tuple], schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+async def parquet_chunks(pages: AsyncIterator[list[tuple]]) -> AsyncIterator[bytes]:
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    pending: list[tuple] = []
+    try:
+        async for rows in pages:
+            pending.extend(rows)
+            while len(pending) >= EXPORT_ROW_GROUP_ROWS:
+                group, pending = pending[:EXPORT_ROW_GROUP_ROWS], pending[EXPORT_ROW_GROUP_ROWS:]
+                # Codificar y comprimir es CPU: fuera del event loop
+                await asyncio.to_thread(writer.write_table, _row_group(group, schema))
+                yield sink.drain()
+        if pending:
+            await asyncio.to_thread(writer.write_table, _row_group(pending, schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_response(
+    fmt: str,
+    pages: AsyncIterator[list[tuple]],
+    scope: str,
+    target_id: str,
+    start_date: str | None,
+    end_date: str | None,
+) -> StreamingResponse:
+    """Respuesta de descarga (CSV o Parquet) que se va escribiendo según llegan las páginas."""
+    chunks = parquet_chunks(pages) if fmt == "parquet" else csv_chunks(pages)
+    parts = [scope, target_id, (start_date or "")[:10], (end_date or "")[:10]]
+    filename = "_".join(part for part in parts if part) + f".{fmt}"
+    return StreamingResponse(
+        chunks,
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,184 @@
+"""
+Motor vectorizado (NumPy) de riego recomendado por parcela.
+
+Para cada parcela, con las lecturas STATE# y los riegos EVENT# de la ventana
+reciente y sus umbrales MinIrrigation/MaxIrrigation (mm/día):
+
+1. Demanda climática en [0, 1]: media ponderada de temperatura alta, humedad
+   baja y luz alta (los términos sin lecturas no cuentan).
+2. Objetivo = MinIrrigation + (MaxIrrigation - MinIrrigation) * demanda.
+3. Factor de suelo: 1 con el suelo seco (última soil_moisture <= SOIL_DRY),
+   0 con el suelo húmedo (>= SOIL_WET), lineal entre ambos; 1 sin lecturas.
+4. Cantidad = max(0, objetivo * factor - riego ya aplicado en la ventana).
+   WaterAmount de los eventos se asume en las mismas unidades que los umbrales.
+
+Momento: inmediato con el suelo seco; si no, la siguiente IRRIGATION_HOUR_UTC
+(primera hora de la mañana, menos evaporación).
+
+Todas las parcelas de una instalación se calculan en una sola pasada: las
+lecturas se concatenan y se agregan por parcela con np.bincount.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from src.utils.aggregation import item_timestamp, metric_values
+from src.utils.usage_days import WATER_FIELDS
+
+# Ventana de lecturas y riegos que se tiene en cuenta (los umbrales son por día)
+WINDOW_HOURS = int(os.getenv("RECOMMENDATION_WINDOW_HOURS", "24"))
+IRRIGATION_HOUR_UTC = int(os.getenv("RECOMMENDATION_IRRIGATION_HOUR_UTC", "6"))
+
+SOIL_DRY = 30.0
+SOIL_WET = 70.0
+
+# Peso de cada término de la demanda; cada término se normaliza a [0, 1]
+TEMPERATURE_RANGE = (10.0, 35.0)
+LIGHT_REFERENCE = 1000.0
+DEMAND_WEIGHTS = {"temperature": 0.5, "humidity": 0.3, "light": 0.2}
+# Demanda cuando no hay lecturas climáticas en la ventana
+DEFAULT_DEMAND = 0.5
+
+
+def _group_mean(values: np.ndarray, group: np.ndarray, size: int) -> np.ndarray:
+    mask = ~np.isnan(values)
+    counts = np.bincount(group[mask], minlength=size)
+    sums = np.bincount(group[mask], weights=values[mask], minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _group_last(values: np.ndarray, group: np.ndarray, size: int) -> np.ndarray:
+    """Último valor no nulo de cada grupo (las lecturas llegan en orden cronológico)."""
+    if not len(values):
+        return np.full(size, np.nan)
+    mask = ~np.isnan(values)
+    last = np.full(size, -1, dtype=np.int64)
+    np.maximum.at(last, group[mask], np.flatnonzero(mask))
+    return np.where(last >= 0, values[np.maximum(last, 0)], np.nan)
+
+
+def _concat(plots: list[dict], field: str) -> tuple[list[dict], np.ndarray]:
+    items = [item for plot in plots for item in plot[field]]
+    group = np.repeat(np.arange(len(plots)), [len(plot[field]) for plot in plots])
+    return items, group
+
+
+def _threshold(thresholds: dict | None, field: str) -> float:
+    value = (thresholds or {}).get(field)
+    if value is None:
+        value = (thresholds or {}).get(field.lower())
+    try:
+        return float(value) if value not in (None, "") else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _water_applied(events: list[dict]) -> np.ndarray:
+    applied = np.full(len(events), np.nan)
+    for field in WATER_FIELDS:
+        values = metric_values(events, field)
+        applied = np.where(np.isnan(applied), values, applied)
+    return applied
+
+
+def _next_irrigation_time(now: datetime) -> datetime:
+    slot = now.replace(hour=IRRIGATION_HOUR_UTC, minute=0, second=0, microsecond=0)
+    return slot if slot > now else slot + timedelta(days=1)
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _optional(value: float, digits: int = 2) -> float | None:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def recommend(plots: list[dict], now: datetime | None = None) -> list[dict]:
+    """
+    Calcula el riego recomendado de varias parcelas a la vez.
+
+    Cada parcela es {"plot_id", "readings": [STATE#...], "events": [EVENT#...],
+    "thresholds": THRESHOLDS | None}, con las lecturas en orden cronológico.
+    """
+    now = now or datetime.now(timezone.utc)
+    size = len(plots)
+    if not size:
+        return []
+
+    readings, reading_group = _concat(plots, "readings")
+    means = {
+        metric: _group_mean(metric_values(readings, metric), reading_group, size)
+        for metric in DEMAND_WEIGHTS
+    }
+    soil = _group_last(metric_values(readings, "soil_moisture"), reading_group, size)
+
+    events, event_group = _concat(plots, "events")
+    water = _water_applied(events)
+    applied = np.bincount(event_group[~np.isnan(water)], weights=water[~np.isnan(water)], minlength=size)
+
+    low, high = TEMPERATURE_RANGE
+    terms = {
+        "temperature": np.clip((means["temperature"] - low) / (high - low), 0, 1),
+        "humidity": np.clip(1 - means["humidity"] / 100, 0, 1),
+        "light": np.clip(means["light"] / LIGHT_REFERENCE, 0, 1),
+    }
+    weighted = np.zeros(size)
+    weights = np.zeros(size)
+    for metric, weight in DEMAND_WEIGHTS.items():
+        present = ~np.isnan(terms[metric])
+        weighted += np.where(present, terms[metric] * weight, 0)
+        weights += np.where(present, weight, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        demand = np.where(weights > 0, weighted / np.maximum(weights, 1e-9), DEFAULT_DEMAND)
+
+    minimum = np.array([_threshold(plot.get("thresholds"), "MinIrrigation") for plot in plots])
+    maximum = np.array([_threshold(plot.get("thresholds"), "MaxIrrigation") for plot in plots])
+    has_thresholds = ~(np.isnan(minimum) & np.isnan(maximum))
+    minimum = np.where(np.isnan(minimum), 0.0, minimum)
+    maximum = np.where(np.isnan(maximum), minimum, np.maximum(maximum, minimum))
+    target = minimum + (maximum - minimum) * demand
+
+    soil_factor = np.where(np.isnan(soil), 1.0, np.clip((SOIL_WET - soil) / (SOIL_WET - SOIL_DRY), 0, 1))
+    amount = np.where(has_thresholds, np.maximum(target * soil_factor - applied, 0), 0.0)
+    amount = np.round(amount, 1)
+    dry = ~np.isnan(soil) & (soil <= SOIL_DRY)
+
+    computed_at = _iso(now)
+    scheduled = _iso(_next_irrigation_time(now))
+    results = []
+    for i, plot in enumerate(plots):
+        if not has_thresholds[i]:
+            reason = "no_thresholds"
+        elif not plot["readings"]:
+            reason = "no_readings"
+        elif not np.isnan(soil[i]) and soil[i] >= SOIL_WET:
+            reason = "soil_wet"
+        elif amount[i] == 0 and applied[i] > 0:
+            reason = "already_irrigated"
+        elif dry[i]:
+            reason = "soil_dry"
+        else:
+            reason = "climate_demand"
+
+        irrigate = bool(amount[i] > 0)
+        results.append({
+            "plot_id": plot["plot_id"],
+            "amount": float(amount[i]),
+            "scheduled_at": (computed_at if dry[i] else scheduled) if irrigate else None,
+            "priority": ("high" if dry[i] else "normal") if irrigate else "none",
+            "reason": reason,
+            "target": round(float(target[i]), 2) if has_thresholds[i] else None,
+            "applied": round(float(applied[i]), 2),
+            "demand": round(float(demand[i]), 3),
+            "soil_moisture": _optional(soil[i]),
+            "inputs": {metric: _optional(means[metric][i]) for metric in DEMAND_WEIGHTS},
+            "readings": len(plot["readings"]),
+            "source_timestamp": item_timestamp(plot["readings"][-1]) if plot["readings"] else None,
+            "last_irrigation": item_timestamp(plot["events"][-1]) if plot["events"] else None,
+            "window_hours": WINDOW_HOURS,
+            "computed_at": computed_at,
+        })
+    return results
@@ -16,11 +16,41 @@ def pk_species(species_id: str) -> str:
 def sk_state(timestamp: str) -> str:
     return f"STATE#{timestamp}"
 
+def sk_state_bounds(start: str | None, end: str | None) -> tuple[str, str]:
+    """Límites inclusivos de sk para un rango de timestamps ISO (BETWEEN)."""
+    # "~" ordena después de cualquier carácter ISO, así end="2025-01-31" incluye todo ese día
+    return sk_state(start or ""), sk_state(end or "") + "~"
+
+def sk_latest() -> str:
+    """Copia de la última lectura STATE# de un plot, mantenida en la ingesta."""
+    return "LATEST"
+
+def sk_rollup(resolution: str, bucket_start: str) -> str:
+    """Rollup mantenido por lambda_rollup_processor (resolution: 1h | 1d)."""
+    return f"ROLLUP#{resolution}#{bucket_start}"
+
+def sk_usage(day: str) -> str:
+    """Consumo de agua diario mantenido por lambda_rollup_processor (day: YYYY-MM-DD)."""
+    return f"USAGE#1d#{day}"
+
 def sk_event(timestamp: str) -> str:
     return f"EVENT#{timestamp}"
 
+def sk_event_bounds(start: str | None, end: str | None) -> tuple[str, str]:
+    """Como sk_state_bounds, para los eventos (riegos) EVENT#."""
+    return sk_event(start or ""), sk_event(end or "") + "~"
+
+def sk_recommendation() -> str:
+    """Riego recomendado vigente de un plot (se sobrescribe en cada recálculo)."""
+    return "RECOMMENDATION#CURRENT"
+
 def gsi_pk(facility_id: str) -> str:
     return f"FACILITY#{facility_id}"
 
 def gsi_sk(timestamp: str) -> str:
-    return f"TIMESTAMP#{timestamp}"
\ No newline at end of file
+    return f"TIMESTAMP#{timestamp}"
+
+def gsi_sk_bounds(start: str, end: str) -> tuple[str, str]:
+    """Límites inclusivos de GSI_SK para un rango de timestamps ISO (BETWEEN)."""
+    # Igual que sk_state_bounds: end="2025-01-31" incluye todo ese día
+    return gsi_sk(start), gsi_sk(end) + "~"
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Paginación por cursor y respuestas NDJSON para los endpoints de listado.
+
+El cursor es el LastEvaluatedKey de DynamoDB serializado en JSON y codificado
+en base64 url-safe; el cliente lo trata como un valor opaco.
+"""
+import base64
+import binascii
+import json
+import os
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from src.utils.serialization import dumps, json_default
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_cursor(last_evaluated_key: dict | None) -> str | None:
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def clamp_limit(limit: int | None) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def wants_ndjson(request: Request, stream: bool = False) -> bool:
+    """True si el cliente pidió streaming (?stream=true o Accept: application/x-ndjson)."""
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def query_page(table, limit: int | None, cursor: str | None, **query) -> tuple[list, str | None]:
+    """
+    Devuelve hasta `limit` ítems a partir de `cursor` y el cursor de la
+    siguiente página (None si no hay más).
+    """
+    limit = clamp_limit(limit)
+    start_key = decode_cursor(cursor)
+    items: list = []
+
+    while len(items) < limit:
+        if start_key:
+            query["ExclusiveStartKey"] = start_key
+        response = await table.query(Limit=limit - len(items), **query)
+        items.extend(response.get("Items", []))
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            break
+
+    return items, encode_cursor(start_key)
+
+
+def iter_query(table, cursor: str | None = None, limit: int | None = None, **query) -> AsyncIterator[dict]:
+    """Itera los ítems de una query a medida que llegan las páginas de DynamoDB."""
+    # El cursor se valida aquí, antes de que la respuesta empiece a emitirse
+    return _iter_pages(table, decode_cursor(cursor), limit, query)
+
+
+async def _iter_pages(table, start_key: dict | None, limit: int | None, query: dict) -> AsyncIterator[dict]:
+    sent = 0
+
+    while True:
+        if start_key:
+            query["ExclusiveStartKey"] = start_key
+        if limit is not None:
+            query["Limit"] = limit - sent
+        response = await table.query(**query)
+        for item in response.get("Items", []):
+            yield item
+            sent += 1
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key or (limit is not None and sent >= limit):
+            return
+
+
+def ndjson_response(items: AsyncIterator[dict], transform: Callable[[dict], Any] | None = None) -> StreamingResponse:
+    """Respuesta application/x-ndjson: un objeto JSON por línea."""
+    async def body():
+        async for item in items:
+            if transform is not None:
+                item = transform(item)
+            yield dumps(item) + b"\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,123 @@
+"""
+Forma de los ítems de lecturas (STATE#) y eventos (EVENT#) en la tabla.
+
+La comparten lambda_iot_handler (se copia como `readings.py` en su paquete
+ZIP, igual que aws_clients.py) y la importación masiva de histórico
+(src.dal.bulk_import), así un dato importado es idéntico al que llega por
+IoT. Solo puede depender de la stdlib.
+
+format_reading no consulta nada: si el payload no trae facility_id, quien
+llama debe completarlo antes (la Lambda lo busca en PLOT#<id> / Metadata).
+"""
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metadatos del payload -> atributo del ítem
+METADATA_MAP = {
+    'SpeciesId': 'SpeciesId',
+    'species_id': 'SpeciesId',
+    'FacilityId': 'FacilityId',
+    'facility_id': 'FacilityId',
+    'BusinessId': 'BusinessId',
+    'business_id': 'BusinessId',
+    'PlotName': 'PlotName',
+    'plot_name': 'PlotName',
+}
+
+# Campos de riego -> atributo del ítem ('type' choca con el GSI_TypeIndex)
+IRRIGATION_FIELD_MAP = {
+    'event_type': 'EventType',
+    'duration': 'Duration',
+    'water_amount': 'WaterAmount',
+    'type': 'IrrigationType',
+}
+
+# Campos del payload que no se copian como atributos de un evento
+EVENT_EXCLUDED_FIELDS = ('plot_id', 'timestamp', 'facility_id', 'species_id', 'business_id', 'plot_name')
+
+EVENT_FIELDS = ('event_type', 'duration', 'water_amount')
+
+
+def message_type(payload: Dict[str, Any]) -> str:
+    """'event' si trae campos de riego, el 'type' explícito si lo hay, si no 'state'."""
+    if any(field in payload for field in EVENT_FIELDS):
+        return 'event'
+    if 'type' in payload:
+        return payload['type']
+    return 'state'
+
+
+def convert_to_decimal(obj: Any) -> Any:
+    """float -> Decimal (DynamoDB no acepta float), también dentro de dicts y listas."""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    if isinstance(obj, dict):
+        return {k: convert_to_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [convert_to_decimal(item) for item in obj]
+    return obj
+
+
+def format_reading(payload: Dict[str, Any], plot_id: str, timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ítem de DynamoDB (diseño de tabla única) de una lectura o un evento:
+    - pk: PLOT#<plot_id>
+    - sk: STATE#<timestamp> o EVENT#<timestamp> (DATA#<timestamp> si el tipo es desconocido)
+    - GSI_PK: FACILITY#<facility_id> (FACILITY#UNKNOWN sin instalación)
+    - GSI_SK: TIMESTAMP#<timestamp>
+    - los datos del tipo como atributos de primer nivel
+
+    Sin timestamp en el payload se usa `timestamp` o, si no, la hora actual.
+    """
+    timestamp = payload.get('timestamp') or timestamp or datetime.utcnow().isoformat() + 'Z'
+    kind = message_type(payload)
+
+    item = {
+        'pk': f'PLOT#{plot_id}',
+        'Timestamp': timestamp,
+        'GSI_SK': f'TIMESTAMP#{timestamp}',
+    }
+
+    for source_key, target_key in METADATA_MAP.items():
+        if source_key in payload and payload[source_key] not in (None, ''):
+            item[target_key] = convert_to_decimal(payload[source_key])
+
+    # plot_id para el backend y PlotId por compatibilidad
+    item['plot_id'] = plot_id
+    item['PlotId'] = plot_id
+
+    facility_id = item.get('FacilityId')
+    item['GSI_PK'] = f'FACILITY#{facility_id}' if facility_id else 'FACILITY#UNKNOWN'
+
+    if kind == 'state':
+        item['sk'] = f'STATE#{timestamp}'
+        sensor_data = convert_to_decimal(payload.get('sensor_data', {}))
+        if isinstance(sensor_data, dict):
+            item.update(sensor_data)
+
+    elif kind == 'event':
+        item['sk'] = f'EVENT#{timestamp}'
+        for key, value in payload.items():
+            if key not in EVENT_EXCLUDED_FIELDS:
+                item[IRRIGATION_FIELD_MAP.get(key, key)] = convert_to_decimal(value)
+
+    else:
+        item['sk'] = f'DATA#{timestamp}'
+        logger.warning("Unknown message type '%s'", kind)
+
+    return item
+
+
+def latest_state_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia de un ítem STATE# como PLOT#<plot_id> / LATEST. Sin los atributos
+    de GSI, para que LATEST no aparezca en el índice temporal de la instalación.
+    """
+    latest = {k: v for k, v in item.items() if k not in ('GSI_PK', 'GSI_SK')}
+    latest['sk'] = 'LATEST'
+    latest['state_sk'] = item['sk']
+    return latest
@@ -0,0 +1,70 @@
+"""
+Serialización JSON de los ítems de DynamoDB.
+
+boto3 devuelve todos los números como Decimal. Este es el único camino para
+pasarlos a números JSON (int si son enteros, float si no):
+- to_json_native: para un valor o ítem suelto (dicts, listas y sets anidados)
+- json_default: el `default` del encoder, para lo que llega sin convertir
+- src.schemas.dynamo.DynamoItem: los modelos de respuesta, que lo aplican al validar
+
+FastJSONResponse es la clase de respuesta por defecto de la app: usa orjson
+(opcional) y, si no está instalado, json de la stdlib con el mismo resultado.
+"""
+import json
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def decimal_to_number(value: Decimal) -> int | float:
+    return int(value) if value % 1 == 0 else float(value)
+
+
+def to_json_native(value: Any) -> Any:
+    """Copia de `value` con los Decimal convertidos a int/float y los sets a listas."""
+    if isinstance(value, Decimal):
+        return decimal_to_number(value)
+    if isinstance(value, dict):
+        return {key: to_json_native(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_json_native(item) for item in value]
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """Serializa los tipos de DynamoDB que el encoder no conoce."""
+    if isinstance(value, Decimal):
+        return decimal_to_number(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=json_default, option=_ORJSON_OPTIONS)
+
+else:
+    def dumps(value: Any) -> bytes:
+        return json.dumps(
+            value,
+            default=json_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que codifica con dumps (orjson si está disponible) y acepta Decimal."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,79 @@
+"""
+Consumo de agua de riego a partir de los ítems USAGE#1d#<día>.
+
+Los mantiene lambda_rollup_processor (uno por parcela y día, y uno por
+instalación y día con un mapa `plots`); aquí solo se agrupan por día, semana
+(ISO, empieza en lunes) o mes, así un año son como mucho 366 ítems.
+"""
+from datetime import date, timedelta
+
+PERIODS = ("day", "week", "month")
+
+# Rango por defecto hacia atrás desde hoy según el periodo
+DEFAULT_RANGE_DAYS = {"day": 30, "week": 12 * 7, "month": 365}
+
+MAX_RANGE_DAYS = 3 * 366
+
+STAT_FIELDS = ("events", "water", "duration_sum", "duration_count")
+
+
+def period_start(day: str, period: str) -> str:
+    parsed = date.fromisoformat(day[:10])
+    if period == "week":
+        parsed -= timedelta(days=parsed.weekday())
+    elif period == "month":
+        parsed = parsed.replace(day=1)
+    return parsed.isoformat()
+
+
+def _empty() -> dict:
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def _add(total: dict, stats: dict) -> None:
+    for field in STAT_FIELDS:
+        total[field] += float(stats.get(field) or 0)
+
+
+def day_stats(item: dict) -> dict:
+    """Totales de un ítem USAGE# (en la instalación, suma del mapa `plots`)."""
+    if "plots" in item:
+        total = _empty()
+        for stats in (item.get("plots") or {}).values():
+            _add(total, stats)
+        return total
+    total = _empty()
+    _add(total, item)
+    return total
+
+
+def _summary(stats: dict) -> dict:
+    count = stats["duration_count"]
+    return {
+        "events": int(stats["events"]),
+        "water": round(stats["water"], 3),
+        "mean_duration": round(stats["duration_sum"] / count, 2) if count else None,
+    }
+
+
+def summarize(items: list[dict], period: str) -> dict:
+    """Agrupa los ítems diarios (en orden cronológico) por periodo."""
+    buckets: dict[str, dict] = {}
+    total = _empty()
+    for item in items:
+        day = item.get("day") or str(item.get("sk", "")).rsplit("#", 1)[-1]
+        stats = day_stats(item)
+        if not stats["events"]:
+            continue
+        bucket = buckets.setdefault(period_start(day, period), {**_empty(), "days": 0})
+        _add(bucket, stats)
+        bucket["days"] += 1
+        _add(total, stats)
+
+    return {
+        "totals": _summary(total),
+        "usage": [
+            {"period_start": start, "days_with_events": bucket["days"], **_summary(bucket)}
+            for start, bucket in buckets.items()
+        ],
+    }
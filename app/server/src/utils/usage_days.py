@@ -0,0 +1,125 @@
+"""
+Consumo de agua diario (USAGE#1d#<día>) a partir de los eventos de riego.
+
+Lo comparten lambda_rollup_processor (se copia como `usage_days.py` en su
+paquete ZIP, igual que aws_clients.py), que recalcula los días que tocan los
+EVENT# del stream, y la reconstrucción del servidor
+(src.dal.usage_backfill), así los dos escriben los mismos ítems. Solo puede
+depender de boto3 y la stdlib.
+
+Ítems:
+- PLOT#<id> / USAGE#1d#<día>: events, water, duration_sum, duration_count
+- FACILITY#<id> / USAGE#1d#<día>: mapa `plots` con esos totales por parcela
+"""
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+DAILY = "1d"
+
+# Campos de los EVENT# (como los escribe lambda_iot_handler, y en snake_case)
+WATER_FIELDS: Tuple[str, ...] = ("WaterAmount", "water_amount")
+DURATION_FIELDS: Tuple[str, ...] = ("Duration", "duration")
+
+# Atributos de un EVENT# que hacen falta para sumarlo
+EVENT_FIELDS: Tuple[str, ...] = ("sk", "FacilityId") + WATER_FIELDS + DURATION_FIELDS
+
+
+def usage_sk(day: str) -> str:
+    return f"USAGE#{DAILY}#{day}"
+
+
+def event_projection() -> Dict[str, Any]:
+    """ProjectionExpression y nombres para leer solo EVENT_FIELDS en una query."""
+    return {
+        "ProjectionExpression": ", ".join(f"#f{i}" for i in range(len(EVENT_FIELDS))),
+        "ExpressionAttributeNames": {f"#f{i}": field for i, field in enumerate(EVENT_FIELDS)},
+    }
+
+
+def first_number(item: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[Decimal]:
+    for field in fields:
+        value = item.get(field)
+        if isinstance(value, (Decimal, int)) and not isinstance(value, bool):
+            return Decimal(value)
+    return None
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {"events": 0, "water": Decimal(0), "duration_sum": Decimal(0), "duration_count": 0}
+
+
+def add_event(stats: Dict[str, Any], item: Dict[str, Any]) -> None:
+    """Suma un EVENT# a los totales del día."""
+    stats["events"] += 1
+    water = first_number(item, WATER_FIELDS)
+    if water is not None:
+        stats["water"] += water
+    duration = first_number(item, DURATION_FIELDS)
+    if duration is not None:
+        stats["duration_sum"] += duration
+        stats["duration_count"] += 1
+
+
+def plot_usage_item(plot_id: str, day: str, stats: Dict[str, Any], facility_id: Optional[str], now: str) -> Dict[str, Any]:
+    item: Dict[str, Any] = {
+        "pk": f"PLOT#{plot_id}",
+        "sk": usage_sk(day),
+        **stats,
+        "plot_id": plot_id,
+        "day": day,
+        "updated_at": now,
+    }
+    if facility_id:
+        item["FacilityId"] = facility_id
+    return item
+
+
+def set_facility_usage(table, facility_id: str, day: str, plot_id: str, stats: Dict[str, Any], now: str) -> None:
+    """
+    Escribe la entrada de la parcela en FACILITY#<id> / USAGE#1d#<día>, creando
+    el ítem si no existe. Solo toca su clave del mapa `plots`, así no pisa las
+    de otras parcelas que se actualicen a la vez.
+    """
+    key = {"pk": f"FACILITY#{facility_id}", "sk": usage_sk(day)}
+
+    for _ in range(3):
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression="SET #plots.#plot = :stats, updated_at = :now",
+                ConditionExpression="attribute_exists(#plots)",
+                ExpressionAttributeNames={"#plots": "plots", "#plot": plot_id},
+                ExpressionAttributeValues={":stats": stats, ":now": now},
+            )
+            return
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+        try:
+            table.put_item(
+                Item={**key, "facility_id": facility_id, "day": day, "plots": {plot_id: stats}, "updated_at": now},
+                ConditionExpression="attribute_not_exists(pk)",
+            )
+            return
+        except ClientError as error:
+            # La creó a la vez otra parcela de la instalación: se actualiza en la siguiente vuelta
+            if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                raise
+
+    raise RuntimeError(f"Could not write facility usage {facility_id}/{day}")
+
+
+def remove_facility_usage(table, facility_id: str, day: str, plot_id: str) -> None:
+    """Quita la parcela del mapa `plots` de FACILITY#<id> / USAGE#1d#<día> (si existe)."""
+    try:
+        table.update_item(
+            Key={"pk": f"FACILITY#{facility_id}", "sk": usage_sk(day)},
+            UpdateExpression="REMOVE #plots.#plot",
+            ConditionExpression="attribute_exists(#plots)",
+            ExpressionAttributeNames={"#plots": "plots", "#plot": plot_id},
+        )
+    except ClientError as error:
+        if error.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
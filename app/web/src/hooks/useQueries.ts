@@ -115,6 +115,15 @@ export function useFacilityPlots(facilityId: string) {
   })
 }
 
+export function useFacilityCurrentStates(facilityId: string) {
+  return useQuery({
+    queryKey: ['facilityCurrentStates', facilityId],
+    queryFn: () => facilityService.getFacilityCurrentStates(facilityId),
+    enabled: !!facilityId,
+    refetchInterval: 900000, // Refetch every 15 minutes
+  })
+}
+
 // Facility mutations
 export function useCreateFacility() {
   const queryClient = useQueryClient()
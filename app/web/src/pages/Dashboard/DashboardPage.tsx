@@ -2,8 +2,8 @@ import { useState } from 'react'
 import {
   useFacilities,
   useFacilityPlots,
+  useFacilityCurrentStates,
   usePlotHistory,
-  usePlotState,
   useLastIrrigation,
   useIrrigations,
 } from '@/hooks/useQueries'
@@ -31,6 +31,7 @@ import {
 import type {
   PlotMetadata,
   Facility,
+  FacilityPlotState,
   LastIrrigationResponse,
   IrrigationsResponse,
   IrrigationEvent,
@@ -80,6 +81,12 @@ export function DashboardPage() {
   const [selectedPlot, setSelectedPlot] = useState<PlotMetadata | null>(null)
 
   const { data: facilities, isLoading: facilitiesLoading, error: facilitiesError } = useFacilities()
+  // Latest state of every plot of the selected plot's facility in one request
+  const {
+    data: currentStates,
+    isLoading: statesLoading,
+    error: statesError,
+  } = useFacilityCurrentStates(selectedPlot?.facility_id ?? '')
 
   if (facilitiesLoading) {
     return (
@@ -135,7 +142,14 @@ export function DashboardPage() {
         {/* Right content: Plot details and charts */}
         <div className="xl:col-span-3">
           {selectedPlot ? (
-            <PlotDetails plot={selectedPlot} />
+            <PlotDetails
+              plot={selectedPlot}
+              currentState={currentStates?.find(
+                (state) => state.plot_id === selectedPlot.plot_id && state.timestamp
+              )}
+              stateLoading={statesLoading}
+              stateError={statesError}
+            />
           ) : (
             <div className="rounded-lg bg-white p-12 text-center shadow">
               <Leaf className="mx-auto mb-4 h-16 w-16 text-gray-300" />
@@ -230,12 +244,17 @@ function FacilityCard({
   )
 }
 
-function PlotDetails({ plot }: { plot: PlotMetadata }) {
-  const {
-    data: currentState,
-    isLoading: stateLoading,
-    error: stateError,
-  } = usePlotState(plot.plot_id)
+function PlotDetails({
+  plot,
+  currentState,
+  stateLoading,
+  stateError,
+}: {
+  plot: PlotMetadata
+  currentState: FacilityPlotState | undefined
+  stateLoading: boolean
+  stateError: Error | null
+}) {
   const {
     data: history,
     isLoading: historyLoading,
@@ -259,11 +278,8 @@ function PlotDetails({ plot }: { plot: PlotMetadata }) {
   console.log('History Error:', historyError)
   console.log('========================')
 
-  // Check if it's a 404 error (no data yet)
-  const is404 = stateError && (stateError as AxiosError).response?.status === 404
-
-  // Only show error if it's not a 404 (404 means no data yet, which is normal)
-  if (stateError && !is404) {
+  // Plots without readings come back with timestamp null (no data yet, which is normal)
+  if (stateError) {
     return (
       <div className="rounded-lg bg-red-50 p-6 text-center">
         <AlertCircle className="mx-auto mb-4 h-12 w-12 text-red-500" />
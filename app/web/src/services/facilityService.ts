@@ -1,5 +1,5 @@
 import { apiClient } from './api'
-import type { Facility, PlotMetadata, CreateFacilityRequest } from '@/types'
+import type { Facility, FacilityPlotState, PlotMetadata, CreateFacilityRequest } from '@/types'
 
 export const facilityService = {
   getFacilities: async (): Promise<Facility[]> => {
@@ -18,6 +18,11 @@ export const facilityService = {
     const response = await apiClient.get(`/plots/facility/${facilityId}`)
     return response.data.plots || []
   },
+  // Latest state of every plot in one request (instead of one /state call per plot)
+  getFacilityCurrentStates: async (facilityId: string): Promise<FacilityPlotState[]> => {
+    const response = await apiClient.get(`/facilities/${facilityId}/current-states`)
+    return response.data.states || []
+  },
   getFacilityResponsibles: async (facilityId: string) => {
     const response = await apiClient.get(`/facilities/${facilityId}/responsibles`)
     return response.data
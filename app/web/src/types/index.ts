@@ -28,6 +28,12 @@ export interface PlotState {
   light?: number
 }
 
+// Entry of GET /facilities/{id}/current-states (timestamp is null for plots without readings)
+export interface FacilityPlotState extends Omit<PlotState, 'timestamp'> {
+  timestamp: string | null
+  name?: string
+}
+
 export interface CreatePlotRequest {
   facility_id: string
   name: string
@@ -1,14 +1,15 @@
 #!/bin/bash
 
 # Script para deployment manual de lambdas (ZIP deployment)
-# Ambas lambdas usan ZIP file deployment (no ECR/Docker)
-# Uso: ./scripts/deploy-lambdas.sh [iot-handler|alert-processor|all]
+# Todas las lambdas usan ZIP file deployment (no ECR/Docker)
+# Uso: ./scripts/deploy-lambdas.sh [iot-handler|alert-processor|rollup-processor|all]
 
 set -e
 
 AWS_REGION="us-east-1"
 LAMBDA_IOT_HANDLER="Lambda-IoT-Handler"
 LAMBDA_ALERT_PROCESSOR="PlotAlertProcessor"
+LAMBDA_ROLLUP_PROCESSOR="PlotRollupProcessor"
 
 # Colores para output
 RED='\033[0;31m'
@@ -44,6 +45,8 @@ function deploy_iot_handler() {
     # Copy Lambda code
     print_info "Copying Lambda code..."
     cp app.py package/
+    cp ../../../server/src/utils/aws_clients.py package/
+    cp ../../../server/src/utils/readings.py package/
     
     # Create ZIP
     print_info "Creating deployment package..."
@@ -89,6 +92,8 @@ function deploy_alert_processor() {
     # Copy Lambda code
     print_info "Copying Lambda code..."
     cp app.py package/
+    cp ../../../server/src/utils/aws_clients.py package/
+    cp ../../../server/src/utils/dynamo_stream.py package/
     
     # Create ZIP
     print_info "Creating deployment package..."
@@ -118,6 +123,53 @@ function deploy_alert_processor() {
     print_info "Lambda Alert Processor deployed successfully!"
 }
 
+function deploy_rollup_processor() {
+    print_info "Deploying Lambda Rollup Processor..."
+    
+    cd app/infra/lambdas/lambda_rollup_processor
+    
+    # Create temp directory
+    rm -rf package lambda_rollup_processor.zip
+    mkdir -p package
+    
+    # Install dependencies
+    print_info "Installing dependencies..."
+    pip install -r requirements.txt -t package/
+    
+    # Copy Lambda code
+    print_info "Copying Lambda code..."
+    cp app.py package/
+    cp ../../../server/src/utils/aws_clients.py package/
+    cp ../../../server/src/utils/dynamo_stream.py package/
+    
+    # Create ZIP
+    print_info "Creating deployment package..."
+    cd package
+    zip -r ../lambda_rollup_processor.zip .
+    cd ..
+    
+    # Upload to Lambda
+    print_info "Uploading to Lambda..."
+    aws lambda update-function-code \
+        --function-name $LAMBDA_ROLLUP_PROCESSOR \
+        --zip-file fileb://lambda_rollup_processor.zip \
+        --region $AWS_REGION
+    
+    # Wait for update to complete
+    print_info "Waiting for Lambda update to complete..."
+    aws lambda wait function-updated --function-name $LAMBDA_ROLLUP_PROCESSOR --region $AWS_REGION
+    
+    # Publish version
+    VERSION=$(aws lambda publish-version --function-name $LAMBDA_ROLLUP_PROCESSOR --region $AWS_REGION --query 'Version' --output text)
+    print_info "Published Lambda version: $VERSION"
+    
+    # Cleanup
+    rm -rf package lambda_rollup_processor.zip
+    
+    cd ../../../../
+    print_info "Lambda Rollup Processor deployed successfully!"
+}
+
 # Main
 case "$1" in
     iot-handler)
@@ -126,13 +178,18 @@ case "$1" in
     alert-processor)
         deploy_alert_processor
         ;;
+    rollup-processor)
+        deploy_rollup_processor
+        ;;
     all)
         deploy_iot_handler
         echo ""
         deploy_alert_processor
+        echo ""
+        deploy_rollup_processor
         ;;
     *)
-        print_error "Usage: $0 [iot-handler|alert-processor|all]"
+        print_error "Usage: $0 [iot-handler|alert-processor|rollup-processor|all]"
         exit 1
         ;;
 esac